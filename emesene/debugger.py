@@ -39,10 +39,14 @@ How to use
 import logging
 import collections
 
+# the level messages are kept at, even if they aren't shown on the console
+RECORD_LEVEL = logging.INFO
+
 class QueueHandler(logging.Handler):
     '''A Handler that just keeps the last messages in memory, using a queue.
     This is useful when you want to know (i.e. in case of errors) the last
-    debug messages.'''
+    debug messages. Records are kept as they come, their message is only
+    formatted when someone looks at them.'''
 
     instance = None
 
@@ -50,12 +54,10 @@ class QueueHandler(logging.Handler):
         logging.Handler.__init__(self)
         self.setLevel(logging.DEBUG)
         self.maxlen = maxlen
-        self.queue = collections.deque()
+        self.queue = collections.deque(maxlen=maxlen)
 
     def emit(self, record):
         self.queue.append(record)
-        if len(self.queue) > self.maxlen:
-            self.queue.popleft()
 
     def get_all(self):
         return self.queue.__iter__()
@@ -80,8 +82,27 @@ def init(debuglevel=0):
         2: logging.DEBUG,
     }
 
-    console_handler.setLevel(levels[min(debuglevel, 2)])
+    level = levels[min(debuglevel, 2)]
+    console_handler.setLevel(level)
     root.addHandler(console_handler)
 
     root.addHandler(QueueHandler.get())
-    root.setLevel(logging.DEBUG)
+    # loggers below this level don't create records at all, use
+    # set_level to see the debug messages of a module
+    root.setLevel(min(level, RECORD_LEVEL))
+
+def get_loggers():
+    '''return the names of the loggers that were created, sorted'''
+    return sorted(name for name, logger in
+        logging.Logger.manager.loggerDict.iteritems()
+        if isinstance(logger, logging.Logger))
+
+def get_level(name):
+    '''return the level the logger called name creates records at,
+    the root logger's name is empty'''
+    return logging.getLogger(name or None).getEffectiveLevel()
+
+def set_level(name, level):
+    '''set the level of the logger called name and its children that
+    don't have a level of their own, the root logger's name is empty'''
+    logging.getLogger(name or None).setLevel(level)
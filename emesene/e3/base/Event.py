@@ -23,6 +23,8 @@ class Event(object):
     def __init__(self, id_, *args):
         '''class constructor'''
         self.id_ = id_
+        # when the event was queued, only set while instrumentation is on
+        self.time = None
 
         if args is None:
             self.args = []
@@ -321,6 +321,39 @@ class Logger(object):
         ORDER BY tmstp DESC LIMIT ?;
     '''
 
+    # keyset paging: rows strictly older than the (tmstp, rowid) cursor,
+    # so fetching an old page costs the same as fetching the newest one
+    SELECT_CHATS_PAGE = '''
+        SELECT f.status, f.tmstp, f.payload, i.nick, a.account, f.rowid
+        FROM fact_event f, d_info i, d_account a
+        WHERE f.id_event=? and
+            ((f.id_src_acc=? and id_dest_acc=?) or
+            (f.id_dest_acc=? and id_src_acc=?)  or
+            (f.id_src_acc<>? and f.cid in
+                ( SELECT cid FROM fact_event
+                  WHERE id_event=? and id_src_acc=? and id_dest_acc=? and
+                  tmstp >= ? and tmstp <= ?
+                  UNION
+                  SELECT cid FROM fact_event
+                  WHERE id_event=? and id_src_acc=? and id_dest_acc=? and
+                  tmstp >= ? and tmstp <= ? )
+            )) and
+            f.id_src_info = i.id_info and
+            f.payload like ? and
+            f.tmstp >= ? and f.tmstp <= ? and
+            (f.tmstp < ? or (f.tmstp = ? and f.rowid < ?)) and
+            f.id_src_acc = a.id_account
+        ORDER BY f.tmstp DESC, f.rowid DESC LIMIT ?;
+    '''
+
+    # indexes for the chat queries, created on old databases too
+    CREATE_INDEXES = (
+        '''CREATE INDEX IF NOT EXISTS fact_event_chats
+           ON fact_event (id_event, id_src_acc, id_dest_acc, tmstp, cid);''',
+        '''CREATE INDEX IF NOT EXISTS fact_event_time
+           ON fact_event (id_event, tmstp);''',
+    )
+
     SELECT_NEW_FIELDS = '''
         SELECT cid FROM fact_event;
     '''
@@ -367,6 +400,8 @@ class Logger(object):
             self._load_accounts()
             self._load_account_by_group()
 
+        self._create_indexes()
+
     def _create(self):
         '''create the database'''
         self.execute(Logger.CREATE_D_TIME)
@@ -382,6 +417,14 @@ class Logger(object):
             id_event = self.insert_event(event)
             self.events[event] = id_event
 
+    def _create_indexes(self):
+        '''create the indexes used by the chat queries, databases created
+        by older versions don't have them'''
+        for query in Logger.CREATE_INDEXES:
+            self.execute(query)
+
+        self.connection.commit()
+
     def _load_accounts(self):
         '''load the accounts from the last_account table and store them in
         a dict'''
@@ -752,6 +795,51 @@ class Logger(object):
 
         return self._fetch_sorted()
 
+    def get_chats_page(self, src, dest, from_t, to_t, limit, before=None,
+                       keywords=None):
+        '''return a page of at most # messages sent from src to dest or from
+        dest to src between from_t and to_t, optionally containing keywords,
+        where # is the limit value.
+
+        before is the cursor returned with the previous page (None for the
+        newest page), the result is a tuple (chats, cursor) where cursor is
+        None when there are no older messages left
+        '''
+        id_event = self.events.get('message', None)
+
+        if src not in self.accounts or dest not in self.accounts:
+            return None
+
+        id_src = self.accounts[src].id_account
+        id_dest = self.accounts[dest].id_account
+
+        if keywords:
+            #FIXME: escape keywords??
+            keywords = "%" + unicode(keywords, 'utf8') + "%"
+        else:
+            keywords = "%"
+
+        if before is None:
+            before = (to_t + 1, 0)
+
+        before_t, before_id = before
+
+        self.execute(Logger.SELECT_CHATS_PAGE,
+                     (id_event, id_src, id_dest, id_src, id_dest, id_dest,
+                      id_event, id_src, id_dest, from_t, to_t,
+                      id_event, id_dest, id_src, from_t, to_t,
+                      keywords, from_t, to_t,
+                      before_t, before_t, before_id, limit))
+
+        query_list = self._fetch_sorted()
+
+        if len(query_list) < limit:
+            cursor = None
+        else:
+            cursor = (query_list[0][1], query_list[0][5])
+
+        return [row[:5] for row in query_list], cursor
+
     def add_groups(self, groups):
         '''add all groups to the database'''
         existing = set(self.groups.keys())
@@ -892,6 +980,7 @@ class LoggerProcess(threading.Thread):
         self.actions['get_chats'] = self.logger.get_chats
         self.actions['get_chats_between'] = self.logger.get_chats_between
         self.actions['get_chats_by_keyword'] = self.logger.get_chats_by_keyword
+        self.actions['get_chats_page'] = self.logger.get_chats_page
         self.actions['add_groups'] = self.logger.add_groups
         self.actions['add_contacts'] = self.logger.add_contacts
         self.actions['add_contact_by_group'] = self.logger.add_contact_by_group
@@ -1015,6 +1104,15 @@ class LoggerProcess(threading.Thread):
         self.input.put(('get_chats_by_keyword', (src, dest, from_t, to_t,
                                                  keywords, limit, callback)))
 
+    def get_chats_page(self, src, dest, from_t, to_t, limit, before,
+                       keywords, callback):
+        '''return a page of at most # messages sent from src to dest or from
+        dest to src between from_t and to_t, older than the before cursor,
+        where # is the limit value
+        '''
+        self.input.put(('get_chats_page', (src, dest, from_t, to_t, limit,
+                                           before, keywords, callback)))
+
     def add_groups(self, groups):
         '''add all groups to the database'''
         self.input.put(('add_groups', (groups, None)))
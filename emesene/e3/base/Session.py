@@ -136,10 +136,20 @@ class Session(object):
 
     def add_event(self, id_, *args):
         '''add an event to the events queue'''
-        self.events.put(Event(id_, *args))
+        event = Event(id_, *args)
+        stats = e3.common.Instrumentation.stats
+        if stats is not None:
+            event.time = stats.clock()
+            stats.enter('events')
+
+        self.events.put(event)
 
     def add_action(self, id_, *args):
         '''add an action to the action queue'''
+        stats = e3.common.Instrumentation.stats
+        if stats is not None:
+            stats.enter('actions')
+
         self.actions.put(Action(id_, *args))
 
     def save_config(self):
@@ -17,10 +17,15 @@
 #    along with emesene; if not, write to the Free Software
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+import os
+import stat
 import Queue
+import tempfile
 import threading
 import traceback
 
+import e3
+
 import Logger
 import logging
 log = logging.getLogger('e3.base.Worker')
@@ -28,11 +33,17 @@ log = logging.getLogger('e3.base.Worker')
 from Event import Event
 from Action import Action
 
+# the permissions masked out of new files, os.umask can only be read by
+# setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
 EVENTS = (\
  'login started'         , 'login info'           ,
  'login succeed'         , 'login failed'         ,
  'disconnected'          , 'contact list ready'   ,
- 'contact attr changed'  , 'contact added'        ,
+ 'contact attr changed'  , 'contacts attr changed',
+ 'contact added'         ,
  'contact add succeed'   , 'contact add failed'   ,
  'contact remove succeed', 'contact remove failed',
  'contact reject succeed', 'contact reject failed',
@@ -186,6 +197,10 @@ class Worker(threading.Thread):
 
     def _process_action(self, action):
         '''process an action'''
+        stats = e3.common.Instrumentation.stats
+        if stats is not None:
+            stats.leave('actions')
+
         if action.id_ in self.action_handlers:
             try:
                 self.action_handlers[action.id_](*action.args)
@@ -204,10 +219,72 @@ class Worker(threading.Thread):
             return None
 
         if not isinstance(avatar, str):
-            avatar = "".join([chr(b) for b in avatar])
+            avatar = str(bytearray(avatar))
 
         return avatar
 
+    def _ft_download_path(self, transfer):
+        '''return the path where the received file transfer is saved'''
+        download_path = self.session.config.get_or_set("download_folder",
+            e3.common.locations.downloads())
+        if self.session.config.b_download_folder_per_account:
+            file_dir = os.path.join(download_path, transfer.sender.account)
+            if not os.path.isdir(file_dir):
+                os.mkdir(file_dir)
+            return os.path.join(file_dir, transfer.filename)
+        else:
+            return os.path.join(download_path, transfer.filename)
+
+    def _ft_create_buffer(self, transfer):
+        '''return a temporary file next to the download path of transfer
+        where the received data can be written as it arrives, None if it
+        can't be created'''
+        try:
+            file_dir = os.path.dirname(self._ft_download_path(transfer))
+            return tempfile.NamedTemporaryFile(suffix='.part', dir=file_dir,
+                delete=False)
+        except (IOError, OSError), error:
+            log.error("Creating temporary file for %s failed: %s" %
+                (transfer.filename, error))
+            return None
+
+    def _ft_save_buffer(self, buffer, transfer):
+        '''move the temporary file of a finished transfer to its download
+        path, return True on success, the temporary file is removed on
+        failure'''
+        full_path = self._ft_download_path(transfer)
+        try:
+            try:
+                buffer.close()
+                # temporary files are only readable by us, give it the
+                # permissions of the file it replaces or of a new file
+                if os.path.exists(full_path):
+                    mode = stat.S_IMODE(os.stat(full_path).st_mode)
+                else:
+                    mode = 0666 & ~UMASK
+                os.chmod(buffer.name, mode)
+                if os.name == 'nt' and os.path.exists(full_path):
+                    os.remove(full_path)
+                os.rename(buffer.name, full_path)
+            except:
+                self._ft_remove_buffer(buffer)
+                raise
+        except (IOError, OSError), error:
+            log.error("Writing file %s failed: %s" % (full_path, error))
+            return False
+
+        transfer.completepath = full_path
+        return True
+
+    def _ft_remove_buffer(self, buffer):
+        '''remove the temporary file of an unfinished transfer'''
+        try:
+            buffer.close()
+            os.remove(buffer.name)
+        except (IOError, OSError), error:
+            log.error("Removing temporary file %s failed: %s" %
+                (buffer.name, error))
+
     # action handlers (the stubs, copy and complete them on your implementation)
     def _handle_action_add_contact(self, account):
         '''handle Action.ACTION_ADD_CONTACT
@@ -35,12 +35,22 @@ class EmoticonCache(Cache.Cache):
         '''
         Cache.Cache.__init__(self, os.path.join(config_path,
             user.strip()), 'emoticons', True)
+        # the parsed information file, None until it's read or after it
+        # changes
+        self.emotes = None
 
     def parse(self):
         '''parse the file that contains the dir information
         return a dictionary with the emoticon as key and the hash as value
         if an emoticon is more than once on the file the last will be returned
         '''
+        if self.emotes is None:
+            self.emotes = self._read_info()
+
+        return dict(self.emotes)
+
+    def _read_info(self):
+        '''read the information file, see parse'''
         emotes = {}
         try:
             with file(self.info_path) as handle:
@@ -128,6 +138,7 @@ class EmoticonCache(Cache.Cache):
         handle = file(self.info_path, 'a')
         handle.write('%s %s\n' % (urllib.quote(shortcut), hash_))
         handle.close()
+        self.emotes = None
 
         return shortcut, hash_
 
@@ -145,6 +156,7 @@ class EmoticonCache(Cache.Cache):
                 handle.write('%s %s\n' % (str(stamp), hash_))
 
         handle.close()
+        self.emotes = None
 
     def add_entry(self, shortcut, hash_):
         '''wrapper method for custom emoticon manipulation'''
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of emesene.
+#
+#    emesene is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    emesene is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with emesene; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+
+class FileSource(object):
+    '''a read only, seekable file like object that reads a file from disk
+    in chunks, so it can be handed to a backend without loading the whole
+    file in memory.
+    the file is only opened on the first read and is closed again once the
+    end of the file is reached, the next read reopens it'''
+
+    def __init__(self, path):
+        self.name = path
+        self.size = os.path.getsize(path)
+        self._handle = None
+        self._pos = 0
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        '''set the position of the next read'''
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+
+        self._pos = max(0, offset)
+
+    def tell(self):
+        '''return the position of the next read'''
+        return self._pos
+
+    def read(self, size=-1):
+        '''read at most size bytes from the current position, all the
+        remaining data if size is negative'''
+        if self._handle is None:
+            self._handle = open(self.name, 'rb')
+
+        self._handle.seek(self._pos)
+        data = self._handle.read(size)
+        self._pos += len(data)
+
+        if not data or size < 0 or self._pos >= self.size:
+            self.close()
+
+        return data
+
+    def close(self):
+        '''release the file handle'''
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of emesene.
+#
+#    emesene is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    emesene is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with emesene; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import time
+import bisect
+import threading
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+# upper bounds in milliseconds of the buckets of the latency histograms,
+# the last bucket has the latencies over the last bound
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class Stats(object):
+    '''depth high-water marks of the event and action queues, histograms
+    of the time events wait until they are dispatched and the time spent
+    in each signal subscriber
+
+    queues are counted with enter and leave, that can be called from any
+    thread'''
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''forget what was recorded'''
+        with self.lock:
+            self.started = self.clock()
+            # queue name : [depth, high-water mark, items]
+            self.queues = {}
+            # event name : [count, total seconds, max seconds, histogram]
+            self.latencies = {}
+            # (signal name, subscriber) : [calls, total seconds, max seconds]
+            self.subscribers = {}
+
+    def enter(self, queue):
+        '''count an item put on queue'''
+        with self.lock:
+            stat = self.queues.get(queue)
+            if stat is None:
+                stat = self.queues[queue] = [0, 0, 0]
+
+            stat[0] += 1
+            stat[2] += 1
+            if stat[0] > stat[1]:
+                stat[1] = stat[0]
+
+    def leave(self, queue):
+        '''count an item taken from queue, items put before the stats
+        were enabled are ignored'''
+        with self.lock:
+            stat = self.queues.get(queue)
+            if stat is not None and stat[0] > 0:
+                stat[0] -= 1
+
+    def dispatched(self, event, seconds):
+        '''record that event waited seconds before being dispatched'''
+        with self.lock:
+            stat = self.latencies.get(event)
+            if stat is None:
+                stat = self.latencies[event] = \
+                    [0, 0.0, 0.0, [0] * (len(BUCKETS) + 1)]
+
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3][bisect.bisect_left(BUCKETS, seconds * 1000)] += 1
+
+    def called(self, signal, subscriber, seconds):
+        '''record that subscriber took seconds to handle signal'''
+        with self.lock:
+            key = (signal, subscriber)
+            stat = self.subscribers.get(key)
+            if stat is None:
+                stat = self.subscribers[key] = [0, 0.0, 0.0]
+
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def snapshot(self):
+        '''return a dict with what was recorded, times are in milliseconds
+        and the slowest subscribers come first'''
+        with self.lock:
+            queues = dict((name, {'depth': depth, 'max_depth': high,
+                'items': items})
+                for name, (depth, high, items) in self.queues.iteritems())
+
+            latencies = dict((name, {'count': count,
+                'mean': total * 1000 / count, 'max': max_ * 1000,
+                'histogram': zip(BUCKETS + (None,), histogram)})
+                for name, (count, total, max_, histogram)
+                in self.latencies.iteritems())
+
+            subscribers = [{'signal': signal, 'subscriber': subscriber,
+                'calls': calls, 'total': total * 1000, 'max': max_ * 1000}
+                for (signal, subscriber), (calls, total, max_)
+                in self.subscribers.iteritems()]
+            subscribers.sort(key=lambda item: item['total'], reverse=True)
+
+            return {'seconds': self.clock() - self.started,
+                'queues': queues, 'latencies': latencies,
+                'subscribers': subscribers}
+
+    def format(self, subscribers=20):
+        '''return the snapshot as text, with the slowest subscribers'''
+        snapshot = self.snapshot()
+        lines = ['%.0f seconds recorded' % snapshot['seconds'], '',
+            '%-24s %8s %8s %8s' % ('queue', 'depth', 'max', 'items')]
+
+        for name, stat in sorted(snapshot['queues'].iteritems()):
+            lines.append('%-24s %8i %8i %8i' % (name, stat['depth'],
+                stat['max_depth'], stat['items']))
+
+        labels = ['<%i' % bound for bound in BUCKETS] + ['more']
+        lines += ['', '%-24s %8s %8s %8s  %s' % ('event', 'count', 'mean ms',
+            'max ms', ' '.join('%5s' % label for label in labels))]
+        for name, stat in sorted(snapshot['latencies'].iteritems()):
+            lines.append('%-24s %8i %8.2f %8.2f  %s' % (name, stat['count'],
+                stat['mean'], stat['max'],
+                ' '.join('%5i' % count for bound, count in stat['histogram'])))
+
+        lines += ['', '%-48s %8s %8s %8s' % ('subscriber', 'calls',
+            'total ms', 'max ms')]
+        for stat in snapshot['subscribers'][:subscribers]:
+            name = stat['subscriber']
+            if stat['signal']:
+                name = '%s: %s' % (stat['signal'], name)
+
+            lines.append('%-48s %8i %8.2f %8.2f' % (name, stat['calls'],
+                stat['total'], stat['max']))
+
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        '''write the snapshot to path as json'''
+        handle = open(path, 'w')
+        try:
+            json.dump(self.snapshot(), handle, indent=2, sort_keys=True)
+        finally:
+            handle.close()
+
+# the stats being recorded, None while instrumentation is disabled, the
+# instrumented code checks it before doing anything else
+stats = None
+
+def enable(clock=time.time):
+    '''start recording, return the stats'''
+    global stats
+    if stats is None:
+        stats = Stats(clock)
+
+    return stats
+
+def disable():
+    '''stop recording, return the stats recorded so far'''
+    global stats
+    old_stats = stats
+    stats = None
+
+    return old_stats
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of emesene.
+#
+#    emesene is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    emesene is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with emesene; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from OrderedDict import OrderedDict
+
+class NotificationLimiter(object):
+    '''a token bucket that limits how many notifications are shown
+
+    a notification takes a token, tokens are given back at rate per
+    second up to burst. notifications that find no token are counted by
+    kind until the digest is flushed'''
+
+    def __init__(self, rate, burst, clock=time.time):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+
+        self.tokens = float(burst)
+        self.last = clock()
+        # kind : notifications that weren't shown, in the order they came
+        self.digest = OrderedDict()
+
+    def allow(self, kind):
+        '''return True if a notification of kind can be shown, otherwise
+        count it in the digest and return False'''
+        now = self.clock()
+        self.tokens = min(self.burst,
+            self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+
+        self.digest[kind] = self.digest.get(kind, 0) + 1
+        return False
+
+    def flush(self):
+        '''return a list of (kind, count) of the notifications that
+        weren't shown since the last flush'''
+        digest = self.digest.items()
+        self.digest.clear()
+
+        return digest
@@ -21,14 +21,17 @@ import logging
 log = logging.getLogger('e3.common.Signal')
 
 from WeakMethod import WeakMethod, WeakMethodBound
+import Instrumentation
 
 class Signal(object):
     '''an object that represents a signal a callback can subscribe
     to the signal, when emited all the callbacks are called until the end or
     until one callback returns False'''
 
-    def __init__(self):
-        '''constructor'''
+    def __init__(self, name=''):
+        '''constructor, name is used to tell the signal apart in the
+        instrumentation stats'''
+        self.name = name
         self._subscribers = {}
 
     def subscribe(self, callback, *args, **kwargs):
@@ -51,6 +54,7 @@ class Signal(object):
         then the remaining callbacks are not called
         '''
         to_remove = []
+        stats = Instrumentation.stats
 
         for callback, cargs in self._subscribers.items():
             cargs, ckwargs = cargs
@@ -62,7 +66,15 @@ class Signal(object):
                 continue
 
             try:
-                if callback(*args, **kwargs) == False:
+                if stats is None:
+                    result = callback(*args, **kwargs)
+                else:
+                    start = stats.clock()
+                    result = callback(*args, **kwargs)
+                    stats.called(self.name, str(callback),
+                        stats.clock() - start)
+
+                if result == False:
                     break
             except TypeError:
                 to_remove.append(callback)
@@ -21,6 +21,7 @@ import threading
 import glib
 
 import Signal
+import Instrumentation
 
 class Signals(threading.Thread):
     '''a class that conversats e3 signals into gui.Signal'''
@@ -35,18 +36,31 @@ class Signals(threading.Thread):
         self.event_names = tuple(sorted(events))
 
         for event in events:
-            event = event.replace(' ', '_')
-            setattr(self, event, Signal.Signal())
+            setattr(self, event.replace(' ', '_'), Signal.Signal(event))
 
     def run(self):
         '''convert Event object on the queue to gui.Signal'''
         while not self._stop:
             event = self.event_queue.get()
+
+            stats = Instrumentation.stats
+            if stats is not None:
+                stats.leave('events')
+                stats.enter('gui events')
+
             glib.idle_add(self.process, event)
 
     def process(self, event):
         '''process events'''
+        stats = Instrumentation.stats
+        if stats is not None:
+            stats.leave('gui events')
+
         if event.id_ < len(self.event_names):
+            if stats is not None and event.time is not None:
+                stats.dispatched(self.event_names[event.id_],
+                    stats.clock() - event.time)
+
             event_name = self.event_names[event.id_].replace(' ', '_')
             try:
                 signal = getattr(self, event_name)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of emesene.
+#
+#    emesene is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    emesene is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with emesene; if not, write to the Free Software
+#    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+import time
+import wave
+import audioop
+import logging
+import threading
+import subprocess
+
+log = logging.getLogger('e3.common.SoundMixer')
+
+# format the sounds are converted to before they are mixed
+RATE = 22050
+CHANNELS = 2
+WIDTH = 2
+# seconds of sound mixed at a time
+CHUNK = 0.05
+# seconds of sound written to the sink ahead of what is being played
+LATENCY = 0.1
+# sounds played at the same time, new sounds are dropped after that
+MAX_VOICES = 4
+# seconds before the same sound can be started again
+REPEAT_INTERVAL = 0.15
+# seconds without sounds before the sink is closed
+IDLE_TIMEOUT = 5
+
+def decode(path):
+    '''return the frames of the wav file on path in the format of the
+    mixer, raise wave.Error, EOFError or IOError if it can't be read'''
+    wav = wave.open(path, 'rb')
+    try:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        data = wav.readframes(wav.getnframes())
+    finally:
+        wav.close()
+
+    if channels not in (1, 2):
+        raise wave.Error('unsupported number of channels: %i' % channels)
+
+    # 8 bit wavs are unsigned
+    if width == 1:
+        data = audioop.bias(data, 1, -128)
+    if width != WIDTH:
+        data = audioop.lin2lin(data, width, WIDTH)
+    if channels == 1:
+        data = audioop.tostereo(data, WIDTH, 1, 1)
+    if rate != RATE:
+        data = audioop.ratecv(data, WIDTH, CHANNELS, rate, RATE, None)[0]
+
+    return data
+
+class PipeSink(object):
+    '''a sink that writes the sound to the standard input of a player,
+    the player is started on the first write and stopped on close'''
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+
+    def write(self, data):
+        '''write data, raise IOError or OSError if the player failed'''
+        if self.process is None:
+            devnull = open(os.devnull, 'w')
+            try:
+                self.process = subprocess.Popen(self.command,
+                    stdin=subprocess.PIPE, stdout=devnull, stderr=devnull)
+            finally:
+                devnull.close()
+
+        try:
+            self.process.stdin.write(data)
+        except (IOError, OSError):
+            self.close()
+            raise
+
+    def close(self):
+        '''stop the player once it played what was written'''
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+            self.process.wait()
+            self.process = None
+
+class NullSink(object):
+    '''a sink that keeps what is written to it, used where sounds
+    can't be heard, like tests'''
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def close(self):
+        self.closed += 1
+
+class SoundMixer(object):
+    '''mix the sounds being played and write them to a sink
+
+    sounds are decoded the first time they are played, plays that
+    overlap are mixed up to MAX_VOICES and a sound can't be started again
+    before REPEAT_INTERVAL, plays over those limits are dropped'''
+
+    def __init__(self, sink, clock=time.time):
+        self.sink = sink
+        self.clock = clock
+        self.chunk_size = int(RATE * CHUNK) * CHANNELS * WIDTH
+
+        # path : decoded frames
+        self.sounds = {}
+        # [frames, offset] of the sounds being played
+        self.voices = []
+        # path : time it was last started
+        self.started = {}
+
+        self.condition = threading.Condition()
+        self.thread = None
+        # held while writing to or closing the sink, closing can wait for
+        # the player so it isn't done holding condition
+        self.sink_lock = threading.Lock()
+
+    def load(self, path):
+        '''return the decoded frames of path, decoding it the first time'''
+        frames = self.sounds.get(path)
+        if frames is None:
+            frames = self.sounds[path] = decode(path)
+
+        return frames
+
+    def play(self, path, threaded=True):
+        '''start playing path, return False if the play was dropped,
+        the sound is written from a thread unless threaded is False'''
+        now = self.clock()
+        with self.condition:
+            last = self.started.get(path)
+            if last is not None and now - last < REPEAT_INTERVAL:
+                return False
+            if len(self.voices) >= MAX_VOICES:
+                return False
+
+            self.voices.append([self.load(path), 0])
+            self.started[path] = now
+            self.condition.notify()
+
+            if threaded and self.thread is None:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.setDaemon(True)
+                self.thread.start()
+
+        return True
+
+    def mix(self):
+        '''return the next chunk of the sounds being played mixed,
+        None if nothing is being played'''
+        with self.condition:
+            if not self.voices:
+                return None
+
+            chunk = None
+            for voice in self.voices:
+                frames, offset = voice
+                data = frames[offset:offset + self.chunk_size]
+                voice[1] = offset + self.chunk_size
+
+                if len(data) < self.chunk_size:
+                    data += '\0' * (self.chunk_size - len(data))
+                if chunk is None:
+                    chunk = data
+                else:
+                    chunk = audioop.add(chunk, data, WIDTH)
+
+            self.voices = [voice for voice in self.voices
+                           if voice[1] < len(voice[0])]
+
+            return chunk
+
+    def _run(self):
+        '''write the mixed sounds to the sink, at most LATENCY ahead of
+        the time they are played, until nothing was played for
+        IDLE_TIMEOUT'''
+        # time when the sound written so far ends
+        end = self.clock()
+
+        while True:
+            with self.condition:
+                if not self.voices:
+                    self.condition.wait(IDLE_TIMEOUT)
+                if not self.voices:
+                    self.thread = None
+                    break
+
+            chunk = self.mix()
+            if chunk is None:
+                continue
+
+            now = self.clock()
+            end = max(end, now)
+            if end - now > LATENCY:
+                time.sleep(end - now - LATENCY)
+
+            try:
+                with self.sink_lock:
+                    self.sink.write(chunk)
+            except (IOError, OSError), error:
+                log.warning('could not play sound: %s' % error)
+                with self.condition:
+                    self.voices = []
+
+            end += CHUNK
+
+        # a thread started by a play from now on waits for this before
+        # writing
+        with self.sink_lock:
+            self.sink.close()
@@ -17,10 +17,14 @@
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
 import os
+import wave
+import audioop
 import subprocess
 import e3
 import gobject
 
+import SoundMixer
+
 try:
     import sound_gst
     HAVE_GSTREAMER = True
@@ -49,6 +53,26 @@ try:
 except ImportError:
     IS_MAC = False
 
+# raw sound in the format of the mixer on standard input
+PLAY_COMMAND = ['play', '-q', '-t', 'raw', '-e', 'signed', '-L',
+    '-b', str(SoundMixer.WIDTH * 8), '-c', str(SoundMixer.CHANNELS),
+    '-r', str(SoundMixer.RATE), '-']
+APLAY_COMMAND = ['aplay', '-q', '-t', 'raw', '-f', 'S%i_LE' % (
+    SoundMixer.WIDTH * 8), '-c', str(SoundMixer.CHANNELS),
+    '-r', str(SoundMixer.RATE), '-']
+
+# the mixer shared by the sound players, it keeps a single player process
+_mixer = None
+
+def get_mixer(command):
+    '''return the shared mixer, create it writing to command if it
+    doesn't exist yet'''
+    global _mixer
+    if _mixer is None:
+        _mixer = SoundMixer.SoundMixer(SoundMixer.PipeSink(command))
+
+    return _mixer
+
 class SoundPlayer(object):
     '''Class used to play sounds'''
     def __init__(self, session):
@@ -62,9 +86,13 @@ class SoundPlayer(object):
                 self.gst_player = sound_gst.GstPlayer()
                 self._play = self.gstreamer_play
             elif is_on_path('play'):
-                self._play = self.play_play
+                self.mixer = get_mixer(PLAY_COMMAND)
+                self._fallback_play = self.play_play
+                self._play = self.mixer_play
             elif is_on_path('aplay'):
-                self._play = self.aplay_play
+                self.mixer = get_mixer(APLAY_COMMAND)
+                self._fallback_play = self.aplay_play
+                self._play = self.mixer_play
             else:
                 self._play = self.dummy_play
         else:
@@ -95,6 +123,14 @@ class SoundPlayer(object):
     def gstreamer_play(self, path):
         self.gst_player.play(path)
 
+    def mixer_play(self, path):
+        '''play a sound through the shared mixer, sounds it can't decode
+        are played by a player of their own'''
+        try:
+            self.mixer.play(path)
+        except (IOError, EOFError, wave.Error, audioop.error):
+            self._fallback_play(path)
+
     def aplay_play(self, path):
         subprocess.Popen(['aplay', path],
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
@@ -26,12 +26,14 @@ import networkmanager
 import externalapi
 
 import XmlParser
+import Instrumentation
 
 from utils import *
 from Config import Config
 from Signal import Signal
 from Signals import Signals
 from ConfigDir import ConfigDir
+from FileSource import FileSource
 from RingBuffer import RingBuffer
 from MessageFormatter import MessageFormatter
 from Sounds import SoundPlayer
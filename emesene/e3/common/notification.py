@@ -17,8 +17,10 @@
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
 from e3 import Message, status
+from NotificationLimiter import NotificationLimiter
 import extension
 import gui
+import glib
 import logging
 import time
 
@@ -50,6 +52,8 @@ class Notification():
                 self._on_user_typing)
             self.session.signals.contact_attr_changed.subscribe(
                 self._on_contact_attr_changed)
+            self.session.signals.contacts_attr_changed.subscribe(
+                self._on_contacts_attr_changed)
             self.session.signals.mail_received.subscribe(
                 self._on_mail_received)
             self.session.signals.filetransfer_completed.subscribe(
@@ -69,6 +73,19 @@ class Notification():
         self.notify_online = False
         self.last_online = None
 
+        # notifications shown per minute and at once, the ones over the
+        # limit are shown together every digest interval seconds
+        per_minute, burst, self.digest_interval = 20, 5, 10
+        if self.session:
+            config = self.session.config
+            per_minute = config.get_or_set('i_notify_per_minute', per_minute)
+            burst = config.get_or_set('i_notify_burst', burst)
+            self.digest_interval = config.get_or_set(
+                'i_notify_digest_interval', self.digest_interval)
+
+        self.limiter = NotificationLimiter(per_minute / 60.0, burst)
+        self.digest_source = None
+
     def _on_notification_gui_changed(self, new_extension):
         if type(self.notifier) != new_extension:
             self.notifier = extension.get_default('notificationGUI')
@@ -85,6 +102,8 @@ class Notification():
                 self._on_user_typing)
             self.session.signals.contact_attr_changed.unsubscribe(
                 self._on_contact_attr_changed)
+            self.session.signals.contacts_attr_changed.unsubscribe(
+                self._on_contacts_attr_changed)
             self.session.signals.mail_received.unsubscribe(
                 self._on_mail_received)
             self.session.signals.filetransfer_completed.unsubscribe(
@@ -99,16 +118,50 @@ class Notification():
                 self._on_endpoint_updated)
         extension.unsubscribe(self._on_notification_gui_changed, 'notificationGUI')
         extension.unsubscribe(self._on_notification_image_changed, 'notificationImage')
+        if self.digest_source is not None:
+            glib.source_remove(self.digest_source)
+            self.digest_source = None
+
+    def _show(self, kind, title, text, uri, const, callback=None,
+              tooltip=None):
+        '''show the notification if the limiter allows it, otherwise
+        count it in the next digest'''
+        if self.limiter.allow(kind):
+            self.notifier(title, text, uri, const, callback, tooltip)
+        elif self.digest_source is None:
+            self.digest_source = glib.timeout_add_seconds(
+                self.digest_interval, self._on_digest)
+
+    def _on_digest(self):
+        '''show the notifications that were over the limit as one'''
+        self.digest_source = None
+        texts = {
+            'online': _('%d contacts came online'),
+            'offline': _('%d contacts went offline'),
+            'message': _('%d new messages'),
+        }
+
+        lines = []
+        for kind, count in self.limiter.flush():
+            text = texts.get(kind, _('%d more notifications'))
+            lines.append(text % count)
+
+        if lines:
+            uri = self.picture_factory('notification-endpoint-added', 'logo')
+            self.notifier(_('Notification'), '\n'.join(lines), uri,
+                          'message-im')
+
+        return False
 
     def _on_filetransfer_completed(self, args):
         uri = self.picture_factory('notification-message-email', 'mail-received')
-        self.notifier(_("File transfer successful"), "", uri,
-                      'file-transf-completed')
+        self._show('filetransfer', _("File transfer successful"), "", uri,
+                   'file-transf-completed')
 
     def _on_filetransfer_canceled(self, args):
         uri = self.picture_factory('notification-message-email', 'mail-received')
-        self.notifier(_("File transfer canceled"), "", uri,
-                      'file-transf-canceled')
+        self._show('filetransfer', _("File transfer canceled"), "", uri,
+                   'file-transf-canceled')
 
     def _on_filetransfer_invitation(self, arg1, arg2):
 
@@ -127,9 +180,9 @@ class Notification():
     def _on_mail_received(self, message):
         ''' called when a new mail is received '''
         uri = self.picture_factory('notification-message-email', 'mail-received')
-        self.notifier(_("New mail from %s") % (message.address),
-                      message._subject, uri, 'mail-received', None,
-                      message.address)
+        self._show('mail', _("New mail from %s") % (message.address),
+                   message._subject, uri, 'mail-received', None,
+                   message.address)
 
     def _on_message(self, cid, account, msgobj, cedict={}):
         """
@@ -150,7 +203,8 @@ class Notification():
             else:
                 text = msgobj.body
 
-        self._notify(contact, msgobj.display_name, text, msgobj.account)
+        self._notify(contact, msgobj.display_name, text, msgobj.account,
+                     kind='message')
 
     def _on_contact_attr_changed(self, account, change_type, old_value,
             do_notify=True):
@@ -172,7 +226,8 @@ class Notification():
                     text = _('is online')
                 if self.session.config.b_play_contact_online:
                     sound = gui.theme.sound_theme.sound_online
-                self._notify(contact, contact.nick, text, contact.account, sound)
+                self._notify(contact, contact.nick, text, contact.account, sound,
+                             'online')
 
             if not self.notify_online:
                 # detects the first notification flood and enable the
@@ -195,7 +250,15 @@ class Notification():
             if self.session.config.b_play_contact_offline:
                 sound = gui.theme.sound_theme.sound_offline
 
-            self._notify(contact, contact.nick, text, contact.account, sound)
+            self._notify(contact, contact.nick, text, contact.account, sound,
+                         'offline')
+
+    def _on_contacts_attr_changed(self, changes):
+        """
+        This is called when attributes of many contacts change at once
+        """
+        for account, change_type, old_value in changes:
+            self._on_contact_attr_changed(account, change_type, old_value)
 
     def _on_endpoint_added(self, ep_id, ep_name):
         '''called when endpoints added'''
@@ -215,7 +278,8 @@ class Notification():
             sound = None
             self._notify("logo", title, text, tooltip, sound)
 
-    def _notify(self, contact, title, text, tooltip, sound=None):
+    def _notify(self, contact, title, text, tooltip, sound=None,
+                kind=None):
         """
         This creates and shows the nofification
         """
@@ -237,6 +301,7 @@ class Notification():
                 uri = self.picture_factory(uri, 'message-im')
 
             if text is not None:
-                self.notifier(title if title else '', text, uri, 'message-im', None, tooltip)
+                self._show(kind, title if title else '', text, uri,
+                           'message-im', None, tooltip)
         if sound is not None:
             self.sound_player.play(sound)
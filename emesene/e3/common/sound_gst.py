@@ -19,6 +19,9 @@
 import os
 import gobject
 
+# sounds played at the same time, new sounds are dropped after that
+MAX_PLAYERS = 4
+
 #check for gi
 def is_gi():
     return hasattr(gobject, '_introspection_module')
@@ -29,18 +32,35 @@ if is_gi():
     class GstPlayer(object):
         def __init__(self):
             Gst.init(None)
-            self.gst_player = Gst.ElementFactory.make("playbin", "player")
-            bus = self.gst_player.get_bus()
+            self.players = []
+            self.idle = []
+
+        def new_player(self):
+            player = Gst.ElementFactory.make("playbin", None)
+            bus = player.get_bus()
             bus.enable_sync_message_emission()
             bus.add_signal_watch()
-            bus.connect('message::eos', self.gst_on_message, self.gst_player)
+            bus.connect('message::eos', self.gst_on_message, player)
+            # a sound that can't be played never reaches the end
+            bus.connect('message::error', self.gst_on_message, player)
+            self.players.append(player)
+            return player
 
         def gst_on_message(self, bus, message, player):
             player.set_state(Gst.State.NULL)
+            if player not in self.idle:
+                self.idle.append(player)
 
         def play(self, path):
-            self.gst_player.set_property('uri', "file://"+os.path.abspath(path))
-            self.gst_player.set_state(Gst.State.PLAYING)
+            if self.idle:
+                player = self.idle.pop()
+            elif len(self.players) < MAX_PLAYERS:
+                player = self.new_player()
+            else:
+                return
+
+            player.set_property('uri', "file://"+os.path.abspath(path))
+            player.set_state(Gst.State.PLAYING)
 else:
     #XXX: use old static bindings
     import pygst
@@ -48,17 +68,33 @@ else:
 
     class GstPlayer(object):
         def __init__(self):
-            self.gst_player = gst.element_factory_make("playbin", "player")
-            bus = self.gst_player.get_bus()
+            self.players = []
+            self.idle = []
+
+        def new_player(self):
+            player = gst.element_factory_make("playbin")
+            bus = player.get_bus()
             bus.enable_sync_message_emission()
             bus.add_signal_watch()
-            bus.connect('message', self.gst_on_message, self.gst_player)
+            bus.connect('message', self.gst_on_message, player)
+            self.players.append(player)
+            return player
 
         def gst_on_message(self, bus, message, player):
-            if message.type == gst.MESSAGE_EOS:
+            # a sound that can't be played never reaches the end
+            if message.type in (gst.MESSAGE_EOS, gst.MESSAGE_ERROR):
                 player.set_state(gst.STATE_NULL)
+                if player not in self.idle:
+                    self.idle.append(player)
 
         def play(self, path):
-            self.gst_player.set_property('uri', "file://"+os.path.abspath(path))
-            self.gst_player.set_state(gst.STATE_PLAYING)
+            if self.idle:
+                player = self.idle.pop()
+            elif len(self.players) < MAX_PLAYERS:
+                player = self.new_player()
+            else:
+                return
+
+            player.set_property('uri', "file://"+os.path.abspath(path))
+            player.set_state(gst.STATE_PLAYING)
 
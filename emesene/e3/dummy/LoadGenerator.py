@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import random
+
+from e3.base import status
+
+# statuses contacts start with and change to, with their weights
+STATUSES = ((status.ONLINE, 4), (status.BUSY, 2), (status.AWAY, 2),
+            (status.IDLE, 1), (status.OFFLINE, 6))
+
+# nicks, some of them with the msn plus markup real contacts use
+NICKS = ('%(name)s', '[b]%(name)s[/b]', '[c=%(a)i]%(name)s[/c=%(b)i]',
+         '[c=#%(hex)s][b]%(name)s is here[/b][/c]',
+         '\xc2\xb7$%(a)i,%(b)i%(name)s\xc2\xb70', '%(name)s :) (L)')
+
+MESSAGES = ('', 'busy', 'listening to something', '[i]away[/i] for a bit',
+            'http://www.emesene.org', '[c=%(a)i]%(name)s says hi[/c]')
+
+TEXTS = ('hi', 'how are you?', 'did you see http://www.emesene.org ?',
+         'lol :D', 'brb', 'ok', 'that is a somewhat longer message, the '
+         'kind people send when they explain something to their friends',
+         '(Y) (L) :P ;)', 'are you there?')
+
+class LoadGenerator(object):
+    '''a seeded source of synthetic contacts and of the events they cause,
+    the same seed and settings always give the same roster and events
+
+    rates are events per second for the whole roster, each message event
+    is a burst of 1 to burst messages from the same contact. roster has
+    to be called before asking for events'''
+
+    def __init__(self, seed=0, contacts=1000, groups=20, presence_rate=5.0,
+                 message_rate=0.5, burst=10, picture_rate=0.2,
+                 transfer_rate=0.01, pictures=1):
+        self.random = random.Random(seed)
+        self.contacts = contacts
+        self.groups = groups
+        self.burst = burst
+        self.pictures = pictures
+
+        self.kinds = [(kind, rate) for kind, rate in (
+            ('presence', presence_rate), ('message', message_rate),
+            ('picture', picture_rate), ('transfer', transfer_rate))
+            if rate > 0]
+        self.rate = sum(rate for kind, rate in self.kinds)
+
+        self.accounts = ['contact%i@load.emesene.org' % n
+                         for n in xrange(contacts)]
+        # account : status, to always change it on a presence event
+        self.status = {}
+        # seconds since the start of the next event, and the event
+        self.time = 0.0
+        self.next_event = None
+
+    def _choice(self, weighted):
+        '''return a value from a sequence of (value, weight)'''
+        point = self.random.uniform(0, sum(weight for value, weight
+                                           in weighted))
+        for value, weight in weighted:
+            point -= weight
+            if point <= 0:
+                return value
+
+        return weighted[-1][0]
+
+    def _values(self, name):
+        return {'name': name, 'a': self.random.randint(0, 67),
+                'b': self.random.randint(0, 67),
+                'hex': '%06x' % self.random.randint(0, 0xffffff)}
+
+    def roster(self):
+        '''return (groups, contacts), groups is a list of names and
+        contacts a list of (account, nick, message, status, groups)'''
+        groups = ['group %i' % n for n in xrange(self.groups)]
+        contacts = []
+
+        for account in self.accounts:
+            values = self._values(account.split('@')[0])
+            status_ = self._choice(STATUSES)
+            self.status[account] = status_
+
+            contact_groups = []
+            if groups and self.random.random() < 0.9:
+                contact_groups.append(self.random.choice(groups))
+                if self.random.random() < 0.1:
+                    contact_groups.append(self.random.choice(groups))
+
+            contacts.append((account, self.random.choice(NICKS) % values,
+                self.random.choice(MESSAGES) % values, status_,
+                sorted(set(contact_groups))))
+
+        return groups, contacts
+
+    def _event(self):
+        '''return the next event as (seconds since the start, kind, args)'''
+        self.time += self.random.expovariate(self.rate)
+        kind = self._choice(self.kinds)
+        account = self.random.choice(self.accounts)
+
+        if kind == 'presence':
+            old_status = self.status.get(account, status.OFFLINE)
+            status_ = self._choice([(value, weight) for value, weight
+                                    in STATUSES if value != old_status])
+            self.status[account] = status_
+            message = None
+            if self.random.random() < 0.2:
+                message = self.random.choice(MESSAGES) % self._values(
+                    account.split('@')[0])
+            args = (account, status_, message)
+        elif kind == 'message':
+            texts = [self.random.choice(TEXTS) for n in
+                     xrange(self.random.randint(1, self.burst))]
+            args = (account, texts)
+        elif kind == 'picture':
+            args = (account, self.random.randrange(self.pictures))
+        else:
+            args = (account, 'file %i.txt' % self.random.randint(0, 999),
+                    self.random.randint(1, 10 * 1024 * 1024))
+
+        return self.time, kind, args
+
+    def events_until(self, seconds):
+        '''return the events that happen up to seconds since the start,
+        in order, see _event'''
+        events = []
+        if not self.rate:
+            return events
+
+        if self.next_event is None:
+            self.next_event = self._event()
+
+        while self.next_event[0] <= seconds:
+            events.append(self.next_event)
+            self.next_event = self._event()
+
+        return events
@@ -0,0 +1,31 @@
+import e3
+import extension
+
+from Session import Session
+from LoadWorker import LoadWorker
+
+class LoadSession(Session):
+    '''a dummy session with a large synthetic contact list that keeps
+    changing, used to profile the client without a network'''
+    NAME = 'Load session'
+    DESCRIPTION = 'Session to load test the client (no connection)'
+    AUTHOR = 'Mariano Guerra'
+    WEBSITE = 'www.emesene.org'
+
+    SERVICES = {
+        "load": {
+            "host": "load.server.com",
+            "port": "1337"
+        }
+    }
+
+    def login(self, account, password, status, proxy, host, port,
+              use_http=False, use_ipv6=False):
+        '''start the login process'''
+        self.account = e3.Account(account, password, status, host)
+        worker = LoadWorker(self, proxy, use_http, use_ipv6)
+        worker.start()
+
+        self.add_action(e3.Action.ACTION_LOGIN, (account, password, status))
+
+extension.implements(LoadSession, 'session')
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import e3
+import gobject
+
+from Worker import Worker
+from LoadGenerator import LoadGenerator
+
+import logging
+log = logging.getLogger('dummy.LoadWorker')
+
+# milliseconds between the checks for events that are due
+TICK = 100
+# pictures contacts change to, the gifs are animated
+PICTURES = [os.path.join('themes', 'images', 'default', name) for name in
+    ('user.png', 'logo.png', 'users.png', 'dummy.png', 'throbber.gif',
+     'new-message.gif')]
+
+class LoadWorker(Worker):
+    '''dummy Worker that logs in to a large synthetic contact list and
+    keeps changing it at the rates set on the config, see LoadGenerator
+
+    the events only depend on the config, replay can be called without
+    starting the worker to apply them as fast as possible'''
+
+    def __init__(self, session, proxy, use_http=False, use_ipv6=False):
+        '''class constructor'''
+        Worker.__init__(self, session, proxy, use_http, use_ipv6)
+
+        config = session.config
+        self.generator = LoadGenerator(
+            config.get_or_set('i_load_seed', 0),
+            config.get_or_set('i_load_contacts', 1000),
+            config.get_or_set('i_load_groups', 20),
+            config.get_or_set('f_load_presence_rate', 5.0),
+            config.get_or_set('f_load_message_rate', 0.5),
+            config.get_or_set('i_load_burst', 10),
+            config.get_or_set('f_load_picture_rate', 0.2),
+            config.get_or_set('f_load_transfer_rate', 0.01),
+            len(PICTURES))
+
+        # account : cid of the conversation with it
+        self.conversations = {}
+        self.transfers = 0
+        self.start_time = None
+
+    def _fill_contact_list(self):
+        """
+        method to fill the contact list with the synthetic roster
+        """
+        groups, contacts = self.generator.roster()
+
+        for name in groups:
+            self._add_group(name)
+
+        for account, nick, message, status_, groups in contacts:
+            self._add_contact(account, nick, status_, '', False, message)
+            for group in groups:
+                self._add_contact_to_group(account, group)
+
+    def _tick(self):
+        '''apply the events that are due'''
+        if not self._continue:
+            return False
+
+        self.replay(time.time() - self.start_time)
+        return True
+
+    def _get_cid(self, account):
+        '''return the cid of the conversation with account, start it if
+        there isn't one'''
+        cid = self.conversations.get(account)
+        if cid is None:
+            cid = self.conversations[account] = time.time()
+            self.session.conv_first_action(cid, [account])
+
+        return cid
+
+    def replay(self, seconds):
+        '''apply the events that happen up to seconds after login'''
+        changes = []
+        logs = []
+
+        for when, kind, args in self.generator.events_until(seconds):
+            account = args[0]
+            contact = self.session.contacts.get(account)
+
+            if kind == 'presence':
+                account, status_, message = args
+                log_account = e3.Logger.Account(contact.cid, None,
+                    contact.account, status_, contact.nick,
+                    contact.message, contact.picture)
+
+                changes.append((account, 'status', contact.status))
+                logs.append(('status change', status_, str(status_),
+                    log_account, None, None))
+                contact.status = status_
+
+                if message is not None:
+                    changes.append((account, 'message', contact.message))
+                    logs.append(('message change', status_, message,
+                        log_account, None, None))
+                    contact.message = message
+            elif kind == 'message':
+                cid = self._get_cid(account)
+                for text in args[1]:
+                    message = e3.Message(e3.Message.TYPE_MESSAGE, text,
+                        account)
+                    self.session.conv_message(cid, account, message)
+                    e3.Logger.log_message(self.session, None, message, False)
+            elif kind == 'picture':
+                contact.picture = PICTURES[args[1]]
+                self.session.picture_change_succeed(account, contact.picture)
+            elif kind == 'transfer':
+                account, filename, size = args
+                self.transfers += 1
+                transfer = e3.base.FileTransfer(self.transfers, filename,
+                    contact, size, None, sender=contact)
+                self.session.filetransfer_invitation(transfer,
+                    self._get_cid(account))
+
+        if changes:
+            self.session.contacts_attr_changed(changes)
+
+        if logs:
+            self.session.logs(logs)
+
+    # action handlers
+    def _handle_action_login(self, account, password, status_):
+        '''handle Action.ACTION_LOGIN
+        '''
+        self.session.login_succeed()
+        self.session.nick_change_succeed('load nick is loaded')
+        self._fill_contact_list()
+        self.session.contact_list_ready()
+
+        self.start_time = time.time()
+        gobject.timeout_add(TICK, self._tick)
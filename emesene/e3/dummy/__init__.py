@@ -1,2 +1,4 @@
 from Worker import Worker
 from Session import Session
+from LoadGenerator import LoadGenerator
+from LoadSession import LoadSession
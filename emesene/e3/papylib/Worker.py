@@ -33,7 +33,7 @@ from e3 import cache
 from e3.base import *
 import e3.base.Logger as Logger
 from e3.common import ConfigDir
-from e3.common import locations
+from e3.common import FileSource
 
 import logging
 log = logging.getLogger('papylib.Worker')
@@ -67,6 +67,9 @@ from PapyConvert import *
 
 PAPY_HAS_AUDIOVIDEO = False
 
+# minimum time in seconds between two progress events of a file transfer
+FT_PROGRESS_INTERVAL = 0.25
+
 # We don't currently support audio/video conversations
 # because the required codecs aren't available in gstreamer
 #try:
@@ -119,9 +122,16 @@ class Worker(e3.base.Worker, papyon.Client):
         # store ongoing filetransfers
         self.filetransfers = {}
         self.rfiletransfers = {}
+        # this stores papyon ft sessions as ftsession : temporary file
+        self.ftbuffers = {}
+        # this stores papyon ft sessions as ftsession : last progress time
+        self.ftprogress = {}
         # store ongoing calls
         self.calls = {}
         self.rcalls = {}
+        # this stores the msn objects of the custom emoticons sent as
+        # (hash, shortcut) : msn object
+        self.custom_emoticons = {}
 
     # some useful methods (mostly, gui only)
     def set_initial_infos(self):
@@ -366,12 +376,13 @@ class Worker(e3.base.Worker, papyon.Client):
 
     def papy_ft_canceled(self, ftsession):
         tr = self.filetransfers[ftsession]
+        self._ft_discard_buffer(ftsession)
         self.session.filetransfer_canceled(tr)
 
     def papy_ft_accepted(self, ftsession):
         tr = self.filetransfers[ftsession]
-        filedata = self._filedata_to_string(tr.completepath)
-        ftsession.send(StringIO.StringIO(filedata))
+        # papyon reads the chunks from disk while sending them
+        ftsession.send(FileSource(tr.completepath))
 
         self.session.filetransfer_accepted(tr)
 
@@ -379,6 +390,13 @@ class Worker(e3.base.Worker, papyon.Client):
         tr = self.filetransfers[ftsession]
         tr.received_data += len_chunk
 
+        # papyon reports every chunk, don't flood the gui with them
+        now = time.time()
+        if tr.received_data < tr.size and \
+           now - self.ftprogress.get(ftsession, 0) < FT_PROGRESS_INTERVAL:
+            return
+        self.ftprogress[ftsession] = now
+
         self.session.filetransfer_progress(tr)
 
     def papy_ft_completed(self, ftsession, data):
@@ -386,36 +404,41 @@ class Worker(e3.base.Worker, papyon.Client):
             or do nothing if we sent it '''
         # TODO: kill the dicts (?)
         tr = self.filetransfers[ftsession]
+        self.ftprogress.pop(ftsession, None)
         if tr.sender == 'Me':
             # we sent the file, do nothing pls.
             pass
         else:
-            download_path = self.session.config.get_or_set("download_folder",
-                e3.common.locations.downloads())
-            if self.session.config.b_download_folder_per_account:
-                full_path = os.path.join(download_path, tr.sender.account,
-                    tr.filename)
-                file_dir = os.path.join(download_path, tr.sender.account)
-                if not os.path.isdir(file_dir):
-                    os.mkdir(file_dir)
+            buffer = self.ftbuffers.pop(ftsession, None)
+            if buffer is not None:
+                # the data is already on disk, just move it in place
+                self._ft_save_buffer(buffer, tr)
             else:
-                full_path = os.path.join(download_path, tr.filename)
-            try:
-                f = open(full_path, 'wb')
-                f.write(data.getvalue())
-                f.close()
-                tr.completepath = full_path
-            except Exception as e:
-                log.error("Writing file %s failed: %s" % (full_path, e))
+                full_path = self._ft_download_path(tr)
+                try:
+                    f = open(full_path, 'wb')
+                    f.write(data.getvalue())
+                    f.close()
+                    tr.completepath = full_path
+                except Exception as e:
+                    log.error("Writing file %s failed: %s" % (full_path, e))
         #del self.rfiletransfers[tr]
 
         self.session.filetransfer_completed(tr)
 
     def papy_ft_rejected(self, ftsession):
         tr = self.filetransfers[ftsession]
+        self._ft_discard_buffer(ftsession)
 
         self.session.filetransfer_rejected(tr)
 
+    def _ft_discard_buffer(self, ftsession):
+        '''remove the temporary file of an unfinished transfer'''
+        self.ftprogress.pop(ftsession, None)
+        buffer = self.ftbuffers.pop(ftsession, None)
+        if buffer is not None:
+            self._ft_remove_buffer(buffer)
+
     # call handlers
     def _on_call_incoming(self, papycallevent):
         """Called once the incoming call is ready."""
@@ -1353,15 +1376,22 @@ class Worker(e3.base.Worker, papyon.Client):
             if l_custom_emoticons is None: l_custom_emoticons = []
 
             for custom_emoticon in l_custom_emoticons:
-
-                fpath = os.path.join(emoticon_cache.path, cedict[custom_emoticon])
-                d_custom_emoticon = self._filedata_to_string(fpath)
-
-                msn_object = papyon.p2p.MSNObject(self.session.account.account,
-                        len(d_custom_emoticon),
-                        papyon.p2p.MSNObjectType.CUSTOM_EMOTICON,
-                        cedict[custom_emoticon], custom_emoticon, None, None,
-                        data=StringIO.StringIO(d_custom_emoticon))
+                key = (cedict[custom_emoticon], custom_emoticon)
+                msn_object = self.custom_emoticons.get(key)
+
+                if msn_object is None:
+                    fpath = os.path.join(emoticon_cache.path,
+                                         cedict[custom_emoticon])
+                    d_custom_emoticon = FileSource(fpath)
+
+                    msn_object = papyon.p2p.MSNObject(
+                            self.session.account.account,
+                            d_custom_emoticon.size,
+                            papyon.p2p.MSNObjectType.CUSTOM_EMOTICON,
+                            cedict[custom_emoticon], custom_emoticon, None,
+                            None, data=d_custom_emoticon)
+                    # the emoticon files are named after their content
+                    self.custom_emoticons[key] = msn_object
 
                 d_msn_objects[custom_emoticon] = msn_object
             # create papymessage
@@ -1404,7 +1434,12 @@ class Worker(e3.base.Worker, papyon.Client):
         self.session.filetransfer_invitation(tr, cid)
 
     def _handle_action_ft_accept(self, t):
-        self.rfiletransfers[t].accept()
+        papysession = self.rfiletransfers[t]
+        # stream the received chunks to disk instead of keeping them in memory
+        buffer = self._ft_create_buffer(t)
+        if buffer is not None:
+            self.ftbuffers[papysession] = buffer
+        papysession.accept(buffer)
 
     def _handle_action_ft_reject(self, t):
         self.rfiletransfers[t].reject()
@@ -1414,6 +1449,7 @@ class Worker(e3.base.Worker, papyon.Client):
 
     def _handle_action_ft_cancel(self, t):
         self.rfiletransfers[t].cancel()
+        self._ft_discard_buffer(self.rfiletransfers[t])
 
         del self.filetransfers[self.rfiletransfers[t]]
         del self.rfiletransfers[t]
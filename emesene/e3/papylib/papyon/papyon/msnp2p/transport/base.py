@@ -34,6 +34,19 @@ logger = logging.getLogger('papyon.msnp2p.transport')
 MAX_INT32 = 2147483647
 
 class BaseP2PTransport(gobject.GObject):
+    """Base class of the P2P transports.
+
+    Data chunks are sent through a sliding window: up to L{max_window_size}
+    chunks may be in flight (sent but not yet confirmed by the underlying
+    transport) at the same time. The window grows by one chunk for every
+    confirmed chunk and is halved when a chunk fails, the chunk size
+    follows the same rule between L{min_chunk_size} and L{max_chunk_size}.
+    Failed chunks are sent again before any new chunk.
+    Signaling chunks (session 0) are never held back by the window."""
+
+    MAX_WINDOW_SIZE = 1
+    MIN_CHUNK_SIZE = 512
+
     __gsignals__ = {
             "connected": (gobject.SIGNAL_RUN_FIRST,
                 gobject.TYPE_NONE,
@@ -96,6 +109,32 @@ class BaseP2PTransport(gobject.GObject):
     def max_chunk_size(self):
         raise NotImplementedError
 
+    @property
+    def min_chunk_size(self):
+        return min(self.MIN_CHUNK_SIZE, self.max_chunk_size)
+
+    @property
+    def max_window_size(self):
+        return self.MAX_WINDOW_SIZE
+
+    @property
+    def chunk_size(self):
+        """Current size of the outgoing chunks, header included"""
+        if self._chunk_size is None:
+            return self.max_chunk_size
+        return self._chunk_size
+
+    @property
+    def window_size(self):
+        """Current number of data chunks allowed in flight"""
+        if self._window_size is None:
+            return self.max_window_size
+        return self._window_size
+
+    @property
+    def inflight_chunks(self):
+        return self._inflight_chunks
+
     @property
     def version(self):
         if self._client.profile.client_id.supports_p2pv2 and \
@@ -108,7 +147,7 @@ class BaseP2PTransport(gobject.GObject):
         raise NotImplementedError
 
     def has_data_to_send(self):
-        return (len(self._data_blob_queue) > 0)
+        return (len(self._data_blob_queue) > 0 or len(self._failed_chunks) > 0)
 
     def send(self, peer, peer_guid, blob):
         self._queue_lock.acquire()
@@ -122,6 +161,8 @@ class BaseP2PTransport(gobject.GObject):
         self._queue_lock.acquire()
         if session_id in self._data_blob_queue:
             del self._data_blob_queue[session_id]
+        self._failed_chunks = [failed for failed in self._failed_chunks
+                if failed[2].session_id != session_id]
         self._queue_lock.release()
 
     def close(self):
@@ -142,7 +183,11 @@ class BaseP2PTransport(gobject.GObject):
         self._first = True
         self._data_blob_queue = {} # session_id : [(peer, peer_guid, blob)]
         self._outgoing_chunks = {} # chunk : blob
+        self._failed_chunks = [] # [(peer, peer_guid, chunk)]
         self._pending_ack = set()
+        self._inflight_chunks = 0
+        self._window_size = None
+        self._chunk_size = None
         self._queue_lock.release()
 
     def _add_pending_ack(self, ack_id):
@@ -178,14 +223,43 @@ class BaseP2PTransport(gobject.GObject):
             self.emit("chunk-sent", peer, peer_guid, chunk)
 
         blob = self._outgoing_chunks.pop(chunk, None)
+        if blob is not None and chunk.session_id != 0:
+            self._inflight_chunks -= 1
+            self._grow_window()
         if blob and blob.is_complete() and blob not in self._outgoing_chunks.values():
             if not chunk.is_data_preparation_chunk():
                 self.emit("blob-sent", peer, peer_guid, blob)
         self._start_processing()
 
+    def _on_chunk_failed(self, peer, peer_guid, chunk):
+        # the chunk stays in _outgoing_chunks until it is sent again, so
+        # that its blob isn't reported as sent without it
+        if chunk in self._outgoing_chunks:
+            if chunk.session_id != 0:
+                self._inflight_chunks -= 1
+                self._shrink_window()
+            self._failed_chunks.append((peer, peer_guid, chunk))
+        self._start_processing()
+
+    def _grow_window(self):
+        if self.window_size < self.max_window_size:
+            self._window_size = self.window_size + 1
+        elif self.chunk_size < self.max_chunk_size:
+            self._chunk_size = min(self.max_chunk_size,
+                    self.chunk_size + self.chunk_size / 4)
+
+    def _shrink_window(self):
+        self._window_size = max(1, self.window_size / 2)
+        self._chunk_size = max(self.min_chunk_size, self.chunk_size / 2)
+        logger.info("Chunk lost, window is now %i chunks of %i bytes" %
+                (self._window_size, self._chunk_size))
+
+    def _window_is_full(self):
+        return self._inflight_chunks >= self.window_size
+
     def _start_processing(self):
         if self._source is None:
-            self._source = gobject.timeout_add(200, self._process_send_queue)
+            self._source = gobject.timeout_add(200, self._on_send_timeout)
         self._process_send_queue()
 
     def _stop_processing(self):
@@ -193,47 +267,69 @@ class BaseP2PTransport(gobject.GObject):
             gobject.source_remove(self._source)
             self._source = None
 
+    def _on_send_timeout(self):
+        if self._process_send_queue():
+            return True
+        self._source = None
+        return False
+
     def _process_send_queue(self):
         if not self._queue_lock.acquire(False):
             return True
-        if not self.has_data_to_send():
-            self._queue_lock.release()
+        try:
+            while self.has_data_to_send():
+                # FIXME find a better algorithm to choose session
+                if self._failed_chunks:
+                    session_id = self._failed_chunks[0][2].session_id
+                elif 0 in self._data_blob_queue:
+                    session_id = 0
+                else:
+                    session_id = self._data_blob_queue.keys()[0]
+
+                if session_id != 0:
+                    if not self._ready_to_send():
+                        logger.info("Transport is not ready to send, bail out")
+                        return False
+                    if self._window_is_full():
+                        return False
+
+                if self._failed_chunks:
+                    self._resend_failed_chunk()
+                else:
+                    self._send_next_chunk(session_id)
             return False
-
-        # FIXME find a better algorithm to choose session
-        if 0 in self._data_blob_queue:
-            session_id = 0
-        else:
-            session_id = self._data_blob_queue.keys()[0]
-
-        if session_id != 0 and not self._ready_to_send():
-            logger.info("Transport is not ready to send, bail out")
+        finally:
             self._queue_lock.release()
-            return False
 
+    def _send_next_chunk(self, session_id):
         sync = self._first
         self._first = False
-        (peer, peer_guid, blob) = self._data_blob_queue[session_id][0]
+        queue = self._data_blob_queue[session_id]
+        (peer, peer_guid, blob) = queue[0]
 
         try:
-            chunk = blob.get_chunk(self.version, self.max_chunk_size, sync)
+            chunk = blob.get_chunk(self.version, self.chunk_size, sync)
         except Exception, err:
             logger.exception(err)
             logger.warning("Couldn't get chunk for session %s" % session_id)
-            self._data_blob_queue[session_id].pop(0) #ignoring blob
-            self._queue_lock.release()
-            return True
+            queue.pop(0) #ignoring blob
+        else:
+            self._outgoing_chunks[chunk] = blob
+            if session_id != 0:
+                self._inflight_chunks += 1
+            self.__send_chunk(peer, peer_guid, chunk)
+            if blob.is_complete():
+                queue.pop(0)
+
+        if len(queue) == 0:
+            del self._data_blob_queue[session_id]
 
-        self._outgoing_chunks[chunk] = blob
+    def _resend_failed_chunk(self):
+        (peer, peer_guid, chunk) = self._failed_chunks.pop(0)
+        if chunk.session_id != 0:
+            self._inflight_chunks += 1
         self.__send_chunk(peer, peer_guid, chunk)
 
-        if blob.is_complete():
-            self._data_blob_queue[session_id].pop(0)
-        if len(self._data_blob_queue[session_id]) == 0:
-            del self._data_blob_queue[session_id]
-        self._queue_lock.release()
-        return True
-
     def __send_chunk(self, peer, peer_guid, chunk):
         # add local identifier to chunk
         if self._local_chunk_id is None:
@@ -40,6 +40,8 @@ logger = logging.getLogger('papyon.msnp2p.transport.direct')
 
 class DirectP2PTransport(BaseP2PTransport):
 
+    MAX_WINDOW_SIZE = 16
+
     __gsignals__ = {
             "listening": (gobject.SIGNAL_RUN_FIRST,
                 gobject.TYPE_NONE,
@@ -35,10 +35,9 @@ logger = logging.getLogger('papyon.msnp2p.transport.switchboard')
 
 class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
 
-    MAX_OUTSTANDING_SENDS = 5
+    MAX_WINDOW_SIZE = 5
 
     def __init__(self, client, contacts, peer, peer_guid, transport_manager):
-        self._oustanding_sends = 0
         self._peer = peer
         self._peer_guid = peer_guid
         SwitchboardHandler.__init__(self, client, contacts)
@@ -92,7 +91,7 @@ class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
         return (self._peer == peer and self._peer_guid == peer_guid)
 
     def _ready_to_send(self):
-        return (self._oustanding_sends < self.MAX_OUTSTANDING_SENDS)
+        return True
 
     def _send_chunk(self, peer, peer_guid, chunk):
         logger.debug(">>> %s" % repr(chunk))
@@ -107,7 +106,6 @@ class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
         msg.content_type = 'application/x-msnmsgrp2p'
         msg.body = str(chunk) + struct.pack('>L', chunk.application_id)
 
-        self._oustanding_sends += 1
         self._send_message(msg, MessageAcknowledgement.MSNC,
                 (self._on_message_sent, peer, peer_guid, chunk),
                 (self._on_message_error, peer, peer_guid, chunk))
@@ -142,11 +140,10 @@ class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
         self._on_chunk_received(peer, peer_guid, chunk)
 
     def _on_message_sent(self, peer, peer_guid, chunk):
-        self._oustanding_sends -= 1
         self._on_chunk_sent(peer, peer_guid, chunk)
 
     def _on_message_error(self, error, peer, peer_guid, chunk):
-        self._oustanding_sends -= 1
+        self._on_chunk_failed(peer, peer_guid, chunk)
 
     def _on_switchboard_closed(self):
         pass
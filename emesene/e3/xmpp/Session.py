@@ -55,7 +55,8 @@ class Session(e3.Session):
 
     CAPABILITIES = [e3.Session.SERVICE_PROFILE_PICTURE,
                     e3.Session.SERVICE_CONTACT_NICK,
-                    e3.Session.SERVICE_CONTACT_PM]
+                    e3.Session.SERVICE_CONTACT_PM,
+                    e3.Session.SERVICE_FILETRANSFER]
 
     def __init__(self, id_=None, account=None):
         '''constructor'''
@@ -145,6 +146,10 @@ class Session(e3.Session):
             message = e3.Message(e3.Message.TYPE_TYPING, None, account)
             self.add_action(e3.Action.ACTION_SEND_MESSAGE, (cid, message))
 
+    def filetransfer_invite(self, cid, account, filename, completepath, preview_data):
+        '''send a file to the first user of the conversation'''
+        self.add_action(e3.Action.ACTION_FT_INVITE, (cid, account, filename, completepath, preview_data))
+
     def session_has_service(self, service):
         '''returns True if some service is supported, False otherwise'''
         if service not in self.CAPABILITIES:
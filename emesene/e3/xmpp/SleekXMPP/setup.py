@@ -83,6 +83,7 @@ packages     = [ 'sleekxmpp',
                  'sleekxmpp/plugins/xep_0086',
                  'sleekxmpp/plugins/xep_0091',
                  'sleekxmpp/plugins/xep_0092',
+                 'sleekxmpp/plugins/xep_0096',
                  'sleekxmpp/plugins/xep_0107',
                  'sleekxmpp/plugins/xep_0108',
                  'sleekxmpp/plugins/xep_0115',
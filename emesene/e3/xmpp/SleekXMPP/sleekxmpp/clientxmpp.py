@@ -102,11 +102,13 @@ class ClientXMPP(BaseXMPP):
         self.register_handler(
                 Callback('Stream Features',
                          MatchXPath('{%s}features' % self.stream_ns),
-                         self._handle_stream_features))
+                         self._handle_stream_features,
+                         shared=True))
         self.register_handler(
                 Callback('Roster Update',
                          StanzaPath('iq@type=set/roster'),
-                         self._handle_roster))
+                         self._handle_roster,
+                         shared=True))
 
         # Setup default stream features
         self.register_plugin('feature_starttls')
@@ -65,10 +65,18 @@ JID_UNESCAPE_TRANSFORMATIONS = {'\\20': ' ',
                                 '\\40': '@',
                                 '\\5c': '\\'}
 
+#: The most recently used parsed JIDs, keyed by the raw JID string and
+#: the local, domain or resource overrides given to :class:`JID`. The
+#: values are ``(parts, locked)`` where ``parts`` is the immutable tuple
+#: shared by every JID built from the same data, and locked entries are
+#: never evicted.
 JID_CACHE = OrderedDict()
 JID_CACHE_LOCK = threading.Lock()
 JID_CACHE_MAX_SIZE = 1024
 
+#: Number of JID constructions answered from, or missing, the cache.
+JID_CACHE_STATS = {'hits': 0, 'misses': 0}
+
 
 # pylint: disable=c0103
 #: The nodeprep profile of stringprep used to validate the local,
@@ -139,6 +147,49 @@ def _parse_jid(data):
     return node, domain, resource
 
 
+def _cache_get(key, lock=False):
+    """Return the cached parts of a JID and mark them as recently used.
+
+    :returns: The ``(local, domain, resource)`` tuple, or ``None``.
+    """
+    with JID_CACHE_LOCK:
+        item = JID_CACHE.pop(key, None)
+        if item is None:
+            JID_CACHE_STATS['misses'] += 1
+            return None
+        JID_CACHE_STATS['hits'] += 1
+        JID_CACHE[key] = (item[0], item[1] or lock)
+        return item[0]
+
+
+def _cache_set(key, parts, lock=False):
+    """Store the parts of a JID, evicting the least recently used
+    entries that are not locked."""
+    with JID_CACHE_LOCK:
+        JID_CACHE[key] = (parts, lock)
+        # locked entries are moved to the end, check each entry once
+        for _ in range(len(JID_CACHE)):
+            if len(JID_CACHE) <= JID_CACHE_MAX_SIZE:
+                break
+            old_key, item = JID_CACHE.popitem(False)
+            if item[1]:
+                JID_CACHE[old_key] = item
+
+
+def jid_cache_stats():
+    """Return the size and hit rate of the JID parsing cache.
+
+    :returns: A dict with the ``hits``, ``misses``, ``size`` and
+              ``hit_rate`` of the cache.
+    """
+    with JID_CACHE_LOCK:
+        stats = dict(JID_CACHE_STATS)
+        stats['size'] = len(JID_CACHE)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / float(lookups) if lookups else 0.0
+    return stats
+
+
 def _validate_node(node):
     """Validate the local, or username, portion of a JID.
 
@@ -418,49 +469,46 @@ class JID(object):
 
     # pylint: disable=W0212
     def __init__(self, jid=None, **kwargs):
-        jid_data = (jid, kwargs.get('local', None),
-                         kwargs.get('domain', None),
-                         kwargs.get('resource', None))
-
+        overrides = tuple((name, kwargs[name]) for name in
+                          ('local', 'domain', 'resource') if name in kwargs)
         locked = kwargs.get('cache_lock', False)
 
-        if jid_data in JID_CACHE:
-            parsed_jid, locked = JID_CACHE[jid_data]
+        if isinstance(jid, JID):
+            if not overrides:
+                # the parts are immutable, share them
+                self._jid = jid._jid
+                return
+            jid_data = (jid._jid, overrides)
+        else:
+            jid_data = (jid, overrides)
+
+        parsed_jid = _cache_get(jid_data, locked)
+        if parsed_jid is not None:
             self._jid = parsed_jid
+            return
+
+        if not jid:
+            parsed_jid = (None, None, None)
+        elif not isinstance(jid, JID):
+            parsed_jid = _parse_jid(jid)
         else:
-            if jid is None:
-                jid = ''
-
-            if not jid:
-                parsed_jid = (None, None, None)
-            elif not isinstance(jid, JID):
-                parsed_jid = _parse_jid(jid)
-            else:
-                parsed_jid = jid._jid
-
-            local, domain, resource = parsed_jid
-
-            local = kwargs.get('local', local)
-            domain = kwargs.get('domain', domain)
-            resource = kwargs.get('resource', resource)
-
-            if 'local' in kwargs:
-                local = _escape_node(local)
-            if 'domain' in kwargs:
-                domain = _validate_domain(domain)
-            if 'resource' in kwargs:
-                resource = _validate_resource(resource)
-
-            self._jid = (local, domain, resource)
-
-        JID_CACHE[jid_data] = (self._jid, locked)
-        if len(JID_CACHE) > JID_CACHE_MAX_SIZE:
-            with JID_CACHE_LOCK:
-                key, item = JID_CACHE.popitem(False)
-                if item[1]:
-                    # Need to reinsert locked JIDs
-                    JID_CACHE[key] = item
+            parsed_jid = jid._jid
+
+        local, domain, resource = parsed_jid
 
+        local = kwargs.get('local', local)
+        domain = kwargs.get('domain', domain)
+        resource = kwargs.get('resource', resource)
+
+        if 'local' in kwargs:
+            local = _escape_node(local)
+        if 'domain' in kwargs:
+            domain = _validate_domain(domain)
+        if 'resource' in kwargs:
+            resource = _validate_resource(resource)
+
+        self._jid = (local, domain, resource)
+        _cache_set(jid_data, self._jid, locked)
 
     def unescape(self):
         """Return an unescaped JID object.
@@ -41,6 +41,7 @@ __all__ = [
     'xep_0086',  # Legacy Error Codes
     'xep_0091',  # Legacy Delayed Delivery
     'xep_0092',  # Software Version
+    'xep_0096',  # SI File Transfer
     'xep_0106',  # JID Escaping
     'xep_0107',  # User Mood
     'xep_0108',  # User Activity
@@ -22,7 +22,9 @@ class XEP_0047(BasePlugin):
     stanza = stanza
     default_config = {
         'max_block_size': 8192,
+        'block_size': 4096,
         'window_size': 1,
+        'queue_data': True,
         'auto_accept': True,
         'accept_stream': None
     }
@@ -69,10 +71,14 @@ class XEP_0047(BasePlugin):
                 return True
         return False
 
-    def open_stream(self, jid, block_size=4096, sid=None, window=1,
+    def open_stream(self, jid, block_size=None, sid=None, window=None,
                     ifrom=None, block=True, timeout=None, callback=None):
         if sid is None:
             sid = str(uuid.uuid4())
+        if block_size is None:
+            block_size = self.block_size
+        if window is None:
+            window = self.window_size
 
         iq = self.xmpp.Iq()
         iq['type'] = 'set'
@@ -83,7 +89,8 @@ class XEP_0047(BasePlugin):
         iq['ibb_open']['stanza'] = 'iq'
 
         stream = IBBytestream(self.xmpp, sid, block_size,
-                              iq['to'], iq['from'], window)
+                              iq['to'], iq['from'], window,
+                              self.queue_data)
 
         with self._stream_lock:
             self.pending_streams[iq['id']] = stream
@@ -131,7 +138,8 @@ class XEP_0047(BasePlugin):
 
         stream = IBBytestream(self.xmpp, sid, size,
                               iq['from'], iq['to'],
-                              self.window_size)
+                              self.window_size,
+                              self.queue_data)
         stream.stream_started.set()
         self.streams[sid] = stream
         iq.reply()
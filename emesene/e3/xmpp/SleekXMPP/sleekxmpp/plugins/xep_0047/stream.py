@@ -11,11 +11,15 @@ log = logging.getLogger(__name__)
 
 class IBBytestream(object):
 
-    def __init__(self, xmpp, sid, block_size, to, ifrom, window_size=1):
+    def __init__(self, xmpp, sid, block_size, to, ifrom, window_size=1,
+                 queue_data=True):
         self.xmpp = xmpp
         self.sid = sid
         self.block_size = block_size
         self.window_size = window_size
+        # When False, received data is only delivered through the
+        # ibb_stream_data event and read() is not available.
+        self.queue_data = queue_data
 
         self.receiver = to
         self.sender = ifrom
@@ -84,7 +88,8 @@ class IBBytestream(object):
             self.close()
             raise XMPPError('not-acceptable')
 
-        self.recv_queue.put(data)
+        if self.queue_data:
+            self.recv_queue.put(data)
         self.xmpp.event('ibb_stream_data', {'stream': self, 'data': data})
         iq.reply()
         iq.send()
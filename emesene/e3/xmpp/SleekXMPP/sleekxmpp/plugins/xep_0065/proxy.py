@@ -1,6 +1,4 @@
-import sys
 import logging
-import struct
 
 from threading import Thread, Event
 from hashlib import sha1
@@ -28,14 +26,19 @@ class XEP_0065(base_plugin):
     xep = '0065'
     name = 'xep_0065'
 
-    # A dict contains for each SID, the proxy thread currently
-    # running.
-    proxy_threads = {}
-
     def plugin_init(self):
         """ Initializes the xep_0065 plugin and all event callbacks.
         """
 
+        # A dict contains for each SID, the proxy thread currently
+        # running.
+        self.proxy_threads = {}
+
+        # A dict contains for each SID, the (jid, host, port) of the
+        # streamhost of the bytestream, so that transfers running at
+        # the same time don't mix their proxies.
+        self.streamhosts = {}
+
         # Shortcuts to access to the xep_0030 plugin.
         self.disco = self.xmpp['xep_0030']
 
@@ -59,21 +62,28 @@ class XEP_0065(base_plugin):
         if proxy:
             return proxy.s
 
-    def handshake(self, to, streamer=None):
+    def handshake(self, to, streamer=None, sid=None):
         """ Starts the handshake to establish the socks5 bytestreams
         connection.
+
+        A socks_connected event is triggered with the SID once the
+        bytestream has been activated and data can be sent.
         """
 
         # Discovers the proxy.
-        self.streamer = streamer or self.discover_proxy()
+        streamer = streamer or self.discover_proxy()
 
         # Requester requests network address from the proxy.
-        streamhost = self.get_network_address(self.streamer)
-        self.proxy_host = streamhost['socks']['streamhost']['host']
-        self.proxy_port = streamhost['socks']['streamhost']['port']
+        streamhost = self.get_network_address(streamer)
+        proxy_host = streamhost['socks']['streamhost']['host']
+        proxy_port = streamhost['socks']['streamhost']['port']
+
+        # Generates the SID for this new handshake, unless one has
+        # already been negotiated (e.g. by a stream initiation).
+        if sid is None:
+            sid = uuid4().hex
 
-        # Generates the SID for this new handshake.
-        sid = uuid4().hex
+        self.streamhosts[sid] = (streamer, proxy_host, proxy_port)
 
         # Requester initiates S5B negotation with Target by sending
         # IQ-set that includes the JabberID and network address of
@@ -81,9 +91,9 @@ class XEP_0065(base_plugin):
         # bytestream.
         iq = self.xmpp.Iq(sto=to, stype='set')
         iq['socks']['sid'] = sid
-        iq['socks']['streamhost']['jid'] = self.streamer
-        iq['socks']['streamhost']['host'] = self.proxy_host
-        iq['socks']['streamhost']['port'] = self.proxy_port
+        iq['socks']['streamhost']['jid'] = streamer
+        iq['socks']['streamhost']['host'] = proxy_host
+        iq['socks']['streamhost']['port'] = proxy_port
 
         # Sends the new IQ.
         return iq.send()
@@ -96,7 +106,7 @@ class XEP_0065(base_plugin):
         """
 
         # Gets all disco items.
-        disco_items = self.disco.get_items(self.xmpp.server)
+        disco_items = self.disco.get_items(self.xmpp.boundjid.host)
 
         for item in disco_items['disco_items']['items']:
             # For each items, gets the disco info.
@@ -124,32 +134,34 @@ class XEP_0065(base_plugin):
         """ Handles all streamhost stanzas.
         """
 
-        # Registers the streamhost info.
-        self.streamer = iq['socks']['streamhost']['jid']
-        self.proxy_host = iq['socks']['streamhost']['host']
-        self.proxy_port = iq['socks']['streamhost']['port']
-
         # Sets the SID, the requester and the target.
         sid = iq['socks']['sid']
         requester = '%s' % iq['from']
         target = '%s' % self.xmpp.boundjid
 
+        # Registers the streamhost info.
+        streamer = iq['socks']['streamhost']['jid']
+        proxy_host = iq['socks']['streamhost']['host']
+        proxy_port = iq['socks']['streamhost']['port']
+        self.streamhosts[sid] = (streamer, proxy_host, proxy_port)
+
         # Next the Target attempts to open a standard TCP socket on
         # the network address of the Proxy.
-        self.proxy_thread = Proxy(sid, requester, target, self.proxy_host,
-                                  self.proxy_port, self.on_recv)
-        self.proxy_thread.start()
+        proxy = Proxy(sid, requester, target, proxy_host, proxy_port,
+                      self.on_recv)
+        proxy.start()
 
         # Registers the new thread in the proxy_thread dict.
-        self.proxy_threads[sid] = self.proxy_thread
+        self.proxy_threads[sid] = proxy
 
         # Wait until the proxy is connected
-        self.proxy_thread.connected.wait()
+        proxy.connected.wait()
+        self.xmpp.event('socks_connected', sid)
 
         # Replies to the incoming iq with a streamhost-used stanza.
         res_iq = iq.reply()
         res_iq['socks']['sid'] = sid
-        res_iq['socks']['streamhost-used']['jid'] = self.streamer
+        res_iq['socks']['streamhost-used']['jid'] = streamer
 
         # Sends the IQ
         return res_iq.send()
@@ -163,22 +175,29 @@ class XEP_0065(base_plugin):
         requester = '%s' % self.xmpp.boundjid
         target  = '%s' % iq['from']
 
+        streamhost = self.streamhosts.get(sid)
+        if streamhost is None:
+            log.warning('streamhost-used for unknown bytestream %s', sid)
+            return
+        streamer, proxy_host, proxy_port = streamhost
+
         # The Requester will establish a connection to the SOCKS5
         # proxy in the same way the Target did.
-        self.proxy_thread = Proxy(sid, requester, target, self.proxy_host,
-                                  self.proxy_port, self.on_recv)
-        self.proxy_thread.start()
+        proxy = Proxy(sid, requester, target, proxy_host, proxy_port,
+                      self.on_recv)
+        proxy.start()
 
         # Registers the new thread in the proxy_thread dict.
-        self.proxy_threads[sid] = self.proxy_thread
+        self.proxy_threads[sid] = proxy
 
         # Wait until the proxy is connected
-        self.proxy_thread.connected.wait()
+        proxy.connected.wait()
 
         # Requester sends IQ-set to StreamHost requesting that
         # StreamHost activate the bytestream associated with the
         # StreamID.
         self.activate(iq['socks']['sid'], target)
+        self.xmpp.event('socks_connected', sid)
 
     def activate(self, sid, to):
         """ IQ-set to StreamHost requesting that StreamHost activate
@@ -186,7 +205,8 @@ class XEP_0065(base_plugin):
         """
 
         # Creates the activate IQ.
-        act_iq = self.xmpp.Iq(sto=self.streamer, stype='set')
+        streamer = self.streamhosts[sid][0]
+        act_iq = self.xmpp.Iq(sto=streamer, stype='set')
         act_iq['socks']['sid'] = sid
         act_iq['socks']['activate'] = to
 
@@ -197,6 +217,7 @@ class XEP_0065(base_plugin):
         """ Closes the Proxy thread associated to this SID.
         """
 
+        self.streamhosts.pop(sid, None)
         proxy = self.proxy_threads.get(sid)
         if proxy:
             proxy.s.close()
@@ -209,6 +230,7 @@ class XEP_0065(base_plugin):
         for sid, proxy in self.proxy_threads.items():
             proxy.s.close()
             del self.proxy_threads[sid]
+        self.streamhosts.clear()
 
     def send(self, sid, data):
         """ Sends the data over the Proxy socket associated to the
@@ -275,6 +297,7 @@ class Proxy(Thread):
         self.proxy = proxy
         self.proxy_port = proxy_port
         self.on_recv = on_recv
+        self.recv_size = 65536
 
     def run(self):
         """ Starts the thread.
@@ -325,35 +348,14 @@ class Proxy(Thread):
                 break
 
             for s in ins:
-                data = self.recv_size(self.s)
+                # The bytestream carries raw data, pass it on as it
+                # comes instead of buffering whole transfers.
+                try:
+                    data = self.s.recv(self.recv_size)
+                except Exception as e:
+                    log.debug('Socket error: %s' % e)
+                    data = ''
                 if not data:
                     socket_open = False
 
                 self.on_recv(self.sid, data)
-
-    def recv_size(self, the_socket):
-        total_len = 0
-        total_data = []
-        size = sys.maxint
-        size_data = sock_data = ''
-        recv_size = 8192
-
-        while total_len < size:
-            sock_data = the_socket.recv(recv_size)
-            if not sock_data:
-                return ''.join(total_data)
-
-            if not total_data:
-                if len(sock_data) > 4:
-                    size_data += sock_data
-                    size = struct.unpack('>i', size_data[:4])[0]
-                    recv_size = size
-                    if recv_size > 524288:
-                        recv_size = 524288
-                    total_data.append(size_data[4:])
-                else:
-                    size_data += sock_data
-            else:
-                total_data.append(sock_data)
-            total_len = sum([len(i) for i in total_data])
-        return ''.join(total_data)
@@ -35,7 +35,8 @@ class XEP_0085(BasePlugin):
         self.xmpp.register_handler(
             Callback('Chat State',
                      StanzaPath('message/chat_state'),
-                     self._handle_chat_state))
+                     self._handle_chat_state,
+                     shared=True))
 
         register_stanza_plugin(Message, stanza.Active)
         register_stanza_plugin(Message, stanza.Composing)
@@ -0,0 +1,153 @@
+"""
+    SleekXMPP: The Sleek XMPP Library
+    Copyright (C) 2012 Nathanael C. Fritz, Lance J.T. Stout
+    This file is part of SleekXMPP.
+
+    See the file LICENSE for copying permission.
+"""
+
+import uuid
+import logging
+
+from sleekxmpp import Iq
+from sleekxmpp.exceptions import XMPPError
+from sleekxmpp.xmlstream import register_stanza_plugin
+from sleekxmpp.xmlstream.handler import Callback
+from sleekxmpp.xmlstream.matcher import StanzaPath
+from sleekxmpp.plugins import BasePlugin
+from sleekxmpp.plugins.xep_0004 import Form
+from sleekxmpp.plugins.xep_0096 import stanza
+from sleekxmpp.plugins.xep_0096.stanza import SI, File, FeatureNegotiation
+
+
+log = logging.getLogger(__name__)
+
+
+SOCKS5 = 'http://jabber.org/protocol/bytestreams'
+IBB = 'http://jabber.org/protocol/ibb'
+
+
+class XEP_0096(BasePlugin):
+
+    """
+    XEP-0096: SI File Transfer
+
+    Negotiates a file transfer and the bytestream used to carry it
+    (XEP-0065 SOCKS5 Bytestreams or XEP-0047 In-Band Bytestreams).
+    The data itself is sent over the negotiated bytestream, using the
+    stream ID of the offer as the bytestream SID.
+
+    Also see <http://www.xmpp.org/extensions/xep-0096.html>.
+
+    Events:
+        si_file_offer -- Received a file transfer offer. The iq must
+                         be answered with accept() or decline().
+
+    Methods:
+        offer   -- Offer a file to another entity.
+        accept  -- Accept an offer selecting one of its stream methods.
+        decline -- Decline an offer.
+    """
+
+    name = 'xep_0096'
+    description = 'XEP-0096: SI File Transfer'
+    dependencies = set(['xep_0004', 'xep_0030'])
+    stanza = stanza
+
+    profile = 'http://jabber.org/protocol/si/profile/file-transfer'
+
+    def plugin_init(self):
+        register_stanza_plugin(Iq, SI)
+        register_stanza_plugin(SI, File)
+        register_stanza_plugin(SI, FeatureNegotiation)
+        register_stanza_plugin(FeatureNegotiation, Form)
+
+        self.xmpp.register_handler(Callback(
+            'SI File Offer',
+            StanzaPath('iq@type=set/si'),
+            self._handle_offer))
+
+    def plugin_end(self):
+        self.xmpp.remove_handler('SI File Offer')
+        self.xmpp['xep_0030'].del_feature(feature=SI.namespace)
+        self.xmpp['xep_0030'].del_feature(feature=self.profile)
+
+    def session_bind(self, jid):
+        self.xmpp['xep_0030'].add_feature(SI.namespace)
+        self.xmpp['xep_0030'].add_feature(self.profile)
+
+    def offer(self, jid, name, size, methods=(SOCKS5, IBB), sid=None,
+              desc=None, mime_type='application/octet-stream', ifrom=None,
+              block=True, timeout=None, callback=None):
+        """
+        Offer a file to another entity.
+
+        The response contains the stream method selected by the
+        receiver in ['si']['feature_neg']['stream_method'], or an
+        error if the offer was declined.
+
+        Arguments:
+            jid      -- The full JID of the receiver.
+            name     -- The file name shown to the receiver.
+            size     -- The file size in bytes.
+            methods  -- The stream methods to offer, in order of
+                        preference.
+            sid      -- The stream ID, generated if not provided.
+            desc     -- An optional description of the file.
+            block    -- If true, block and wait for the response.
+            timeout  -- The time in seconds to block while waiting
+                        for a response.
+            callback -- Optional callback to execute when a response
+                        has been received.
+        """
+        if sid is None:
+            sid = str(uuid.uuid4())
+
+        iq = self.xmpp.Iq()
+        iq['type'] = 'set'
+        iq['to'] = jid
+        iq['from'] = ifrom
+        iq['si']['id'] = sid
+        iq['si']['profile'] = self.profile
+        iq['si']['mime_type'] = mime_type
+        iq['si']['file']['name'] = name
+        iq['si']['file']['size'] = size
+        if desc:
+            iq['si']['file']['desc'] = desc
+        iq['si']['feature_neg']['stream_methods'] = list(methods)
+
+        return iq.send(block=block, timeout=timeout, callback=callback)
+
+    def accept(self, iq, method):
+        """
+        Accept a file transfer offer.
+
+        Arguments:
+            iq     -- The offer, as received with si_file_offer.
+            method -- The selected stream method, one of the methods
+                      listed in the offer.
+        """
+        reply = iq.reply(clear=True)
+        reply['si']['feature_neg']['stream_method'] = method
+        reply.send()
+
+    def decline(self, iq):
+        """
+        Decline a file transfer offer.
+
+        Arguments:
+            iq -- The offer, as received with si_file_offer.
+        """
+        reply = iq.reply(clear=True).error()
+        reply['error']['type'] = 'cancel'
+        reply['error']['code'] = '403'
+        reply['error']['condition'] = 'forbidden'
+        reply['error']['text'] = 'Offer Declined'
+        reply.send()
+
+    def _handle_offer(self, iq):
+        if iq['si']['profile'] != self.profile:
+            raise XMPPError('bad-request')
+        if not iq['si']['feature_neg']['stream_methods']:
+            raise XMPPError('bad-request')
+        self.xmpp.event('si_file_offer', iq)
@@ -0,0 +1,113 @@
+"""
+    SleekXMPP: The Sleek XMPP Library
+    Copyright (C) 2012 Nathanael C. Fritz, Lance J.T. Stout
+    This file is part of SleekXMPP.
+
+    See the file LICENSE for copying permission.
+"""
+
+from sleekxmpp.xmlstream import ElementBase
+
+
+class SI(ElementBase):
+
+    """
+    XEP-0095: Stream Initiation
+
+    Example stanzas:
+        <iq type="set">
+          <si xmlns="http://jabber.org/protocol/si"
+              id="a0"
+              mime-type="text/plain"
+              profile="http://jabber.org/protocol/si/profile/file-transfer">
+            <file xmlns="http://jabber.org/protocol/si/profile/file-transfer"
+                  name="test.txt" size="1022" />
+            <feature xmlns="http://jabber.org/protocol/feature-neg">
+              ...
+            </feature>
+          </si>
+        </iq>
+
+    Stanza Interface:
+        id        -- The stream ID, shared with the bytestream.
+        mime_type -- The MIME type of the offered data.
+        profile   -- The stream initiation profile in use.
+    """
+
+    name = 'si'
+    namespace = 'http://jabber.org/protocol/si'
+    plugin_attrib = 'si'
+    interfaces = set(('id', 'mime_type', 'profile'))
+
+    def get_mime_type(self):
+        return self._get_attr('mime-type')
+
+    def set_mime_type(self, value):
+        self._set_attr('mime-type', value)
+
+    def del_mime_type(self):
+        self._del_attr('mime-type')
+
+
+class File(ElementBase):
+
+    """
+    XEP-0096: SI File Transfer, the description of the offered file.
+
+    Stanza Interface:
+        name -- The name of the file.
+        size -- The size of the file in bytes.
+        date -- The last modification time of the file.
+        hash -- The MD5 hash of the file contents.
+        desc -- A human readable description of the file.
+    """
+
+    name = 'file'
+    namespace = 'http://jabber.org/protocol/si/profile/file-transfer'
+    plugin_attrib = 'file'
+    interfaces = set(('name', 'size', 'date', 'hash', 'desc'))
+    sub_interfaces = set(('desc',))
+
+    def get_size(self):
+        return int(self._get_attr('size', '0'))
+
+    def set_size(self, value):
+        self._set_attr('size', str(value))
+
+
+class FeatureNegotiation(ElementBase):
+
+    """
+    XEP-0020: Feature Negotiation, used to agree on the stream method.
+
+    Stanza Interface:
+        stream_methods -- The stream methods offered by the sender.
+        stream_method  -- The stream method selected by the receiver.
+    """
+
+    name = 'feature'
+    namespace = 'http://jabber.org/protocol/feature-neg'
+    plugin_attrib = 'feature_neg'
+    interfaces = set(('stream_methods', 'stream_method'))
+
+    def get_stream_methods(self):
+        field = self['form']['fields'].get('stream-method', None)
+        if field is None:
+            return []
+        return [option['value'] for option in field['options']]
+
+    def set_stream_methods(self, methods):
+        del self['form']
+        form = self['form']
+        form['type'] = 'form'
+        form.add_field(var='stream-method', ftype='list-single',
+                       options=methods)
+
+    def get_stream_method(self):
+        return self['form']['values'].get('stream-method', None)
+
+    def set_stream_method(self, method):
+        del self['form']
+        form = self['form']
+        form['type'] = 'submit'
+        form.add_field(var='stream-method', value=method)
@@ -61,7 +61,8 @@ class XEP_0115(BasePlugin):
         self.xmpp.register_handler(
                 Callback('Entity Capabilites',
                          StanzaPath('presence/caps'),
-                         self._handle_caps))
+                         self._handle_caps,
+                         shared=True))
 
         self.xmpp.add_filter('out', self._filter_add_caps)
 
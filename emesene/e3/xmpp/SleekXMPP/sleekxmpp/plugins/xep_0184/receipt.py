@@ -42,12 +42,14 @@ class XEP_0184(BasePlugin):
         self.xmpp.register_handler(
                 Callback('Message Receipt',
                     StanzaPath('message/receipt'),
-                    self._handle_receipt_received))
+                    self._handle_receipt_received,
+                    shared=True))
 
         self.xmpp.register_handler(
                 Callback('Message Receipt Request',
                     StanzaPath('message/request_receipt'),
-                    self._handle_receipt_request))
+                    self._handle_receipt_request,
+                    shared=True))
 
     def plugin_end(self):
         self.xmpp['xep_0030'].del_feature('urn:xmpp:receipts')
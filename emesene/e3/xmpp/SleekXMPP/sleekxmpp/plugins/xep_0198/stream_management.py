@@ -11,7 +11,8 @@ import threading
 import collections
 
 from sleekxmpp.stanza import Message, Presence, Iq, StreamFeatures
-from sleekxmpp.xmlstream import register_stanza_plugin
+from sleekxmpp.util import QueueEmpty
+from sleekxmpp.xmlstream import register_stanza_plugin, tostring
 from sleekxmpp.xmlstream.handler import Callback, Waiter
 from sleekxmpp.xmlstream.matcher import MatchXPath, MatchMany
 from sleekxmpp.plugins.base import BasePlugin
@@ -234,12 +235,28 @@ class XEP_0198(BasePlugin):
     def _handle_resumed(self, stanza):
         """Finish resuming a stream by resending unacked stanzas.
 
+        Stanzas still waiting in the send queue were already counted as
+        unacked when they were queued, so they are taken out of the queue
+        and resent in order with the others instead of being sent twice.
+
         Raises a :term:`session_resumed` event.
         """
         self.xmpp.features.add('stream_management')
         self._handle_ack(stanza)
-        for id, stanza in self.unacked_queue:
-            self.xmpp.send(stanza, now=True, use_filters=False)
+        with self.xmpp.send_queue_lock:
+            while True:
+                try:
+                    self.xmpp.send_queue.get_nowait()
+                except QueueEmpty:
+                    break
+                self.xmpp.send_queue.task_done()
+            for seq, unacked in list(self.unacked_queue):
+                self.xmpp.send_raw(tostring(unacked.xml,
+                                            xmlns=self.xmpp.default_ns,
+                                            stream=self.xmpp,
+                                            top_level=True), now=True)
+        if self.unacked_queue:
+            self.request_ack()
         self.xmpp.session_started_event.set()
         self.xmpp.event('session_resumed', stanza)
 
@@ -253,6 +270,12 @@ class XEP_0198(BasePlugin):
         """
         self.enabled.clear()
         self.unacked_queue.clear()
+        # The previous stream is gone, a new one will be enabled
+        # once resource binding is done.
+        self.sm_id = None
+        self.handled = 0
+        self.seq = 0
+        self.last_ack = 0
         self.xmpp.event('sm_failed', stanza)
 
     def _handle_ack(self, ack):
@@ -274,6 +297,9 @@ class XEP_0198(BasePlugin):
                 num_unacked,
                 num_acked,
                 num_unacked - num_acked)
+            if num_acked > num_unacked:
+                log.warning("Server acked more stanzas than were sent")
+                num_acked = num_unacked
             for x in range(num_acked):
                 seq, stanza = self.unacked_queue.popleft()
                 self.xmpp.event('stanza_acked', stanza)
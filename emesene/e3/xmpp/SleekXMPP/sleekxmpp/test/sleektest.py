@@ -330,6 +330,9 @@ class SleekTest(unittest.TestCase):
         # Remove unique ID prefix to make it easier to test
         self.xmpp._id_prefix = ''
         self.xmpp._disconnect_wait_for_threads = False
+        # Write each stanza on its own so that they can be compared
+        # one at a time
+        self.xmpp.send_buffer_size = 0
         self.xmpp.default_lang = None
         self.xmpp.peer_default_lang = None
 
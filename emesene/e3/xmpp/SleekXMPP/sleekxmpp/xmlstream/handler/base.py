@@ -30,22 +30,30 @@ class BaseHandler(object):
                     stanza should be accepted by this handler.
     :param stream: The :class:`~sleekxmpp.xmlstream.xmlstream.XMLStream`
                     instance that the handle will respond to.
+    :param bool shared: Indicates if the handler only reads the stanzas
+                        it is given. When a stanza matches several
+                        handlers, each handler is given its own copy
+                        of it unless it is shared. Defaults to ``False``.
     """
 
-    def __init__(self, name, matcher, stream=None):
+    def __init__(self, name, matcher, stream=None, shared=False):
         #: The name of the handler
         self.name = name
 
+        #: Whether the handler can be given a stanza that other
+        #: handlers also matched instead of its own copy.
+        self.shared = shared
+
+        self._destroy = False
+        self._payload = None
+        self._matcher = matcher
+
         #: The XML stream this handler is assigned to
         self.stream = None
         if stream is not None:
             self.stream = weakref.ref(stream)
             stream.register_handler(self)
 
-        self._destroy = False
-        self._payload = None
-        self._matcher = matcher
-
     def match(self, xml):
         """Compare a stanza or XML object with the handler's matcher.
 
@@ -54,6 +62,15 @@ class BaseHandler(object):
         """
         return self._matcher.match(xml)
 
+    def index_key(self):
+        """Return the key the stream indexes the handler by, see
+        :meth:`~sleekxmpp.xmlstream.matcher.base.MatcherBase.index_key()`.
+        """
+        index_key = getattr(self._matcher, 'index_key', None)
+        if index_key is None:
+            return None
+        return index_key()
+
     def prerun(self, payload):
         """Prepare the handler for execution while the XML
         stream is being processed.
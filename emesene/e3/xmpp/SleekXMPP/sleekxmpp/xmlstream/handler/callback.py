@@ -42,14 +42,17 @@ class Callback(BaseHandler):
                           main event loop.
     :param stream: The :class:`~sleekxmpp.xmlstream.xmlstream.XMLStream`
                    instance this handler should monitor.
+    :param bool shared: Indicates if the callback only reads the matched
+                        stanza, so that it doesn't need its own copy.
+                        Defaults to False.
     """
 
     def __init__(self, name, matcher, pointer, thread=False,
-                 once=False, instream=False, stream=None):
-        BaseHandler.__init__(self, name, matcher, stream)
+                 once=False, instream=False, stream=None, shared=False):
         self._pointer = pointer
         self._once = once
         self._instream = instream
+        BaseHandler.__init__(self, name, matcher, stream, shared)
 
     def prerun(self, payload):
         """Execute the callback during stream processing, if
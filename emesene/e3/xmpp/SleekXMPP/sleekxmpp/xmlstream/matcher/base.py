@@ -29,3 +29,19 @@ class MatcherBase(object):
         Meant to be overridden.
         """
         return False
+
+    def index_key(self):
+        """Return a key that every stanza matched by this matcher has,
+        allowing the stream to skip the matcher for other stanzas.
+
+        The key is one of:
+
+        * ``('id', id)``: the stanza's ``'id'`` interface value.
+        * ``('tag', name)``: the local name of the stanza's root element.
+        * ``('name', name)`` or ``('name', name, type)``: the stanza
+          object's name, plugin attribute or a loaded plugin, optionally
+          along with its ``'type'`` interface value.
+
+        Returns ``None`` when any stanza may match, which is the default.
+        """
+        return None
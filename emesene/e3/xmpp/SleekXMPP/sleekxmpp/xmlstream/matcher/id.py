@@ -27,3 +27,7 @@ class MatcherId(MatcherBase):
                     stanza to compare against.
         """
         return xml['id'] == self._criteria
+
+    def index_key(self):
+        """Index the matcher by the expected stanza ID."""
+        return ('id', self._criteria)
@@ -41,3 +41,14 @@ class StanzaPath(MatcherBase):
                        stanza to compare against.
         """
         return stanza.match(self._criteria) or stanza.match(self._raw_criteria)
+
+    def index_key(self):
+        """Index the matcher by the name of the first element in the
+        stanza path and its ``type`` attribute check, if any.
+        """
+        components = self._criteria[0].split('@')
+        name = components[0].split('}')[-1]
+        for attribute in components[1:]:
+            if attribute.startswith('type='):
+                return ('name', name, attribute[len('type='):])
+        return ('name', name)
@@ -71,6 +71,12 @@ class MatchXMLMask(MatcherBase):
             xml = xml.xml
         return self._mask_cmp(xml, self._criteria, True)
 
+    def index_key(self):
+        """Index the matcher by the local name of the mask's root."""
+        if not hasattr(self._criteria, 'tag'):
+            return None
+        return ('tag', self._criteria.tag.split('}', 1)[-1])
+
     def _mask_cmp(self, source, mask, use_ns=False, default_ns='__no_ns__'):
         """Compare an XML object against an XML mask.
 
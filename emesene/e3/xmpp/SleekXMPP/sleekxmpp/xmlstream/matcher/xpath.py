@@ -84,3 +84,16 @@ class MatchXPath(MatcherBase):
                     return False
                 xml = list(xml)[index]
             return True
+
+    def index_key(self):
+        """Index the matcher by the local name of the root element of
+        the XPath expression, unless it uses wildcards or predicates.
+        """
+        criteria = self._criteria
+        if criteria.startswith('{'):
+            # Skip the namespace, which may contain slashes.
+            criteria = criteria[criteria.find('}') + 1:]
+        name = criteria.split('/', 1)[0]
+        if not name or '*' in name or '[' in name or name.startswith('.'):
+            return None
+        return ('tag', name)
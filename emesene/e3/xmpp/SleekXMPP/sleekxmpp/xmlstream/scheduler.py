@@ -13,12 +13,11 @@
 """
 
 import time
+import heapq
 import threading
 import logging
 import itertools
 
-from sleekxmpp.util import Queue, QueueEmpty
-
 
 log = logging.getLogger(__name__)
 
@@ -68,6 +67,12 @@ class Task(object):
         #: be queued for execution instead of executing immediately.
         self.qpointer = qpointer
 
+        #: Indicates that the task was cancelled and must not run again.
+        self.cancelled = False
+
+        #: The :class:`Scheduler` the task was added to.
+        self.scheduler = None
+
     def run(self):
         """Execute the task's callback.
 
@@ -86,6 +91,13 @@ class Task(object):
         """Reset the task's timer so that it will repeat."""
         self.next = time.time() + self.seconds
 
+    def cancel(self):
+        """Remove the task from its scheduler without executing it."""
+        if self.scheduler is not None:
+            self.scheduler.cancel(self)
+        else:
+            self.cancelled = True
+
 
 class Scheduler(object):
 
@@ -93,6 +105,10 @@ class Scheduler(object):
     A threaded scheduler that allows for updates mid-execution unlike the
     scheduler in the standard library.
 
+    Tasks are kept in a heap ordered by execution time, and the
+    scheduler thread sleeps until the earliest one is due or the
+    schedule changes.
+
     Based on: http://docs.python.org/library/sched.html#module-sched
 
     :param parentstop: An :class:`~threading.Event` to signal stopping
@@ -100,12 +116,13 @@ class Scheduler(object):
     """
 
     def __init__(self, parentstop=None):
-        #: A queue for storing tasks
-        self.addq = Queue()
-
-        #: A list of tasks in order of execution time.
+        #: A heap of ``(time, order, task)`` entries. Cancelled tasks
+        #: are dropped once they reach the top of the heap.
         self.schedule = []
 
+        #: The pending tasks, by name.
+        self.tasks = {}
+
         #: If running in threaded mode, this will be the thread processing
         #: the schedule.
         self.thread = None
@@ -120,6 +137,13 @@ class Scheduler(object):
         #: Lock for accessing the task queue.
         self.schedule_lock = threading.RLock()
 
+        #: Notified when the schedule changes or the scheduler should
+        #: check if it has been stopped.
+        self.schedule_cond = threading.Condition(self.schedule_lock)
+
+        # keeps tasks due at the same time in the order they were added
+        self._order = itertools.count()
+
     def process(self, threaded=True, daemon=False):
         """Begin accepting and processing scheduled tasks.
 
@@ -139,56 +163,57 @@ class Scheduler(object):
         self.run = True
         try:
             while self.run and not self.stop.is_set():
-                wait = 0.1
-                updated = False
-                if self.schedule:
-                    wait = self.schedule[0].next - time.time()
-                try:
-                    if wait <= 0.0:
-                        newtask = self.addq.get(False)
-                    else:
-                        if wait >= 3.0:
-                            wait = 3.0
-                        newtask = None
-                        elapsed = 0
-                        while not self.stop.is_set() and \
-                              newtask is None and \
-                              elapsed < wait:
-                            newtask = self.addq.get(True, 0.1)
-                            elapsed += 0.1
-                except QueueEmpty:
-                    self.schedule_lock.acquire()
-                    # select only those tasks which are to be executed now
-                    relevant = itertools.takewhile(
-                        lambda task: time.time() >= task.next, self.schedule)
-                    # run the tasks and keep the return value in a tuple
-                    status = map(lambda task: (task, task.run()), relevant)
-                    # remove non-repeating tasks
-                    for task, doRepeat in status:
-                        if not doRepeat:
-                            try:
-                                self.schedule.remove(task)
-                            except ValueError:
-                                pass
-                        else:
-                            # only need to resort tasks if a repeated task has
-                            # been kept in the list.
-                            updated = True
-                else:
-                    updated = True
-                    self.schedule_lock.acquire()
-                    if newtask is not None:
-                        self.schedule.append(newtask)
-                finally:
-                    if updated:
-                        self.schedule.sort(key=lambda task: task.next)
-                    self.schedule_lock.release()
+                with self.schedule_lock:
+                    due = self._pop_due()
+                    if not due:
+                        wait = None
+                        if self.schedule:
+                            wait = self.schedule[0][0] - time.time()
+                        self.schedule_cond.wait(wait)
+                        continue
+
+                # callbacks may add or cancel tasks, run them unlocked
+                for task in due:
+                    if task.cancelled:
+                        continue
+                    if task.run():
+                        with self.schedule_lock:
+                            if not task.cancelled:
+                                self._push(task)
         except KeyboardInterrupt:
             self.run = False
         except SystemExit:
             self.run = False
         log.debug("Quitting Scheduler thread")
 
+    def _pop_due(self):
+        """Remove the tasks that are due from the schedule. The names
+        of the tasks that don't repeat may be scheduled again from then.
+
+        Must be called with :attr:`schedule_lock` held.
+        """
+        due = []
+        now = time.time()
+        while self.schedule and self.schedule[0][0] <= now:
+            task = heapq.heappop(self.schedule)[2]
+            if task.cancelled:
+                continue
+            if not task.repeat and self.tasks.get(task.name) is task:
+                del self.tasks[task.name]
+            due.append(task)
+        return due
+
+    def _push(self, task):
+        """Add a task to the heap, waking the scheduler if it is now
+        the earliest one.
+
+        Must be called with :attr:`schedule_lock` held.
+        """
+        entry = (task.next, next(self._order), task)
+        heapq.heappush(self.schedule, entry)
+        if self.schedule[0] is entry:
+            self.schedule_cond.notify()
+
     def add(self, name, seconds, callback, args=None,
             kwargs=None, repeat=False, qpointer=None):
         """Schedule a new task.
@@ -202,19 +227,37 @@ class Scheduler(object):
                             Defaults to ``False``.
         :param pointer: A pointer to an event queue for queuing callback
                         execution instead of executing immediately.
+
+        :returns: The :class:`Task`, which may be used to cancel it.
         """
-        try:
-            self.schedule_lock.acquire()
-            for task in self.schedule:
-                if task.name == name:
-                    raise ValueError("Key %s already exists" % name)
-
-            self.addq.put(Task(name, seconds, callback, args,
-                               kwargs, repeat, qpointer))
-        except:
-            raise
-        finally:
-            self.schedule_lock.release()
+        with self.schedule_lock:
+            if name in self.tasks:
+                raise ValueError("Key %s already exists" % name)
+
+            task = Task(name, seconds, callback, args,
+                        kwargs, repeat, qpointer)
+            task.scheduler = self
+            self.tasks[name] = task
+            self._push(task)
+
+            # cancelled entries are only dropped when due, don't let
+            # them pile up behind long running repeated tasks
+            if len(self.schedule) > 2 * len(self.tasks) + 64:
+                self.schedule = [entry for entry in self.schedule
+                                 if not entry[2].cancelled]
+                heapq.heapify(self.schedule)
+            return task
+
+    def cancel(self, task):
+        """Remove a scheduled task ahead of schedule, and without
+        executing it.
+
+        :param task: The :class:`Task` to remove.
+        """
+        with self.schedule_lock:
+            task.cancelled = True
+            if self.tasks.get(task.name) is task:
+                del self.tasks[task.name]
 
     def remove(self, name):
         """Remove a scheduled task ahead of schedule, and without
@@ -222,19 +265,17 @@ class Scheduler(object):
 
         :param string name: The name of the task to remove.
         """
-        try:
-            self.schedule_lock.acquire()
-            the_task = None
-            for task in self.schedule:
-                if task.name == name:
-                    the_task = task
-            if the_task is not None:
-                self.schedule.remove(the_task)
-        except:
-            raise
-        finally:
-            self.schedule_lock.release()
+        with self.schedule_lock:
+            task = self.tasks.get(name)
+            if task is not None:
+                self.cancel(task)
+
+    def wake(self):
+        """Make the scheduler thread check if it has been stopped."""
+        with self.schedule_lock:
+            self.schedule_cond.notify_all()
 
     def quit(self):
         """Shutdown the scheduler."""
         self.run = False
+        self.wake()
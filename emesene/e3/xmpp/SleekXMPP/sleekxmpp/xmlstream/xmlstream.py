@@ -16,6 +16,7 @@ from __future__ import with_statement, unicode_literals
 
 import base64
 import copy
+import itertools
 import logging
 import signal
 import socket as Socket
@@ -66,6 +67,14 @@ SSL_RETRY_DELAY = 0.5
 #: an SSL error.
 SSL_RETRY_MAX = 10
 
+#: The maximum number of bytes of queued stanzas written to the socket
+#: at once. 16KB fill a single TLS record.
+SEND_BUFFER_SIZE = 16384
+
+#: The maximum time in seconds the send thread waits for more stanzas to
+#: be queued before writing what it already has.
+SEND_FLUSH_DELAY = 0.005
+
 #: Maximum time to delay between connection attempts is one hour.
 RECONNECT_MAX_DELAY = 600
 
@@ -173,6 +182,20 @@ class XMLStream(object):
         #: an SSL error.
         self.ssl_retry_delay = SSL_RETRY_DELAY
 
+        #: The maximum number of bytes of queued stanzas written to the
+        #: socket at once. Setting this to ``0`` writes every stanza on
+        #: its own.
+        self.send_buffer_size = SEND_BUFFER_SIZE
+
+        #: The maximum time in seconds to wait for more stanzas to be
+        #: queued before writing the ones already taken from the queue.
+        self.send_flush_delay = SEND_FLUSH_DELAY
+
+        #: Counters of the socket writes done by the send thread, see
+        #: :meth:`get_send_stats`.
+        self.send_stats = {'writes': 0, 'stanzas': 0, 'bytes': 0,
+                           'max_stanzas': 0, 'max_bytes': 0}
+
         #: The connection state machine tracks if the stream is
         #: ``'connected'`` or ``'disconnected'``.
         self.state = StateMachine(('disconnected', 'connected'))
@@ -288,6 +311,9 @@ class XMLStream(object):
         #: executing callbacks in the future based on time delays.
         self.scheduler = Scheduler(self.stop)
         self.__failed_send_stanza = None
+        # an encoded stanza taken from the send queue that didn't fit in
+        # the previous write
+        self.__send_overflow = None
 
         #: A mapping of XML namespaces to well-known prefixes.
         self.namespace_map = {StanzaBase.xml_ns: 'xml'}
@@ -295,6 +321,13 @@ class XMLStream(object):
         self.__thread = {}
         self.__root_stanza = []
         self.__handlers = []
+        #: Stream handlers indexed by the key of their matcher, so that
+        #: each stanza is only compared against plausible handlers.
+        #: Entries are ``(order, handler)`` pairs; handlers without a
+        #: key are stored under ``None`` and tried for every stanza.
+        self.__handler_index = {}
+        self.__handler_order = itertools.count()
+        self.__handler_lock = threading.Lock()
         self.__event_handlers = {}
         self.__event_handlers_lock = threading.Lock()
         self.__filters = {'in': [], 'out': [], 'out_sync': []}
@@ -462,9 +495,11 @@ class XMLStream(object):
                     elapsed += 0.1
             except KeyboardInterrupt:
                 self.stop.set()
+                self.scheduler.wake()
                 return False
             except SystemExit:
                 self.stop.set()
+                self.scheduler.wake()
                 return False
 
         if self.default_domain:
@@ -707,6 +742,7 @@ class XMLStream(object):
 
         if not self.auto_reconnect:
             self.stop.set()
+            self.scheduler.wake()
             if self._disconnect_wait_for_threads:
                 self._wait_for_threads()
 
@@ -724,6 +760,7 @@ class XMLStream(object):
     def abort(self):
         self.session_started_event.clear()
         self.stop.set()
+        self.scheduler.wake()
         if self._disconnect_wait_for_threads:
             self._wait_for_threads()
         try:
@@ -1029,7 +1066,11 @@ class XMLStream(object):
                 derived object to execute.
         """
         if handler.stream is None:
-            self.__handlers.append(handler)
+            with self.__handler_lock:
+                self.__handlers.append(handler)
+                entry = (next(self.__handler_order), handler)
+                self.__handler_index.setdefault(handler.index_key(),
+                                                []).append(entry)
             handler.stream = weakref.ref(self)
 
     def remove_handler(self, name):
@@ -1037,14 +1078,50 @@ class XMLStream(object):
 
         :param name: The name of the handler.
         """
-        idx = 0
-        for handler in self.__handlers:
-            if handler.name == name:
-                self.__handlers.pop(idx)
-                return True
-            idx += 1
+        with self.__handler_lock:
+            for handler in self.__handlers:
+                if handler.name == name:
+                    self.__drop_handler(handler)
+                    return True
         return False
 
+    def __drop_handler(self, handler):
+        """Remove a handler from the handler list and index.
+
+        Must be called with the handler lock held.
+
+        :param handler: The handler to remove.
+        """
+        try:
+            self.__handlers.remove(handler)
+        except ValueError:
+            return
+        key = handler.index_key()
+        entries = self.__handler_index.get(key, [])
+        for idx, (order, indexed) in enumerate(entries):
+            if indexed is handler:
+                entries.pop(idx)
+                break
+        if not entries:
+            self.__handler_index.pop(key, None)
+
+    def __index_keys(self, stanza):
+        """Return the handler index keys that may apply to a stanza,
+        see :meth:`~sleekxmpp.xmlstream.matcher.base.MatcherBase.index_key`.
+
+        :param stanza: The received stanza object.
+        """
+        keys = set([('id', stanza['id']),
+                    ('tag', stanza.xml.tag.split('}', 1)[-1])])
+        stanza_type = stanza['type']
+        names = set(stanza.loaded_plugins)
+        names.add(stanza.name)
+        names.add(stanza.plugin_attrib)
+        for name in names:
+            keys.add(('name', name))
+            keys.add(('name', name, stanza_type))
+        return keys
+
     def get_dns_records(self, domain, port=None):
         """Get the DNS records for a domain.
 
@@ -1425,6 +1502,7 @@ class XMLStream(object):
         # reconnecting is permitted.
         while True:
             shutdown = False
+            stream_ended = False
             try:
                 # The call to self.__read_xml will block and prevent
                 # the body of the loop from running until a disconnect
@@ -1440,6 +1518,7 @@ class XMLStream(object):
                         self.send_raw(self.stream_header, now=True)
                     if not self.__read_xml():
                         # If the server terminated the stream, end processing
+                        stream_ended = self.stream_end_event.is_set()
                         break
             except KeyboardInterrupt:
                 log.debug("Keyboard Escape Detected in _process")
@@ -1468,7 +1547,10 @@ class XMLStream(object):
 
             if not shutdown and not self.stop.is_set() \
                and self.auto_reconnect:
-                self.reconnect()
+                # Only close the stream, and end the session, if the
+                # server closed it. A dropped connection keeps the
+                # session so that it can be resumed.
+                self.reconnect(send_close=stream_ended)
             else:
                 self.disconnect()
                 break
@@ -1564,23 +1646,32 @@ class XMLStream(object):
 
         log.debug("RECV: %s", stanza)
 
-        # Match the stanza against registered handlers. Handlers marked
+        # Match the stanza against the registered handlers that may
+        # apply to it, in the order they were registered. Handlers marked
         # to run "in stream" will be executed immediately; the rest will
         # be queued.
+        keys = self.__index_keys(stanza)
+        with self.__handler_lock:
+            entries = list(self.__handler_index.get(None, ()))
+            for key in keys:
+                entries.extend(self.__handler_index.get(key, ()))
+        if len(entries) > 1:
+            entries.sort(key=lambda entry: entry[0])
+
         unhandled = True
-        matched_handlers = [h for h in self.__handlers if h.match(stanza)]
+        matched_handlers = [h for order, h in entries if h.match(stanza)]
         for handler in matched_handlers:
-            if len(matched_handlers) > 1:
+            # Each handler gets its own copy of the stanza, unless it
+            # is the only one or it promised not to modify it.
+            if not handler.shared and len(matched_handlers) > 1:
                 stanza_copy = copy.copy(stanza)
             else:
                 stanza_copy = stanza
             handler.prerun(stanza_copy)
             self.event_queue.put(('stanza', handler, stanza_copy))
-            try:
-                if handler.check_delete():
-                    self.__handlers.remove(handler)
-            except:
-                pass  # not thread safe
+            if handler.check_delete():
+                with self.__handler_lock:
+                    self.__drop_handler(handler)
             unhandled = False
 
         # Some stanzas require responses, such as Iq queries. A default
@@ -1677,23 +1768,83 @@ class XMLStream(object):
 
         self._end_thread('event runner')
 
+    def get_send_stats(self):
+        """Return the counters of the socket writes done by the send
+        thread, along with the average number of stanzas and bytes
+        written at once."""
+        stats = dict(self.send_stats)
+        writes = stats['writes'] or 1
+        stats['stanzas_per_write'] = stats['stanzas'] / float(writes)
+        stats['bytes_per_write'] = stats['bytes'] / float(writes)
+        return stats
+
+    def __count_write(self, stanzas, size):
+        """Update the send counters after a socket write."""
+        stats = self.send_stats
+        stats['writes'] += 1
+        stats['stanzas'] += stanzas
+        stats['bytes'] += size
+        stats['max_stanzas'] = max(stats['max_stanzas'], stanzas)
+        stats['max_bytes'] = max(stats['max_bytes'], size)
+
+    def __take_send_queue(self):
+        """Take the next stanzas to write from the send queue.
+
+        Everything already queued is taken, up to :attr:`send_buffer_size`
+        bytes, waiting at most :attr:`send_flush_delay` seconds for more
+        stanzas to arrive. A stanza larger than the buffer is written on
+        its own. Returns the encoded data and the number of queue items
+        it holds. Raises ``QueueEmpty`` if nothing was queued within a
+        second.
+        """
+        if self.__send_overflow is not None:
+            chunks = [self.__send_overflow]
+            self.__send_overflow = None
+        else:
+            data = self.send_queue.get(True, 1)
+            log.debug("SEND: %s", data)
+            chunks = [data.encode('utf-8')]
+        size = len(chunks[0])
+        deadline = time.time() + self.send_flush_delay
+        while size < self.send_buffer_size:
+            timeout = deadline - time.time()
+            try:
+                if timeout > 0:
+                    data = self.send_queue.get(True, timeout)
+                else:
+                    data = self.send_queue.get_nowait()
+            except QueueEmpty:
+                break
+            log.debug("SEND: %s", data)
+            chunk = data.encode('utf-8')
+            if size + len(chunk) > self.send_buffer_size:
+                # keep it for the next write
+                self.__send_overflow = chunk
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks), len(chunks)
+
     def _send_thread(self):
-        """Extract stanzas from the send queue and send them on the stream."""
+        """Extract stanzas from the send queue and send them on the stream.
+
+        Stanzas queued together are written to the socket at once, see
+        :meth:`__take_send_queue`.
+        """
         try:
             while not self.stop.is_set():
                 while not self.stop.is_set() and \
                       not self.session_started_event.is_set():
                     self.session_started_event.wait(timeout=0.1)
                 if self.__failed_send_stanza is not None:
-                    data = self.__failed_send_stanza
+                    data, queued = self.__failed_send_stanza
                     self.__failed_send_stanza = None
                 else:
                     try:
-                        data = self.send_queue.get(True, 1)
+                        data, queued = self.__take_send_queue()
                     except QueueEmpty:
                         continue
-                log.debug("SEND: %s", data)
-                enc_data = data.encode('utf-8')
+                enc_data = data
                 total = len(enc_data)
                 sent = 0
                 count = 0
@@ -1719,12 +1870,14 @@ class XMLStream(object):
                                 tries += 1
                     if count > 1:
                         log.debug('SENT: %d chunks', count)
-                    self.send_queue.task_done()
+                    self.__count_write(queued, total)
+                    for _ in range(queued):
+                        self.send_queue.task_done()
                 except (Socket.error, ssl.SSLError) as serr:
                     self.event('socket_error', serr, direct=True)
                     log.warning("Failed to send %s", data)
                     if not self.stop.is_set():
-                        self.__failed_send_stanza = data
+                        self.__failed_send_stanza = (data, queued)
                         self._end_thread('send')
                         self.disconnect(self.auto_reconnect, send_close=False)
                         return
@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of the per-stanza stream handler dispatch cost during a
+presence storm.
+
+A client is set up with the plugins emesene registers and a number of
+pending iq requests, then a burst of presence stanzas is dispatched
+through the stream. The indexed dispatch is compared with testing every
+registered handler against every stanza, as was done before handlers
+were indexed.
+
+    python tests/bench_handler_dispatch.py [stanzas] [pending iqs]
+"""
+
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sleekxmpp import ClientXMPP
+from sleekxmpp.xmlstream import ET
+from sleekxmpp.xmlstream.handler import Waiter
+from sleekxmpp.xmlstream.matcher import MatcherId
+
+
+PLUGINS = ['xep_0004', 'xep_0030', 'xep_0054', 'xep_0153', 'xep_0060',
+           'xep_0199', 'xep_0085', 'xep_0047', 'xep_0065', 'xep_0096',
+           'xep_0198']
+
+PRESENCE = """
+<presence xmlns="jabber:client" from="contact%(n)i@example.com/res"
+          to="tester@localhost/bench">
+  <show>away</show>
+  <status>status %(n)i</status>
+  <priority>%(n)i</priority>
+  <c xmlns="http://jabber.org/protocol/caps" hash="sha-1"
+     node="http://emesene.org" ver="%(n)i" />
+  <x xmlns="vcard-temp:x:update"><photo>%(n)040x</photo></x>
+</presence>
+"""
+
+
+def make_client(pending):
+    xmpp = ClientXMPP('tester@localhost/bench', 'test')
+    for plugin in PLUGINS:
+        xmpp.register_plugin(plugin)
+    # outstanding requests, e.g. the vcards asked for during the storm
+    for n in range(pending):
+        xmpp.register_handler(Waiter('IqWait_%i' % n, MatcherId('req%i' % n)))
+    return xmpp
+
+
+def drain(xmpp):
+    while not xmpp.event_queue.empty():
+        xmpp.event_queue.get_nowait()
+
+
+def linear_dispatch(xmpp, xml):
+    stanza = xmpp._build_stanza(xml)
+    handlers = xmpp._XMLStream__handlers
+    matched = [h for h in handlers if h.match(stanza)]
+    for handler in matched:
+        if len(matched) > 1:
+            copy.copy(stanza)
+    return matched
+
+
+def indexed_dispatch(xmpp, xml):
+    xmpp._XMLStream__spawn_event(xml)
+
+
+def measure(name, xmpp, dispatch, stanzas):
+    drain(xmpp)
+    start = time.time()
+    for xml in stanzas:
+        dispatch(xmpp, xml)
+    elapsed = time.time() - start
+    drain(xmpp)
+    print("%-8s %8.1f us/stanza" % (name, elapsed * 1e6 / len(stanzas)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    pending = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    xmpp = make_client(pending)
+    stanzas = [ET.fromstring(PRESENCE % {'n': n}) for n in range(count)]
+
+    print("%i presence stanzas, %i handlers (%i pending iqs)" % (
+        count, len(xmpp._XMLStream__handlers), pending))
+    measure('linear', xmpp, linear_dispatch, stanzas)
+    measure('indexed', xmpp, indexed_dispatch, stanzas)
+
+
+if __name__ == '__main__':
+    main()
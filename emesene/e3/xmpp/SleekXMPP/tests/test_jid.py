@@ -1,5 +1,6 @@
 from sleekxmpp.test import *
 from sleekxmpp import JID, InvalidJID
+from sleekxmpp import jid as jid_module
 
 
 class TestJIDClass(SleekTest):
@@ -278,5 +279,48 @@ class TestJIDClass(SleekTest):
         #self.assertRaises(InvalidJID, JID, '%s@example.com' % '\\20foo2')
         #self.assertRaises(InvalidJID, JID, '%s@example.com' % 'bar2\\20')
 
+    def testCacheSharesParts(self):
+        """Test that JIDs parsed from the same string share their parts."""
+        first = JID('shared@example.com/res')
+        second = JID('shared@example.com/res')
+        self.assertTrue(first._jid is second._jid)
+        self.assertTrue(JID(first)._jid is first._jid)
+
+        second.resource = 'other'
+        self.assertEqual(first.full, 'shared@example.com/res')
+        self.assertEqual(JID(first, resource=None).full, 'shared@example.com')
+
+    def testCacheEvictsLeastRecentlyUsed(self):
+        """Test that the JID cache is bounded and keeps recent entries."""
+        old_size = jid_module.JID_CACHE_MAX_SIZE
+        jid_module.JID_CACHE_MAX_SIZE = 3
+        jid_module.JID_CACHE.clear()
+        try:
+            JID('locked@example.com', cache_lock=True)
+            JID('a@example.com')
+            JID('b@example.com')
+            JID('a@example.com')
+            JID('c@example.com')
+
+            keys = [key[0] for key in jid_module.JID_CACHE]
+            self.assertTrue('locked@example.com' in keys)
+            self.assertTrue('a@example.com' in keys)
+            self.assertFalse('b@example.com' in keys)
+            self.assertEqual(len(keys), 3)
+        finally:
+            jid_module.JID_CACHE_MAX_SIZE = old_size
+
+    def testCacheStats(self):
+        """Test that the JID cache reports its hit rate."""
+        before = jid_module.jid_cache_stats()
+        JID('stats@example.com/one')
+        JID('stats@example.com/one')
+        JID('stats@example.com/one')
+        after = jid_module.jid_cache_stats()
+
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+        self.assertTrue(0 < after['hit_rate'] <= 1)
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestJIDClass)
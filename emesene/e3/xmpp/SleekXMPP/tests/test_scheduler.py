@@ -0,0 +1,123 @@
+import threading
+import time
+
+from sleekxmpp.test import *
+from sleekxmpp.xmlstream import Scheduler
+
+
+class TestScheduler(SleekTest):
+
+    """Test the timed task scheduler."""
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.scheduler = Scheduler(self.stop)
+        self.scheduler.process(threaded=True, daemon=True)
+        self.ran = []
+        self.ran_lock = threading.Lock()
+
+    def tearDown(self):
+        self.stop.set()
+        self.scheduler.wake()
+        self.scheduler.thread.join(1)
+        self.assertFalse(self.scheduler.thread.is_alive(),
+                         "Scheduler thread was not stopped")
+
+    def record(self, name):
+        with self.ran_lock:
+            self.ran.append(name)
+
+    def add(self, name, seconds, repeat=False):
+        return self.scheduler.add(name, seconds, self.record, args=(name,),
+                                  repeat=repeat)
+
+    def testOrdering(self):
+        """Test that tasks run in the order they are due."""
+        self.add('third', 0.3)
+        self.add('first', 0.1)
+        self.add('second', 0.2)
+        self.add('also first', 0.1)
+
+        time.sleep(0.5)
+        self.assertEqual(self.ran, ['first', 'also first', 'second', 'third'])
+        self.assertEqual(self.scheduler.tasks, {})
+
+    def testEarlierTaskWakesScheduler(self):
+        """Test that adding an earlier task doesn't wait for a later one."""
+        self.add('late', 30)
+        time.sleep(0.1)
+        self.add('early', 0.1)
+
+        time.sleep(0.3)
+        self.assertEqual(self.ran, ['early'])
+
+    def testDuplicateName(self):
+        """Test that a pending task name can't be scheduled twice."""
+        self.add('task', 30)
+        self.assertRaises(ValueError, self.add, 'task', 30)
+
+    def testRescheduleFromCallback(self):
+        """Test that a task name is free again once the task runs."""
+        def reschedule():
+            self.record('once')
+            self.add('again', 0.05)
+
+        self.scheduler.add('again', 0.05, reschedule)
+
+        time.sleep(0.3)
+        self.assertEqual(self.ran, ['once', 'again'])
+
+    def testRemove(self):
+        """Test removing a task by name before it runs."""
+        self.add('removed', 0.1)
+        self.add('kept', 0.1)
+        self.scheduler.remove('removed')
+        self.scheduler.remove('unknown')
+
+        time.sleep(0.3)
+        self.assertEqual(self.ran, ['kept'])
+
+        # the name may be used again once removed
+        self.add('removed', 0.1)
+        time.sleep(0.3)
+        self.assertEqual(self.ran, ['kept', 'removed'])
+
+    def testCancelHandle(self):
+        """Test cancelling a task through the handle returned by add."""
+        task = self.add('cancelled', 0.1)
+        task.cancel()
+
+        time.sleep(0.3)
+        self.assertEqual(self.ran, [])
+        self.assertFalse('cancelled' in self.scheduler.tasks)
+
+    def testRepeat(self):
+        """Test that repeated tasks run until they are cancelled."""
+        task = self.add('repeated', 0.05, repeat=True)
+
+        time.sleep(0.28)
+        task.cancel()
+        count = len(self.ran)
+        self.assertTrue(count >= 3, "Task only ran %s times" % count)
+
+        time.sleep(0.2)
+        self.assertEqual(len(self.ran), count)
+
+    def testCancelledEntriesCompacted(self):
+        """Test that cancelled tasks don't pile up in the schedule."""
+        self.add('repeated', 30, repeat=True)
+        for i in range(200):
+            self.add('timeout %s' % i, 30).cancel()
+
+        self.assertTrue(len(self.scheduler.schedule) < 100)
+        self.assertEqual(list(self.scheduler.tasks), ['repeated'])
+
+    def testStop(self):
+        """Test that the scheduler stops when it has nothing to do."""
+        self.stop.set()
+        self.scheduler.wake()
+        self.scheduler.thread.join(1)
+        self.assertFalse(self.scheduler.thread.is_alive())
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestScheduler)
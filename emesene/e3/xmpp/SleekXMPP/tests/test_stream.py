@@ -75,5 +75,55 @@ class TestStreamTester(SleekTest):
         self.failUnless('socket_error' in events,
                 "Stream error event not raised: %s" % events)
 
+    def testCoalescedWrites(self):
+        """Test that queued stanzas are written to the socket at once."""
+        self.stream_start()
+        self.xmpp.send_buffer_size = 4096
+        self.xmpp.send_flush_delay = 0.2
+
+        self.xmpp.send_raw('<a />')
+        self.xmpp.send_raw('<b />')
+        self.xmpp.send_raw('<c />')
+
+        sent = self.xmpp.socket.next_sent(timeout=1)
+        self.assertEqual(sent, b'<a /><b /><c />')
+
+        stats = self.xmpp.get_send_stats()
+        self.assertEqual(stats['writes'], 1)
+        self.assertEqual(stats['stanzas'], 3)
+        self.assertEqual(stats['max_bytes'], len(sent))
+        self.assertEqual(stats['stanzas_per_write'], 3.0)
+
+    def testWriteBudget(self):
+        """Test that a single write holds at most the send buffer size."""
+        self.stream_start()
+        self.xmpp.send_buffer_size = 10
+        self.xmpp.send_flush_delay = 0.2
+
+        self.xmpp.send_raw('<a />')
+        self.xmpp.send_raw('<b />')
+        self.xmpp.send_raw('<c />')
+
+        self.assertEqual(self.xmpp.socket.next_sent(timeout=1),
+                         b'<a /><b />')
+        self.assertEqual(self.xmpp.socket.next_sent(timeout=1), b'<c />')
+        self.assertEqual(self.xmpp.get_send_stats()['max_stanzas'], 2)
+
+    def testWriteBudgetNotExceeded(self):
+        """Test that a stanza that doesn't fit waits for the next write."""
+        self.stream_start()
+        self.xmpp.send_buffer_size = 8
+        self.xmpp.send_flush_delay = 0.2
+
+        self.xmpp.send_raw('<a />')
+        self.xmpp.send_raw('<large-stanza />')
+        self.xmpp.send_raw('<b />')
+
+        self.assertEqual(self.xmpp.socket.next_sent(timeout=1), b'<a />')
+        self.assertEqual(self.xmpp.socket.next_sent(timeout=1),
+                         b'<large-stanza />')
+        self.assertEqual(self.xmpp.socket.next_sent(timeout=1), b'<b />')
+        self.assertEqual(self.xmpp.get_send_stats()['max_bytes'], 16)
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestStreamTester)
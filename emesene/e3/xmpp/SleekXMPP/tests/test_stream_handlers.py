@@ -197,5 +197,71 @@ class TestHandlers(SleekTest):
           </message>
         """)
 
+    def testIndexedHandlers(self):
+        """
+        Test that handlers indexed by stanza type only see stanzas of
+        that type, in the order handlers were registered.
+        """
+        events = []
+
+        def make_callback(name, matcher):
+            def callback(stanza):
+                events.append(name)
+            self.xmpp.register_handler(Callback(name, matcher, callback))
+
+        make_callback('chat', StanzaPath('message@type=chat'))
+        make_callback('any', MatchMany([MatchXPath('{test}tester'),
+                                        StanzaPath('message')]))
+        make_callback('normal', StanzaPath('message@type=normal'))
+        make_callback('body', MatchXPath('{jabber:client}message'
+                                         '/{jabber:client}body'))
+
+        self.recv("""
+          <message type="chat"><body>Testing</body></message>
+        """)
+        self.recv("""
+          <message type="normal" />
+        """)
+
+        time.sleep(0.2)
+
+        self.assertEqual(events, ['chat', 'any', 'body', 'any', 'normal'])
+
+    def testHandlersGetCopies(self):
+        """
+        Test that handlers matching the same stanza are given their own
+        copy of it, unless they declare it can be shared.
+        """
+        payloads = {}
+
+        def capture(stanza):
+            payloads['original'] = stanza
+            return stanza
+
+        self.xmpp.add_filter('in', capture)
+
+        def make_callback(name, shared):
+            def callback(stanza):
+                payloads[name] = stanza
+            self.xmpp.register_handler(Callback(name,
+                                                MatchXPath('{test}tester'),
+                                                callback,
+                                                shared=shared))
+
+        make_callback('reader 1', True)
+        make_callback('reader 2', True)
+        make_callback('writer 1', False)
+        make_callback('writer 2', False)
+
+        self.recv("""<tester xmlns="test" />""")
+
+        time.sleep(0.2)
+
+        self.assertTrue(payloads['reader 1'] is payloads['original'])
+        self.assertTrue(payloads['reader 2'] is payloads['original'])
+        self.assertFalse(payloads['writer 1'] is payloads['reader 1'])
+        self.assertFalse(payloads['writer 2'] is payloads['reader 1'])
+        self.assertFalse(payloads['writer 1'] is payloads['writer 2'])
+
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestHandlers)
@@ -0,0 +1,301 @@
+import os
+import socket
+import struct
+import threading
+
+from hashlib import sha1
+
+from sleekxmpp.test import *
+from sleekxmpp.xmlstream import JID
+from sleekxmpp.plugins.xep_0096 import SOCKS5, IBB
+
+
+IBB_NS = 'http://jabber.org/protocol/ibb'
+S5B_NS = 'http://jabber.org/protocol/bytestreams'
+
+
+def recv_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise socket.error('connection closed')
+        data += chunk
+    return data
+
+
+class FakeStreamhost(threading.Thread):
+
+    """
+    A minimal SOCKS5 bytestream proxy listening on the loopback
+    interface. Both ends of a bytestream connect to it and the data
+    is relayed once the requester activates the stream.
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def run(self):
+        while True:
+            try:
+                conn, addr = self.server.accept()
+                # greeting: no authentication
+                recv_exact(conn, 3)
+                conn.sendall(b'\x05\x00')
+                # connect request to the SHA1 hashed destination
+                header = recv_exact(conn, 5)
+                dest = recv_exact(conn, ord(header[4:5]))
+                recv_exact(conn, 2)
+                conn.sendall(b'\x05\x00\x00\x03' + header[4:5] + dest +
+                             struct.pack('>H', 0))
+            except socket.error:
+                return
+            with self.lock:
+                self.pending.setdefault(dest, []).append(conn)
+
+    def activate(self, sid, requester, target):
+        digest = sha1()
+        digest.update(sid)
+        digest.update(requester)
+        digest.update(target)
+        with self.lock:
+            first, second = self.pending.pop(digest.hexdigest())
+        for src, dst in ((first, second), (second, first)):
+            relay = threading.Thread(target=self.relay, args=(src, dst))
+            relay.daemon = True
+            relay.start()
+
+    def relay(self, src, dst):
+        while True:
+            try:
+                data = src.recv(65536)
+            except socket.error:
+                data = b''
+            if not data:
+                break
+            dst.sendall(data)
+        for conn in (src, dst):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def close(self):
+        self.server.close()
+
+
+class FakeServer(object):
+
+    """
+    Routes the stanzas sent by the test clients to each other, and
+    answers the queries addressed to the server and its bytestream
+    proxy component.
+    """
+
+    def __init__(self, streamhost=None):
+        self.streamhost = streamhost
+        self.clients = {}
+        self.running = True
+        self.threads = []
+        # unacknowledged IBB data iqs, to check the send window
+        self.inflight = set()
+        self.max_inflight = 0
+
+    def add_client(self, client):
+        self.clients[client.boundjid.full] = client
+        thread = threading.Thread(target=self.route, args=(client,))
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+
+    def route(self, client):
+        while self.running:
+            data = client.socket.next_sent(timeout=0.1)
+            if not data:
+                continue
+            try:
+                xml = ET.fromstring(data)
+            except SyntaxError:
+                continue
+            if xml.tag.split('}')[-1] != 'iq':
+                continue
+            if not xml.get('from'):
+                xml.set('from', client.boundjid.full)
+
+            self.track_window(xml)
+
+            to = xml.get('to')
+            if to in self.clients:
+                self.clients[to].socket.recv_data(ET.tostring(xml))
+            elif xml.get('type') in ('get', 'set'):
+                self.answer(client, xml)
+
+    def track_window(self, xml):
+        key = (JID(xml.get('from')).full, xml.get('id'))
+        if xml.find('{%s}data' % IBB_NS) is not None:
+            self.inflight.add((JID(xml.get('to')).full, xml.get('id')))
+            self.max_inflight = max(self.max_inflight, len(self.inflight))
+        elif xml.get('type') == 'result':
+            self.inflight.discard(key)
+
+    def answer(self, client, xml):
+        query = xml.find('{%s}query' % S5B_NS)
+        if xml.find('{http://jabber.org/protocol/disco#items}query') \
+                is not None:
+            items = ''
+            if self.streamhost is not None:
+                items = '<item jid="proxy.localhost" />'
+            payload = ('<query xmlns="http://jabber.org/protocol/disco#items">'
+                       '%s</query>' % items)
+        elif xml.find('{http://jabber.org/protocol/disco#info}query') \
+                is not None:
+            payload = ('<query xmlns="http://jabber.org/protocol/disco#info">'
+                       '<identity category="proxy" type="bytestreams" />'
+                       '</query>')
+        elif query is not None and xml.get('type') == 'get':
+            payload = ('<query xmlns="%s"><streamhost jid="proxy.localhost" '
+                       'host="127.0.0.1" port="%s" /></query>' % (
+                           S5B_NS, self.streamhost.port))
+        elif query is not None:
+            self.streamhost.activate(query.get('sid'), xml.get('from'),
+                                     query.find('{%s}activate' % S5B_NS).text)
+            payload = ''
+        else:
+            payload = ''
+        client.socket.recv_data(
+            '<iq type="result" id="%s" from="%s" to="%s">%s</iq>' % (
+                xml.get('id'), xml.get('to'), xml.get('from'), payload))
+
+
+class TestFileTransfer(SleekTest):
+
+    """
+    Transfer files between two in-process clients connected to a
+    local fake server.
+    """
+
+    plugins = ['xep_0030', 'xep_0004', 'xep_0047', 'xep_0065', 'xep_0096']
+
+    def setUp(self):
+        self.streamhost = FakeStreamhost()
+        self.streamhost.start()
+        self.server = FakeServer(self.streamhost)
+
+        self.stream_start(jid='receiver@localhost/test',
+                          plugins=self.plugins,
+                          plugin_config={'xep_0047': {'queue_data': False}})
+        self.receiver = self.xmpp
+        self.receiver._id_prefix = 'r'
+
+        self.stream_start(jid='sender@localhost/test',
+                          plugins=self.plugins,
+                          plugin_config={'xep_0047': {'window_size': 8}})
+        self.sender = self.xmpp
+        self.sender._id_prefix = 's'
+
+        self.server.add_client(self.receiver)
+        self.server.add_client(self.sender)
+
+        self.data = os.urandom(100 * 1024)
+        self.received = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.server.stop()
+        self.streamhost.close()
+        for client in (self.receiver, self.sender):
+            self.xmpp = client
+            self.stream_close()
+
+    def accept_offers(self, method):
+        def on_offer(iq):
+            # replying reuses the iq, keep what was offered
+            self.offer = (iq['si']['file']['name'], iq['si']['file']['size'])
+            if method is None:
+                self.receiver['xep_0096'].decline(iq)
+            else:
+                self.receiver['xep_0096'].accept(iq, method)
+
+        self.receiver.add_event_handler('si_file_offer', on_offer)
+
+    def collect_data(self, data_event, end_event):
+        def on_data(event):
+            self.received.append(event['data'])
+
+        def on_end(event):
+            self.done.set()
+
+        self.receiver.add_event_handler(data_event, on_data)
+        self.receiver.add_event_handler(end_event, on_end)
+
+    def testIBBTransfer(self):
+        """Test a file transfer over a windowed in-band bytestream"""
+        self.accept_offers(IBB)
+        self.collect_data('ibb_stream_data', 'ibb_stream_end')
+
+        resp = self.sender['xep_0096'].offer('receiver@localhost/test',
+                                             'test.bin', len(self.data),
+                                             methods=(IBB,), sid='ibb1')
+        self.assertEqual(resp['si']['feature_neg']['stream_method'], IBB)
+        self.assertEqual(self.offer, ('test.bin', len(self.data)))
+
+        stream = self.sender['xep_0047'].open_stream('receiver@localhost/test',
+                                                     sid='ibb1')
+        self.assertEqual(stream.window_size, 8)
+        stream.sendall(self.data)
+        stream.window_empty.wait(10)
+        stream.close()
+
+        self.assertTrue(self.done.wait(10), 'Stream was not closed')
+        self.assertEqual(b''.join(self.received), self.data)
+        self.assertTrue(self.server.max_inflight > 1,
+                        'IBB data was sent one block at a time')
+
+    def testSocks5Transfer(self):
+        """Test a file transfer over a SOCKS5 bytestream"""
+        self.accept_offers(SOCKS5)
+        self.collect_data('socks_recv', 'socks_closed')
+
+        connected = threading.Event()
+        self.sender.add_event_handler('socks_connected',
+                                      lambda sid: connected.set())
+
+        s5b = self.sender['xep_0065']
+        self.assertEqual(s5b.discover_proxy(), 'proxy.localhost')
+
+        resp = self.sender['xep_0096'].offer('receiver@localhost/test',
+                                             'test.bin', len(self.data),
+                                             sid='s5b1')
+        self.assertEqual(resp['si']['feature_neg']['stream_method'], SOCKS5)
+
+        s5b.handshake('receiver@localhost/test', streamer='proxy.localhost',
+                      sid='s5b1')
+        self.assertTrue(connected.wait(10), 'Bytestream was not activated')
+        for pos in range(0, len(self.data), 16384):
+            s5b.send('s5b1', self.data[pos:pos + 16384])
+        s5b.deactivate('s5b1')
+
+        self.assertTrue(self.done.wait(10), 'Stream was not closed')
+        self.assertEqual(b''.join(self.received), self.data)
+
+    def testDeclinedOffer(self):
+        """Test declining a file transfer offer"""
+        self.accept_offers(None)
+
+        self.assertRaises(IqError, self.sender['xep_0096'].offer,
+                          'receiver@localhost/test', 'test.bin', 10)
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestFileTransfer)
@@ -0,0 +1,78 @@
+import time
+
+from sleekxmpp.test import *
+
+
+class TestStreamManagement(SleekTest):
+
+    def setUp(self):
+        self.stream_start(plugins=['xep_0198'])
+        self.sm = self.xmpp['xep_0198']
+
+    def tearDown(self):
+        self.stream_close()
+
+    def lose_connection(self):
+        """Enable stream management and pause the send loop as if the
+        connection had been dropped."""
+        self.sm.enabled.set()
+        self.sm.sm_id = 'session-1'
+        self.xmpp.session_started_event.clear()
+
+    def testResumeResendsQueuedStanzasOnce(self):
+        """Test resuming a stream sends each unacked stanza once"""
+        self.lose_connection()
+
+        self.xmpp.send_message(mto='user@localhost', mbody='first')
+        self.xmpp.send_message(mto='user@localhost', mbody='second')
+        self.assertEqual(len(self.sm.unacked_queue), 2)
+
+        self.recv("""
+          <resumed xmlns="urn:xmpp:sm:3" h="0" previd="session-1" />
+        """)
+
+        self.send("""
+          <message to="user@localhost"><body>first</body></message>
+        """)
+        self.send("""
+          <message to="user@localhost"><body>second</body></message>
+        """)
+        self.send("""<r xmlns="urn:xmpp:sm:3" />""")
+        self.send(None)
+
+    def testResumeSkipsAckedStanzas(self):
+        """Test resuming a stream does not resend acked stanzas"""
+        self.lose_connection()
+
+        self.xmpp.send_message(mto='user@localhost', mbody='first')
+        self.xmpp.send_message(mto='user@localhost', mbody='second')
+
+        self.recv("""
+          <resumed xmlns="urn:xmpp:sm:3" h="1" previd="session-1" />
+        """)
+
+        self.send("""
+          <message to="user@localhost"><body>second</body></message>
+        """)
+        self.send("""<r xmlns="urn:xmpp:sm:3" />""")
+        self.send(None)
+        self.assertEqual(len(self.sm.unacked_queue), 1)
+
+    def testFailedResumeResetsState(self):
+        """Test a failed resumption forgets the previous stream"""
+        self.lose_connection()
+        self.xmpp.send_message(mto='user@localhost', mbody='first')
+
+        self.recv("""
+          <failed xmlns="urn:xmpp:sm:3">
+            <item-not-found xmlns="urn:ietf:params:xml:ns:xmpp-stanzas" />
+          </failed>
+        """)
+        time.sleep(0.2)
+
+        self.assertEqual(self.sm.sm_id, None)
+        self.assertEqual(self.sm.seq, 0)
+        self.assertEqual(len(self.sm.unacked_queue), 0)
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(TestStreamManagement)
@@ -22,11 +22,16 @@
 import os
 import sys
 import time
+import uuid
+import socket
 import hashlib
+import threading
 import e3
 import StringIO
 import logging
 
+from e3.common import FileSource
+
 log = logging.getLogger('xmpp.Worker')
 
 sleekpath = os.path.abspath("e3" + os.sep + "xmpp" + os.sep + "SleekXMPP")
@@ -34,6 +39,9 @@ if os.path.exists(sleekpath):
     sys.path.insert(0, sleekpath)
 
 import sleekxmpp as xmpp
+from sleekxmpp.exceptions import IqError, IqTimeout
+from sleekxmpp.jid import jid_cache_stats
+from sleekxmpp.plugins.xep_0096 import SOCKS5, IBB
 
 STATUS_MAP = {}
 STATUS_MAP[e3.status.BUSY] = 'dnd'
@@ -49,6 +57,17 @@ STATUS_MAP_REVERSE['xa'] = e3.status.IDLE
 STATUS_MAP_REVERSE['chat'] = e3.status.ONLINE
 STATUS_MAP_REVERSE['unavailable'] = e3.status.OFFLINE
 
+# minimum time between two filetransfer progress events of a transfer
+FT_PROGRESS_INTERVAL = 0.25
+# bytes read from disk at once when sending over a socks5 bytestream
+FT_CHUNK_SIZE = 65536
+# seconds to wait for the socks5 bytestream to be activated
+FT_CONNECT_TIMEOUT = 30
+# maximum seconds to wait for a dropped stream to be resumed
+SM_RESUME_TIMEOUT = 60
+# seconds to gather presence updates before applying them at once
+PRESENCE_FLUSH_INTERVAL = 0.5
+
 class Worker(e3.Worker):
     '''xmpp's Worker thread'''
 
@@ -76,6 +95,26 @@ class Worker(e3.Worker):
         self.rconversations = {}
         self.roster = None
 
+        # file transfers are keyed by their stream id, the worker, the
+        # sleekxmpp event thread and the transfer threads change them
+        # while holding ftlock
+        self.ftlock = threading.RLock()
+        self.filetransfers = {}
+        self.rfiletransfers = {}
+        self.ftoffers = {}
+        self.ftmethods = {}
+        self.ftbuffers = {}
+        self.ftprogress = {}
+        self.ftconnected = {}
+        self.socks5_proxy = None
+
+        self.resume_timer = None
+        self.resume_timeout = SM_RESUME_TIMEOUT
+
+        # latest (status, message) received from each contact since the
+        # last presence flush, keyed by account
+        self.pending_presences = {}
+
     def _session_started(self, event):
         '''Process the session_start event'''
         self.client.get_roster(block=True)
@@ -128,35 +167,67 @@ class Worker(e3.Worker):
         e3.base.Worker._handle_action_change_status(self, status_)
 
     def _on_presence(self, presence):
-        '''handle the reception of a presence message'''
-        message = presence['status']
+        '''handle the reception of a presence message, presences are
+        gathered for a while so that a presence storm only updates the
+        gui once'''
         show = presence.get_type()
         account = presence.get_from().bare
 
-        stat = STATUS_MAP_REVERSE.get(show, e3.status.ONLINE)
-        contact = self.session.contacts.contacts.get(account, None)
+        if not self.pending_presences:
+            self.client.schedule('Presence flush', PRESENCE_FLUSH_INTERVAL,
+                self._flush_presences)
 
-        if not contact:
-            contact = e3.Contact(account)
-            self.session.contacts.contacts[account] = contact
+        self.pending_presences[account] = (
+            STATUS_MAP_REVERSE.get(show, e3.status.ONLINE),
+            presence['status'])
+
+    def _flush_presences(self):
+        '''apply the latest presence of each contact received since the
+        last flush, report the real changes in a single event'''
+        pending = self.pending_presences
+        self.pending_presences = {}
+        changes = []
+        logs = []
+
+        for account, (stat, message) in pending.iteritems():
+            contact = self.session.contacts.contacts.get(account, None)
+
+            if not contact:
+                contact = e3.Contact(account)
+                self.session.contacts.contacts[account] = contact
+
+            old_message = contact.message
+            old_status = contact.status
+            contact.message = message
+            contact.status = stat
+
+            if old_status == stat and old_message == message:
+                continue
 
-        old_message = contact.message
-        old_status = contact.status
-        contact.message = message
-        contact.status = stat
+            log_account = e3.Logger.Account(contact.cid, None,
+                contact.account, contact.status, contact.nick,
+                contact.message, contact.picture)
 
-        log_account = e3.Logger.Account(contact.cid, None,
-            contact.account, contact.status, contact.nick, contact.message,
-            contact.picture)
+            if old_status != stat:
+                changes.append((account, 'status', old_status))
+                logs.append(('status change', stat, str(stat), log_account,
+                    None, None))
 
-        if old_status != stat:
-            self.session.contact_attr_changed(account, 'status', old_status)
-            self.session.log('status change', stat, str(stat), log_account)
+            if old_message != message:
+                changes.append((account, 'message', old_message))
+                logs.append(('message change', stat, message, log_account,
+                    None, None))
 
-        if old_message != contact.message:
-            self.session.contact_attr_changed(account, 'message', old_message)
-            self.session.log('message change', contact.status,
-                contact.message, log_account)
+        if changes:
+            self.session.contacts_attr_changed(changes)
+
+        if logs:
+            self.session.logs(logs)
+
+    def _drop_presences(self):
+        '''forget the presences waiting to be flushed'''
+        self.client.scheduler.remove('Presence flush')
+        self.pending_presences = {}
 
     def _on_vcard_get(self, stanza):
         ''' vcard_get callback '''
@@ -295,6 +366,42 @@ class Worker(e3.Worker):
         if not self.session._is_facebook:
             self.client.register_plugin('xep_0199', {'keepalive': True, 'frequency': 60})
 
+        # file transfers, facebook doesn't support them
+        if not self.session._is_facebook:
+            block_size = self.session.config.get_or_set(
+                'i_ft_ibb_block_size', 4096)
+            window_size = self.session.config.get_or_set(
+                'i_ft_ibb_window', 8)
+            self.client.register_plugin('xep_0047', {  # In-Band Bytestreams
+                'block_size': block_size,
+                'max_block_size': max(block_size, 8192),
+                'window_size': window_size,
+                'queue_data': False})
+            self.client.register_plugin('xep_0065')  # SOCKS5 Bytestreams
+            self.client.register_plugin('xep_0096')  # SI File Transfer
+
+            self.client.add_event_handler('si_file_offer',
+                self._on_ft_offer)
+            self.client.add_event_handler('ibb_stream_data',
+                self._on_ibb_stream_data)
+            self.client.add_event_handler('ibb_stream_end',
+                self._on_ibb_stream_end)
+            self.client.add_event_handler('socks_connected',
+                self._on_socks_connected)
+            self.client.add_event_handler('socks_recv', self._on_socks_recv)
+            self.client.add_event_handler('socks_closed',
+                self._on_socks_closed)
+
+        # Stream management, a dropped connection is resumed without
+        # fetching the roster and presences again, and unacked stanzas
+        # are sent again.
+        self.client.register_plugin('xep_0198', {
+            'window': self.session.config.get_or_set('i_sm_ack_window', 5)})
+        self.client.add_event_handler('sm_enabled', self._on_sm_enabled)
+        self.client.add_event_handler('sm_failed', self._on_sm_failed)
+        self.client.add_event_handler('session_resumed',
+            self._on_session_resumed)
+
         #facebook support typing notification with xep-85
         if self.session._is_facebook:
             self.client.register_plugin('xep_0085')
@@ -325,8 +432,70 @@ class Worker(e3.Worker):
 
     def _on_disconnected(self, event):
         '''called when the server disconnect us'''
+        self._log_stats()
+
+        if self.client.auto_reconnect and \
+           self.client.plugin['xep_0198'].sm_id:
+            # the client reconnects on its own, only tell the gui if the
+            # stream can't be resumed
+            log.info("Connection lost, resuming the stream")
+            if self.resume_timer is None:
+                self.resume_timer = threading.Timer(self.resume_timeout,
+                    self._on_resume_timeout)
+                self.resume_timer.daemon = True
+                self.resume_timer.start()
+            return
+
+        self._cancel_resume_timer()
+        self._drop_presences()
+        self.session.disconnected(None, False)
+
+    def _log_stats(self):
+        '''log how well the hot paths of the stream performed'''
+        send = self.client.get_send_stats()
+        jids = jid_cache_stats()
+        log.debug("%d socket writes, %.1f stanzas and %.0f bytes per write",
+            send['writes'], send['stanzas_per_write'], send['bytes_per_write'])
+        log.debug("JID cache: %d entries, %.1f%% hit rate",
+            jids['size'], jids['hit_rate'] * 100)
+
+    def _cancel_resume_timer(self):
+        '''stop waiting for the stream to be resumed'''
+        if self.resume_timer is not None:
+            self.resume_timer.cancel()
+            self.resume_timer = None
+
+    def _on_resume_timeout(self):
+        '''the stream wasn't resumed in time, give up'''
+        self.resume_timer = None
+        log.info("Stream not resumed, disconnecting")
+        self.client.auto_reconnect = False
+        self.client.abort()
         self.session.disconnected(None, False)
 
+    def _on_sm_enabled(self, stanza):
+        '''don't wait longer than the server keeps the stream resumable'''
+        try:
+            self.resume_timeout = min(SM_RESUME_TIMEOUT, int(stanza['max']))
+        except ValueError:
+            self.resume_timeout = SM_RESUME_TIMEOUT
+
+    def _on_session_resumed(self, stanza):
+        '''the dropped stream was resumed'''
+        log.info("Stream resumed")
+        self._cancel_resume_timer()
+
+    def _on_sm_failed(self, stanza):
+        '''the server refused to enable or resume stream management'''
+        if self.resume_timer is None:
+            return
+
+        # the session is gone, log in again instead of starting a new
+        # one behind the gui's back
+        log.info("Stream can't be resumed, disconnecting")
+        self._cancel_resume_timer()
+        self.client.disconnect(reconnect=False, wait=False)
+
     def _on_failed_auth(self, direct):
         self.session.disconnected(_("Authentication failed"), False)
 
@@ -465,3 +634,349 @@ class Worker(e3.Worker):
             msg.send()
 
         e3.Logger.log_message(self.session, recipients, message, True)
+
+    # ft handlers
+    def _ft_full_jid(self, account):
+        '''return the full jid of the resource of account with the highest
+        priority, None if the contact is offline'''
+        resources = self.client.client_roster.presence(account)
+        if not resources:
+            return None
+
+        resource = max(resources, key=lambda res: resources[res]['priority'])
+        return '%s/%s' % (account, resource)
+
+    def _ft_close(self, sid):
+        '''forget the transfer sid, return its FileTransfer or None'''
+        with self.ftlock:
+            self.ftoffers.pop(sid, None)
+            self.ftmethods.pop(sid, None)
+            self.ftprogress.pop(sid, None)
+            self.ftconnected.pop(sid, None)
+            transfer = self.filetransfers.pop(sid, None)
+            if transfer is not None:
+                self.rfiletransfers.pop(transfer, None)
+            return transfer
+
+    def _ft_progressed(self, sid, transfer, len_chunk):
+        '''account len_chunk bytes to transfer, without flooding the gui
+        with progress events'''
+        with self.ftlock:
+            transfer.received_data += len_chunk
+
+            now = time.time()
+            if transfer.received_data < transfer.size and \
+               now - self.ftprogress.get(sid, 0) < FT_PROGRESS_INTERVAL:
+                return
+            self.ftprogress[sid] = now
+
+        self.session.filetransfer_progress(transfer)
+
+    def _ft_offer(self, jid, sid):
+        '''offer the file of the transfer sid to jid, runs in its own
+        thread since the proxy discovery blocks'''
+        transfer = self.filetransfers.get(sid)
+        if transfer is None:
+            return
+
+        if self.socks5_proxy is None:
+            try:
+                self.socks5_proxy = \
+                    self.client.plugin['xep_0065'].discover_proxy() or ''
+            except (IqError, IqTimeout):
+                self.socks5_proxy = ''
+
+        # without a streamhost only in-band bytestreams are possible
+        if self.socks5_proxy:
+            methods = (SOCKS5, IBB)
+        else:
+            methods = (IBB,)
+
+        def on_answer(iq):
+            '''called when the receiver accepts or declines the offer'''
+            self._on_ft_offer_answered(jid, sid, iq)
+
+        self.client.plugin['xep_0096'].offer(jid, transfer.filename,
+            transfer.size, methods=methods, sid=sid, block=False,
+            callback=on_answer)
+
+    def _on_ft_offer_answered(self, jid, sid, iq):
+        '''handle the answer to a file transfer offer'''
+        if iq['type'] == 'error':
+            transfer = self._ft_close(sid)
+            if transfer is not None:
+                self.session.filetransfer_rejected(transfer)
+            return
+
+        method = iq['si']['feature_neg']['stream_method']
+        with self.ftlock:
+            if sid not in self.filetransfers:
+                # canceled while waiting for the answer
+                return
+
+            self.ftmethods[sid] = method
+            if method == SOCKS5:
+                self.ftconnected[sid] = threading.Event()
+
+        thread = threading.Thread(target=self._ft_send,
+            args=(jid, sid, method))
+        thread.daemon = True
+        thread.start()
+
+    def _ft_send(self, jid, sid, method):
+        '''send the file of the transfer sid over the negotiated
+        bytestream, the file is read from disk a chunk at a time'''
+        transfer = self.filetransfers.get(sid)
+        if transfer is None:
+            return
+
+        self.session.filetransfer_accepted(transfer)
+        source = FileSource(transfer.completepath)
+
+        try:
+            if method == SOCKS5:
+                s5b = self.client.plugin['xep_0065']
+                connected = self.ftconnected.get(sid)
+                s5b.handshake(jid, streamer=self.socks5_proxy, sid=sid)
+                if connected is None or \
+                   not connected.wait(FT_CONNECT_TIMEOUT):
+                    raise socket.error('bytestream not activated')
+                write = lambda chunk: s5b.send(sid, chunk)
+                chunk_size = FT_CHUNK_SIZE
+            else:
+                stream = self.client.plugin['xep_0047'].open_stream(jid,
+                    sid=sid)
+                write = stream.sendall
+                # fill the whole send window with every read
+                chunk_size = stream.block_size * stream.window_size
+
+            while sid in self.filetransfers:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                write(chunk)
+                self._ft_progressed(sid, transfer, len(chunk))
+
+            if sid not in self.filetransfers:
+                # canceled, the cancel handler closed the bytestream
+                return
+
+            if method == SOCKS5:
+                s5b.deactivate(sid)
+            else:
+                stream.window_empty.wait()
+                stream.close()
+        except (socket.error, IqError, IqTimeout), error:
+            log.error("Sending file %s failed: %s" % (transfer.filename,
+                error))
+            if self._ft_close(sid) is not None:
+                self.session.filetransfer_canceled(transfer)
+            return
+        finally:
+            source.close()
+
+        if self._ft_close(sid) is not None:
+            self.session.filetransfer_completed(transfer)
+
+    def _on_ft_offer(self, iq):
+        '''handle a file transfer offer'''
+        sid = iq['si']['id']
+        account = iq['from'].bare
+        # never trust the remote path
+        filename = os.path.basename(iq['si']['file']['name']) or sid
+
+        contact = self.session.contacts.get(account)
+        if contact is None:
+            contact = e3.Contact(account)
+
+        if account in self.conversations:
+            cid = self.conversations[account]
+        else:
+            cid = time.time()
+            self._handle_action_new_conversation(account, cid)
+            self.session.conv_first_action(cid, [account])
+
+        transfer = e3.base.FileTransfer(sid, filename, contact,
+            iq['si']['file']['size'], None, sender=contact)
+
+        with self.ftlock:
+            self.filetransfers[sid] = transfer
+            self.rfiletransfers[transfer] = sid
+            self.ftoffers[sid] = iq
+
+        self.session.filetransfer_invitation(transfer, cid)
+
+    def _on_socks_connected(self, sid):
+        '''a socks5 bytestream is ready to carry data'''
+        connected = self.ftconnected.get(sid)
+        if connected is not None:
+            connected.set()
+
+    def _on_ibb_stream_data(self, event):
+        '''handle data received over an in-band bytestream'''
+        self._ft_received(event['stream'].sid, event['data'])
+
+    def _on_socks_recv(self, event):
+        '''handle data received over a socks5 bytestream'''
+        self._ft_received(event['sid'], event['data'])
+
+    def _ft_received(self, sid, data):
+        '''write the received data to the temporary file of sid'''
+        # the lock keeps a cancel from removing the buffer while it's
+        # being written
+        with self.ftlock:
+            buffer = self.ftbuffers.get(sid)
+            transfer = self.filetransfers.get(sid)
+            if buffer is None or transfer is None:
+                return
+
+            try:
+                buffer.write(data)
+            except (IOError, OSError), error:
+                log.error("Writing file %s failed: %s" % (buffer.name,
+                    error))
+                failed = True
+            else:
+                failed = False
+                self._ft_progressed(sid, transfer, len(data))
+
+        if failed:
+            self._handle_action_ft_cancel(transfer)
+            self.session.filetransfer_canceled(transfer)
+
+    def _on_ibb_stream_end(self, stream):
+        '''handle the end of an in-band bytestream'''
+        self._ft_stream_closed(stream.sid)
+
+    def _on_socks_closed(self, sid):
+        '''handle the end of a socks5 bytestream'''
+        self._ft_stream_closed(sid)
+
+    def _ft_stream_closed(self, sid):
+        '''the sender closed the bytestream, the transfer is complete if
+        all the data arrived'''
+        with self.ftlock:
+            buffer = self.ftbuffers.pop(sid, None)
+            if buffer is None:
+                # not a transfer we are receiving
+                return
+
+            transfer = self._ft_close(sid)
+
+        if transfer is None:
+            self._ft_remove_buffer(buffer)
+        elif transfer.received_data < transfer.size:
+            self._ft_remove_buffer(buffer)
+            self.session.filetransfer_canceled(transfer)
+        elif self._ft_save_buffer(buffer, transfer):
+            self.session.filetransfer_completed(transfer)
+        else:
+            self.session.filetransfer_canceled(transfer)
+
+    def _handle_action_ft_invite(self, cid, account, filename, completepath,
+            preview_data):
+        '''handle Action.ACTION_FT_INVITE
+        '''
+        size = os.path.getsize(completepath)
+        if not size:
+            # don't try to send empty files
+            return
+
+        jid = self._ft_full_jid(account)
+        if jid is None:
+            log.warning("Can't send %s, %s is offline" % (filename, account))
+            return
+
+        contact = self.session.contacts.get(account)
+        sid = str(uuid.uuid4())
+        transfer = e3.base.FileTransfer(sid, filename, contact, size,
+            preview_data, sender='Me', completepath=completepath)
+
+        with self.ftlock:
+            self.filetransfers[sid] = transfer
+            self.rfiletransfers[transfer] = sid
+
+        self.session.filetransfer_invitation(transfer, cid)
+
+        thread = threading.Thread(target=self._ft_offer, args=(jid, sid))
+        thread.daemon = True
+        thread.start()
+
+    def _handle_action_ft_accept(self, t):
+        '''handle Action.ACTION_FT_ACCEPT
+        '''
+        with self.ftlock:
+            sid = self.rfiletransfers.get(t)
+            iq = self.ftoffers.pop(sid, None)
+
+        if iq is None:
+            # the offer was withdrawn or already answered
+            return
+
+        methods = iq['si']['feature_neg']['stream_methods']
+
+        # prefer the socks5 streamhost, fall back to in-band bytestreams
+        method = None
+        for candidate in (SOCKS5, IBB):
+            if candidate in methods:
+                method = candidate
+                break
+
+        # stream the received chunks to disk instead of keeping them in memory
+        buffer = None
+        if method is not None:
+            buffer = self._ft_create_buffer(t)
+
+        if buffer is None:
+            self.client.plugin['xep_0096'].decline(iq)
+            self._ft_close(sid)
+            self.session.filetransfer_canceled(t)
+            return
+
+        with self.ftlock:
+            canceled = sid not in self.filetransfers
+            if not canceled:
+                self.ftbuffers[sid] = buffer
+                self.ftmethods[sid] = method
+
+        if canceled:
+            self._ft_remove_buffer(buffer)
+            return
+
+        self.client.plugin['xep_0096'].accept(iq, method)
+
+    def _handle_action_ft_reject(self, t):
+        '''handle Action.ACTION_FT_REJECT
+        '''
+        sid = self.rfiletransfers.get(t)
+        if sid is None:
+            return
+
+        iq = self.ftoffers.get(sid)
+        if iq is not None:
+            self.client.plugin['xep_0096'].decline(iq)
+
+        self._ft_close(sid)
+
+    def _handle_action_ft_cancel(self, t):
+        '''handle Action.ACTION_FT_CANCEL
+        '''
+        with self.ftlock:
+            sid = self.rfiletransfers.get(t)
+            if sid is None:
+                # already finished or closed by the other side
+                return
+
+            method = self.ftmethods.get(sid)
+            buffer = self.ftbuffers.pop(sid, None)
+            self._ft_close(sid)
+
+        if method == IBB:
+            stream = self.client.plugin['xep_0047'].streams.get(sid)
+            if stream is not None:
+                stream.close()
+        elif method == SOCKS5:
+            self.client.plugin['xep_0065'].deactivate(sid)
+
+        if buffer is not None:
+            self._ft_remove_buffer(buffer)
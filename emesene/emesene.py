@@ -184,6 +184,7 @@ class Controller(object):
                 single_instance=True)
         if Info.EMESENE_VERSION.endswith("dev"):
             extension.register('session', dummy.Session)
+            extension.register('session', dummy.LoadSession)
 
         if webqq is not None:
             extension.register('session', webqq.Session)
@@ -235,6 +236,9 @@ class Controller(object):
 
         debugger.init(debuglevel=options.debuglevel)
 
+        if options.stats:
+            e3.common.Instrumentation.enable()
+
         if options.version:
             print "Current Emesene Version: " + Info.EMESENE_VERSION
             print "Last Stable Version: " + Info.EMESENE_LAST_STABLE
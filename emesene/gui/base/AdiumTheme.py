@@ -31,6 +31,19 @@ import Plus
 
 DISPLAY_NAME_LIMIT = 25
 
+# the insertion point where consecutive messages are added
+INSERT_RE = re.compile(r'<(div|span) id="insert"></\1>')
+
+# themes may ship their own Template.html, so don't rely on its functions
+PREPEND_SCRIPT = '''(function (html) {
+    var chat = document.getElementById("Chat");
+    var range = document.createRange();
+    range.selectNode(chat);
+    var height = document.body.scrollHeight;
+    chat.insertBefore(range.createContextualFragment(html), chat.firstChild);
+    window.scrollBy(0, document.body.scrollHeight - height);
+})('%s')'''
+
 class AdiumTheme(MetaData):
     '''a class that contains information of a adium theme
     '''
@@ -54,6 +67,8 @@ class AdiumTheme(MetaData):
         self.history_in_next = None
         self.history_out = None
         self.history_out_next = None
+        # message templates parsed into literals and placeholders
+        self.compiled = {}
 
         self._variant = None
         self.default_variant = None
@@ -118,6 +133,14 @@ class AdiumTheme(MetaData):
         if (self.history_out_next is None):
             self.history_out_next = self.outgoing_next
 
+        self.compiled = {}
+        for template in (self.status, self.incoming, self.incoming_next,
+                self.outgoing, self.outgoing_next, self.history_in,
+                self.history_in_next, self.history_out,
+                self.history_out_next):
+            if template is not None:
+                self.compiled[template] = compile_template(template)
+
         #first try load custom Template.html from theme
         template_path = urljoin(self.resources_path, 'Template.html')
         if not os.path.exists(template_path):
@@ -195,6 +218,26 @@ class AdiumTheme(MetaData):
 
         return function
 
+    def format_history(self, msgs):
+        '''return a script that inserts msgs before the current content,
+        keeping the scroll position on the messages that were shown'''
+        html = ''
+        for msg in msgs:
+            if msg.incoming:
+                msg_html = self._format_incoming(msg)
+            else:
+                msg_html = self._format_outgoing(msg)
+
+            if msg.type == "status":
+                msg.first = True
+
+            if msg.first or INSERT_RE.search(html) is None:
+                html = INSERT_RE.sub('', html) + msg_html
+            else:
+                html = INSERT_RE.sub(lambda match: msg_html, html, 1)
+
+        return PREPEND_SCRIPT % INSERT_RE.sub('', html)
+
     def _replace(self, template, msg):
         '''replace the variables on template for the values on msg
         '''
@@ -206,48 +249,21 @@ class AdiumTheme(MetaData):
         if(len(msg.display_name) > DISPLAY_NAME_LIMIT):
             msg.display_name = msg.display_name.decode('utf-8')[0:DISPLAY_NAME_LIMIT] + "..."
 
-        image_path = escape(MarkupParser.path_to_url(msg.image_path))
-        status_path = escape(MarkupParser.path_to_url(msg.status_path))
-
         if msg.style is not None:
             msg.message = style_message(msg.message, msg.style)
-        if msg.alias:
-            template = template.replace('%sender%', escape(msg.alias))
-        else:
-            template = template.replace('%sender%', escape(msg.display_name))
 
-        template = template.replace('%senderScreenName%', escape(msg.sender))
-        template = template.replace('%senderDisplayName%',
-            escape(msg.display_name))
-        template = template.replace('%userIconPath%', image_path)
-        template = template.replace('%senderStatusIcon%',
-            status_path)
-        template = template.replace('%messageDirection%',
-            escape(msg.direction))
+        try:
+            literals, fields = self.compiled[template]
+        except KeyError:
+            literals, fields = self.compiled[template] = \
+                compile_template(template)
 
-        template = template.replace('%message%', escape_no_xml(msg.message))
+        parts = [literals[0]]
+        for field, literal in zip(fields, literals[1:]):
+            parts.append(field(msg))
+            parts.append(literal)
 
-        template = re.sub("%time{(.*?)}%", replace_time, template)
-
-        if msg.timestamp is None:
-            template = template.replace('%time%',
-                escape(time.strftime("%H:%M")))
-        else:
-            def utc_to_local(t):
-                secs = calendar.timegm(t)
-                return time.localtime(secs)
-            l_time = utc_to_local(msg.timestamp.timetuple()) #time.struct_time
-            d_time = datetime.datetime.fromtimestamp(time.mktime(l_time))
-            template = template.replace('%time%',
-                escape(d_time.strftime('%x %X')))
-
-        template = template.replace('%shortTime%',
-            escape(time.strftime("%H:%M")))
-        template = template.replace('%service%', escape(msg.service))
-        template = template.replace('%messageClasses%', escape(msg.classes))
-        template = template.replace('%status%', escape(msg.status))
-
-        return template.replace('\n', '')
+        return ''.join(parts)
 
     def _replace_header_or_footer(self, template, source, target,
             target_display, source_img, target_img):
@@ -330,6 +346,76 @@ class AdiumTheme(MetaData):
 
     variant = property(fget=_get_theme_variant, fset=_set_theme_variant)
 
+def compile_template(template):
+    '''parse a message template into the literal text between placeholders
+    and the functions that return each placeholder's value for a message,
+    so rendering a message is a single concatenation.
+
+    return a tuple (literals, fields), literals has one item more than fields
+    '''
+    literals = []
+    fields = []
+    pos = 0
+
+    for match in PLACEHOLDER_RE.finditer(template):
+        literals.append(template[pos:match.start()].replace('\n', ''))
+        name, time_format = match.groups()
+        if name is None:
+            fields.append(time_field(time_format))
+        else:
+            fields.append(FIELDS[name])
+        pos = match.end()
+
+    literals.append(template[pos:].replace('\n', ''))
+    return literals, fields
+
+def _sender(msg):
+    if msg.alias:
+        return escape(msg.alias)
+    return escape(msg.display_name)
+
+def _time(msg):
+    if msg.timestamp is None:
+        return escape(time.strftime("%H:%M"))
+
+    secs = calendar.timegm(msg.timestamp.timetuple())
+    d_time = datetime.datetime.fromtimestamp(
+        time.mktime(time.localtime(secs)))
+    return escape(d_time.strftime('%x %X'))
+
+def time_field(time_format):
+    '''return the field for a %time{format}% placeholder'''
+    def _format_time(msg):
+        #Python time function differs from adium time
+        #so we try to convert it but if that fails,
+        #we fallback to simple time
+        result = time.strftime(time_format)
+        if result == time_format:
+            return _time(msg)
+        return result
+
+    return _format_time
+
+FIELDS = {
+    'sender': _sender,
+    'senderScreenName': lambda msg: escape(msg.sender),
+    'senderDisplayName': lambda msg: escape(msg.display_name),
+    'userIconPath': lambda msg: escape(
+        MarkupParser.path_to_url(msg.image_path)),
+    'senderStatusIcon': lambda msg: escape(
+        MarkupParser.path_to_url(msg.status_path)),
+    'messageDirection': lambda msg: escape(msg.direction),
+    'message': lambda msg: escape_no_xml(msg.message),
+    'time': _time,
+    'shortTime': lambda msg: escape(time.strftime("%H:%M")),
+    'service': lambda msg: escape(msg.service),
+    'messageClasses': lambda msg: escape(msg.classes),
+    'status': lambda msg: escape(msg.status),
+}
+
+# the placeholders replaced on message templates
+PLACEHOLDER_RE = re.compile('%(' + '|'.join(FIELDS) + ')%|%time{(.*?)}%')
+
 def read_file(*args):
     '''read file if exists and is readable, return None otherwise
     '''
@@ -373,17 +459,6 @@ def unescape(string_):
     '''replace the values on dic_inv keys with the values'''
     return xml.sax.saxutils.unescape(string_, __dic_inv)
 
-def replace_time(match):
-    '''replace the format of the time to it's value'''
-    #Python time function differs from adium time
-    #so we try to convert it but if that fails,
-    #we fallback to simple time
-    format = match.groups()[0]
-    result = time.strftime(match.groups()[0])
-    if result == format:
-        result = '%time%'
-    return result
-
 def style_message(msgtext, style):
     '''add html markupt to msgtext to format the style of the message'''
     message = '<span style="display: inline; white-space: pre-wrap; %s">%s</span>' % (style.to_css(), msgtext)
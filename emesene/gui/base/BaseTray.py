@@ -30,6 +30,8 @@ class BaseTray(object):
         self.handler.session = session
         self.handler.session.signals.contact_attr_changed.subscribe(
             self._on_contact_attr_changed)
+        self.handler.session.signals.contacts_attr_changed.subscribe(
+            self._on_contacts_attr_changed)
         self.handler.session.signals.picture_change_succeed.subscribe(
             self._on_contact_attr_changed)
         self.handler.session.signals.status_change_succeed.subscribe(
@@ -50,6 +52,8 @@ class BaseTray(object):
 
         self.handler.session.signals.contact_attr_changed.unsubscribe(
             self._on_contact_attr_changed)
+        self.handler.session.signals.contacts_attr_changed.unsubscribe(
+            self._on_contacts_attr_changed)
         self.handler.session.signals.picture_change_succeed.unsubscribe(
             self._on_contact_attr_changed)
         self.handler.session.signals.status_change_succeed.unsubscribe(
@@ -104,3 +108,10 @@ class BaseTray(object):
         This is called when a contact changes something
         """
         pass
+
+    def _on_contacts_attr_changed(self, changes):
+        """
+        This is called when many contacts change something at once
+        """
+        for change in changes:
+            self._on_contact_attr_changed(*change)
@@ -116,6 +116,8 @@ class ContactList(object):
         #contact signals
         self.session.signals.contact_attr_changed.subscribe(
             self._on_contact_attr_changed)
+        self.session.signals.contacts_attr_changed.subscribe(
+            self._on_contacts_attr_changed)
         self.session.signals.picture_change_succeed.subscribe(
             self._on_contact_attr_changed)
         self.session.signals.contact_add_succeed.subscribe(
@@ -154,6 +156,8 @@ class ContactList(object):
             self.on_pending_contacts)
         self.session.signals.contact_attr_changed.unsubscribe(
             self._on_contact_attr_changed)
+        self.session.signals.contacts_attr_changed.unsubscribe(
+            self._on_contacts_attr_changed)
         self.session.signals.picture_change_succeed.unsubscribe(
             self._on_contact_attr_changed)
         self.session.signals.contact_add_succeed.unsubscribe(
@@ -227,6 +231,19 @@ class ContactList(object):
 
         self.update_contact(contact)
 
+    def _on_contacts_attr_changed(self, changes):
+        '''called when attributes of many contacts change at once, changes
+        is a list of (account, attribute, old value) tuples
+        '''
+        updated = set()
+
+        for account, what, old in changes:
+            if account in updated:
+                continue
+
+            updated.add(account)
+            self._on_contact_attr_changed(account, what, old)
+
     def _on_add_contact(self, account, *args):
         '''called when we add a contact
         '''
@@ -91,6 +91,8 @@ class Conversation(object):
             self.on_picture_change_succeed)
         self.session.signals.contact_attr_changed.subscribe(
             self.on_contact_attr_changed_succeed)
+        self.session.signals.contacts_attr_changed.subscribe(
+            self.on_contacts_attr_changed_succeed)
 
         self.session.signals.filetransfer_invitation.subscribe(
                 self.on_filetransfer_invitation)
@@ -136,6 +138,8 @@ class Conversation(object):
             self.on_picture_change_succeed)
         self.session.signals.contact_attr_changed.unsubscribe(
             self.on_contact_attr_changed_succeed)
+        self.session.signals.contacts_attr_changed.unsubscribe(
+            self.on_contacts_attr_changed_succeed)
 
         self.session.signals.filetransfer_invitation.unsubscribe(
                 self.on_filetransfer_invitation)
@@ -381,6 +385,22 @@ class Conversation(object):
             if what == 'media':
                 self.update_data()
 
+    def on_contacts_attr_changed_succeed(self, changes):
+        ''' called when many contacts change their attributes at once,
+        update the conversation once'''
+        update_tab = update_data = False
+
+        for account, what, old in changes:
+            if account in self.members and what in ('status', 'nick'):
+                update_tab = True
+            elif what == 'media':
+                update_data = True
+
+        if update_tab:
+            self.update_tab()
+        if update_data:
+            self.update_data()
+
     def set_sensitive(self, is_sensitive, force_sensitive_block_button=False):
         """
         used to make the conversation insensitive while the conversation
@@ -29,7 +29,16 @@ class ConversationManager(object):
         self.session = session
         self.on_last_close = on_last_close
 
+        # cid : conversation
         self.conversations = {}
+        # indexes to find conversations without looking at all of them,
+        # icid : conversation, frozenset(members) : [conversation] and
+        # account : set([conversation])
+        self.conversations_by_icid = {}
+        self.conversations_by_members = {}
+        self.conversations_by_account = {}
+        # conversation : the members it was indexed with
+        self.indexed_members = {}
         self.subscribe_signals()
 
     def subscribe_signals(self):
@@ -91,7 +100,7 @@ class ConversationManager(object):
     def _on_message(self, cid, account, message, cedict=None):
         '''called when a message is received'''
 
-        log.debug('Message received: %f, %s' % (cid, account))
+        log.debug('Message received: %f, %s', cid, account)
 
         conversation = self.has_similar_conversation(cid, [account])
         conversation_tabs = self.session.config.get_or_set(
@@ -109,7 +118,7 @@ class ConversationManager(object):
         else:
             log.error('No conversation found. Available cids are:')
             for conv in self.conversations.itervalues():
-                log.error('%f, %s' % (conv.cid, conv.members))
+                log.error('%f, %s', conv.cid, conv.members)
 
     def _on_user_typing(self, cid, account, *args):
         """
@@ -143,7 +152,7 @@ class ConversationManager(object):
         if conversation is not None:
             conversation.on_send_message_failed(error)
         else:
-            log.debug('conversation %s not found' % cid)
+            log.debug('conversation %s not found', cid)
 
     def _on_contact_joined(self, cid, account):
         '''called when a contact join the conversation'''
@@ -151,6 +160,7 @@ class ConversationManager(object):
 
         if conversation:
             conversation.on_contact_joined(account)
+            self._index(conversation)
         else:
             log.debug('on_contact_joined: conversation is None')
 
@@ -160,6 +170,7 @@ class ConversationManager(object):
 
         if conversation:
             conversation.on_contact_left(account)
+            self._index(conversation)
         else:
             log.debug('on_contact_left: conversation is None')
 
@@ -189,25 +200,26 @@ class ConversationManager(object):
         if not found return None
         '''
         cid = float(cid)
-        log.debug('Looking for conversations with the same cid: %f' % cid)
+        log.debug('Looking for conversations with the same cid: %f', cid)
 
         if cid in self.conversations:
-            log.debug('A similar conversation was found with the same cid: %f' % self.conversations[cid].icid)
+            log.debug('A similar conversation was found with the same cid: %f',
+                self.conversations[cid].icid)
             return self.conversations[cid]
 
         if members is not None:
-            for conversation in self.conversations.itervalues():
-                if conversation.members == members:
-                    log.debug('A similar conversation was found with the '
-                              'same members and cid: %f' % conversation.cid)
-                    return conversation
-
-        for conversation in self.conversations.itervalues():
-            if conversation.icid == cid:
+            conversation = self._find_by_members(frozenset(members))
+            if conversation is not None:
                 log.debug('A similar conversation was found with the '
-                          'same icid: %f' % conversation.icid)
+                          'same members and cid: %f' % conversation.cid)
                 return conversation
 
+        conversation = self.conversations_by_icid.get(cid)
+        if conversation is not None:
+            log.debug('A similar conversation was found with the '
+                      'same icid: %f' % conversation.icid)
+            return conversation
+
         log.debug('No similar conversation was found')
 
         return None
@@ -229,7 +241,8 @@ class ConversationManager(object):
 
         old_cid = conversation.cid
 
-        log.debug('Reusing conversation. Old cid: %f, new cid: %f' % (old_cid, cid))
+        log.debug('Reusing conversation. Old cid: %f, new cid: %f',
+            old_cid, cid)
 
         if old_cid in self.conversations:
             del self.conversations[old_cid]
@@ -250,7 +263,7 @@ class ConversationManager(object):
         object. If the conversation already exists, return True on as first
         value'''
 
-        log.debug('Constructing a new conversation: %f' % cid)
+        log.debug('Constructing a new conversation: %f', cid)
 
         conversation = self.reuse_conversation(cid, members)
 
@@ -261,6 +274,7 @@ class ConversationManager(object):
         conversation = self.add_new_conversation(self.session, cid, members)
         self.conversations[cid] = conversation
         self.session.conversations[cid] = conversation
+        self._index(conversation)
 
         #notify a new conversation has started
         self.session.conv_started(cid, members)
@@ -294,25 +308,88 @@ class ConversationManager(object):
             conversation.set_sensitive(False)
         self.unsubscribe_signals() # but keep alive conversations
 
+    def conversations_with(self, account):
+        '''return the conversations account is a member of'''
+        return [conversation for conversation in
+                self.conversations_by_account.get(account, ())
+                if account in conversation.members]
+
+    def _find_by_members(self, members):
+        '''return the conversation whose members are members, or None'''
+        for conversation in self.conversations_by_members.get(members, ()):
+            # members may have changed since it was indexed
+            if frozenset(conversation.members) == members:
+                return conversation
+
+        # conversations change their members without telling the manager
+        # (see Conversation.update_group_information), look through the
+        # conversations each member was indexed with
+        found = None
+        for account in members:
+            for conversation in self.conversations_by_account.get(account,
+                    ()):
+                if frozenset(conversation.members) == members:
+                    found = conversation
+                    break
+
+            if found is not None:
+                self._index(found)
+                break
+
+        return found
+
+    def _index(self, conversation):
+        '''add conversation to the lookup indexes, or update them if its
+        members changed'''
+        self._unindex(conversation)
+
+        members = frozenset(conversation.members)
+        self.indexed_members[conversation] = members
+        self.conversations_by_icid[conversation.icid] = conversation
+        self.conversations_by_members.setdefault(members,
+                []).append(conversation)
+        for account in members:
+            self.conversations_by_account.setdefault(account,
+                    set()).add(conversation)
+
+    def _unindex(self, conversation):
+        '''remove conversation from the lookup indexes'''
+        members = self.indexed_members.pop(conversation, None)
+        if members is None:
+            return
+
+        if self.conversations_by_icid.get(conversation.icid) is conversation:
+            del self.conversations_by_icid[conversation.icid]
+
+        similar = self.conversations_by_members[members]
+        similar.remove(conversation)
+        if not similar:
+            del self.conversations_by_members[members]
+
+        for account in members:
+            with_account = self.conversations_by_account[account]
+            with_account.discard(conversation)
+            if not with_account:
+                del self.conversations_by_account[account]
+
     def _on_contact_attr_changed(self, account, change_type, old_value,
             do_notify=True):
         '''called when an attribute of a contact changes'''
-        for conversation in self.conversations.values():
-            if account in conversation.members:
-                conversation.update_data()
+        for conversation in self.conversations_with(account):
+            conversation.update_data()
 
     def _on_p2p_finished(self, account, _type, *what):
         ''' called when a p2p is finished - currently custom emoticons only '''
-        for conversation in self.conversations.values():
-            if account in conversation.members:
-                conversation.update_p2p(account, _type, *what)
+        for conversation in self.conversations_with(account):
+            conversation.update_p2p(account, _type, *what)
 
     def close(self, conversation):
         '''close a conversation'''
-        log.debug('Closing conversation: %f' % conversation.cid)
+        log.debug('Closing conversation: %f', conversation.cid)
         self.session.close_conversation(conversation.cid)
         del self.conversations[conversation.cid]
         del self.session.conversations[conversation.cid]
+        self._unindex(conversation)
         self.remove_conversation(conversation)
         conversation.on_close()
 
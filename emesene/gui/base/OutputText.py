@@ -22,6 +22,10 @@ import e3
 class OutputText(object):
     '''Base class to display conversation messages'''
 
+    # True if the output implements prepend_messages and emits
+    # top_reached when scrolled to the top
+    can_prepend = False
+
     def __init__(self, config):
         '''constructor'''
         self.config = config
@@ -37,8 +41,9 @@ class OutputText(object):
         '''add queued messages and then unlock the output'''
         self.locked -= 1
         if self.locked <= 0:
-            for msg in self.pending:
-                self.add_message(msg, self.config.b_allow_auto_scroll)
+            if self.pending:
+                self.add_messages(self.pending,
+                    self.config.b_allow_auto_scroll)
             self.pending = []
             self.locked = 0
 
@@ -70,10 +75,31 @@ class OutputText(object):
         else:
             self.add_message(msg, self.config.b_allow_auto_scroll)
 
+    def append_messages(self, msgs):
+        '''appends a list of msgs into the view at once'''
+        if self.locked:
+            self.pending.extend(msg for msg in msgs
+                if msg.type != e3.Message.TYPE_OLDMSG)
+            msgs = [msg for msg in msgs
+                if msg.type == e3.Message.TYPE_OLDMSG]
+
+        if msgs:
+            self.add_messages(msgs, self.config.b_allow_auto_scroll)
+
     def add_message(self, msg, scroll):
         '''add the message to the output'''
         raise NotImplementedError
 
+    def add_messages(self, msgs, scroll):
+        '''add a list of messages to the output, override it if the
+        output can add many messages faster than one by one'''
+        for msg in msgs:
+            self.add_message(msg, scroll)
+
+    def prepend_messages(self, msgs):
+        '''add a list of older messages before the current content'''
+        raise NotImplementedError
+
     def update_p2p(self, account, _type, *what):
         ''' new p2p data has been received (custom emoticons) '''
         raise NotImplementedError
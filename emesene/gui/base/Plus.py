@@ -17,10 +17,21 @@
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
 import re
+import threading
+
+try:
+    from collections import OrderedDict
+except:
+    from e3.common.OrderedDict import OrderedDict
+
 from e3.common.XmlParser import DictObj
 import gui
 import extension
 
+# number of parsed and stripped strings kept, nicks, messages and group
+# names are rendered again and again by the contact list
+CACHE_SIZE = 2048
+
 COLOR_MAP = (
     'ffffff','000000','00007F','009300','FF0000','7F0000','9C009C','FC7F00',
     'FFFF00','00FC00','009393','00FFFF','0000FC','FF00FF','7F7F7F','D2D2D2',
@@ -242,17 +253,6 @@ class Plus(object):
     def _color_gradient(self, color1, color2, length):
         '''returns a list of colors. Its length is length'''
 
-        def dec2hex(n):
-            """return the hexadecimal string representation of integer n"""
-            if n < 16:
-                return '0' + "%X" % n
-            else:
-                return "%X" % n
-
-        def hex2dec(s):
-            """return the integer value of a hexadecimal string s"""
-            return int('0x' + s, 16)
-
         def full_hex2dec(colorstring):
             """return a tuple containing the integer values of the rgb colors"""
             hex3tohex6 = lambda col: col[0] * 2 + col[1] * 2 + col[2] * 2
@@ -266,8 +266,7 @@ class Plus(object):
                 colorstring = hex3tohex6(colorstring)
 
             r, g, b = colorstring[:2], colorstring[2:4], colorstring[4:]
-            r, g, b = [hex2dec(i.upper()) for i in (r, g, b)]
-            return (r, g, b)
+            return tuple([int(i, 16) for i in (r, g, b)])
 
         if length == 0:
             return
@@ -275,12 +274,15 @@ class Plus(object):
         rgb_tuple1 = full_hex2dec(color1)
         rgb_tuple2 = full_hex2dec(color2)
 
-        colors = [''] * length
-        for color_part in zip(rgb_tuple1, rgb_tuple2):
-            step = (color_part[1] - color_part[0]) / (length - 1.0)
-            for i in range(length - 1):
-                colors[i] += dec2hex(int(color_part[0] + step * i))
-            colors[length - 1] += dec2hex(color_part[1])
+        (red, green, blue) = rgb_tuple1
+        step_red, step_green, step_blue = [(part2 - part1) / (length - 1.0)
+            for part1, part2 in zip(rgb_tuple1, rgb_tuple2)]
+
+        colors = ['%02X%02X%02X' % (int(red + step_red * i),
+                                    int(green + step_green * i),
+                                    int(blue + step_blue * i))
+                  for i in xrange(length - 1)]
+        colors.append('%02X%02X%02X' % rgb_tuple2)
 
         return colors
 
@@ -323,12 +325,12 @@ class Plus(object):
 
         for text in split_msg:
             if special_character_re.match(text):
-                color = colors.pop(0)
+                color = colors.next()
                 result['childs'].append({'tag': attr, attr: color,
                                          'childs': [text]})
                 continue
             for char in text:
-                color = colors.pop(0)
+                color = colors.next()
                 result['childs'].append({'tag': attr, attr: color,
                                          'childs': [char]})
 
@@ -344,8 +346,10 @@ class Plus(object):
             #param_from = COLOR_MAP[int(param_from)]
             #param_to = COLOR_MAP[int(param_to)]
             length = self._nchars_dict(msgdict)
-            if length != 1:
-                colors = self._color_gradient(param_from, param_to, length)
+            if length > 1:
+                # consumed by each string in order
+                colors = iter(self._color_gradient(param_from, param_to,
+                                                   length))
             msgdict['tag'] = ''
             del msgdict[attr]
 
@@ -473,12 +477,53 @@ def msnplus(text, do_parse_emotes=True):
     dictlike = plus.to_dict()
     return DictObj(dictlike)
 
+class _Cache(object):
+    '''a bounded map that drops the least recently used results'''
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, function, *args):
+        '''return the result cached for key, or call function with args and
+        cache what it returns'''
+        with self.lock:
+            try:
+                result = self.items.pop(key)
+                self.items[key] = result
+                return result
+            except KeyError:
+                pass
+
+        result = function(*args)
+
+        with self.lock:
+            self.items[key] = result
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+_cache = _Cache(CACHE_SIZE)
+
 def msnplus_parse(text):
     '''
     given a string with msn+ formatting, give a string with same text but
     with Pango Markup
     @param text The original string
     '''
+    # the markup depends on the toolkit, the type keeps str and unicode
+    # text apart since u'a' == 'a'
+    key = ('parse', extension.get_default('toolkit tags'), type(text), text)
+    return _cache.get(key, _msnplus_parse, text)
+
+def _msnplus_parse(text):
+    '''parse text, see msnplus_parse'''
     text = _escape_special_chars(text)
     dictlike = msnplus(text, False)
     text = _unescape_special_chars(dictlike.to_xml())
@@ -492,6 +537,10 @@ def msnplus_strip(text, useless_arg=None):
     @param useless_arg This is actually useless, and is mantained just for
     compatibility with text
     '''
+    return _cache.get(('strip', type(text), text), _msnplus_strip, text)
+
+def _msnplus_strip(text):
+    '''strip text, see msnplus_strip'''
     text = _escape_special_chars(text)
     plus = Plus(text)
     plus.tags_extract(True)
@@ -25,6 +25,12 @@ import pango
 import os
 import extension
 
+from collections import deque
+try:
+    from collections import OrderedDict
+except ImportError:
+    from e3.common.OrderedDict import OrderedDict
+
 import logging
 log = logging.getLogger('gui.common.GtkNotification')
 
@@ -106,13 +112,21 @@ if os.name == "nt":
         taskbarSize = info.rcMonitor.right - info.rcWork.right
 '''
 
-queue = list()
+# lines of text shown in a notification, the oldest are dropped after that
+MAX_LINES = 10
+
+# title : [lines, picture_path, callback, tooltip] of the notifications
+# waiting to be shown, in the order they arrived
+queue = OrderedDict()
+# the notification being shown
 actual_notification = None
+# the notification window, reused by every notification
+notification_window = None
 
 def GtkNotification(title, text, picture_path=None, const=None,
                     callback=None, tooltip=None):
     global actual_notification
-    global queue
+    global notification_window
 
     # TODO: we can have an option to use a queue or show notifications
     # like the oldNotification plugin of emesene1.6 (WLM-like)
@@ -122,33 +136,25 @@ def GtkNotification(title, text, picture_path=None, const=None,
         title = Plus.msnplus_strip(title)
 
     if actual_notification is None:
-        actual_notification = Notification(title, text, picture_path, callback,
-                                           tooltip)
+        if notification_window is None:
+            notification_window = Notification()
+        actual_notification = notification_window
+        actual_notification.set_notification(title, text.split('\n'),
+                                             picture_path, callback, tooltip)
         actual_notification.show()
-    else:
+    elif actual_notification._title == title:
         # Append text to the actual notification
-        if actual_notification._title == title:
-            actual_notification.append_text(text)
-        else:
-            found = False
-            auxqueue = list()
-            for _title, _text, _picture_path, _callback, _tooltip in queue:
-                if _title == title:
-                    _text = _text + "\n" + text
-                    found = True
-                auxqueue.append([_title,_text,_picture_path, _callback,
-                                 _tooltip])
-
-            if found:
-                # append text to another notification
-                del queue
-                queue = auxqueue
-            else:
-                # or queue a new notification
-                queue.append([title, text, picture_path, callback, tooltip])
+        actual_notification.append_text(text)
+    elif title in queue:
+        # append text to another notification
+        queue[title][0].extend(text.split('\n'))
+    else:
+        # or queue a new notification
+        queue[title] = [deque(text.split('\n'), MAX_LINES), picture_path,
+                        callback, tooltip]
 
 class Notification(gtk.Window):
-    def __init__(self, title, text, picture_path, callback, tooltip):
+    def __init__(self):
 
         gtk.Window.__init__(self, type=gtk.WINDOW_POPUP)
 
@@ -159,36 +165,29 @@ class Notification(gtk.Window):
             self.FColor = "black"
         else:
             self.FColor = "white"
-        max_width = 300
-        self.callback = callback
+        self.max_width = 300
+        self.callback = None
 
         # window attributes
         self.set_border_width(10)
 
         # labels
-        self._title = title #nick
-        markup1 = '<span foreground="%s" weight="ultrabold">%s</span>'
-        titleLabel = gtk.Label(markup1 % (self.FColor, \
-                               MarkupParser.escape(self._title)))
-        titleLabel.set_use_markup(True)
-        titleLabel.set_justify(gtk.JUSTIFY_CENTER)
-        titleLabel.set_ellipsize(pango.ELLIPSIZE_END)
-
-        self.text = text #status, message, etc...
+        self._title = None #nick
+        self.markup1 = '<span foreground="%s" weight="ultrabold">%s</span>'
+        self.titleLabel = gtk.Label()
+        self.titleLabel.set_justify(gtk.JUSTIFY_CENTER)
+        self.titleLabel.set_ellipsize(pango.ELLIPSIZE_END)
+
+        self.lines = deque(maxlen=MAX_LINES) #status, message, etc...
         self.markup2 = '<span foreground="%s">%s</span>'
-        self.messageLabel = gtk.Label(self.markup2 % (self.FColor,
-                                      MarkupParser.escape(self.text)))
-        self.messageLabel.set_use_markup(True)
+        self.messageLabel = gtk.Label()
         self.messageLabel.set_justify(gtk.JUSTIFY_CENTER)
         self.messageLabel.set_ellipsize(pango.ELLIPSIZE_END)
 
         Avatar = extension.get_default('avatar')
 
         # image
-        avatarImage = Avatar(cell_dimension=48)
-        if picture_path:
-            picture_path = picture_path[7:]
-        avatarImage.set_from_file(picture_path)
+        self.avatarImage = Avatar(cell_dimension=48)
 
         # boxes
         hbox = gtk.HBox() # main box
@@ -196,22 +195,19 @@ class Notification(gtk.Window):
         lbox = gtk.HBox() # avatar + title/message
         lbox.set_spacing(10)
 
-        lboxEventBox = gtk.EventBox() # detects mouse events
-        lboxEventBox.set_visible_window(False)
-        lboxEventBox.set_events(gtk.gdk.BUTTON_PRESS_MASK)
-        lboxEventBox.connect("button_press_event", self.onClick)
-        lboxEventBox.add(lbox)
+        self.lboxEventBox = gtk.EventBox() # detects mouse events
+        self.lboxEventBox.set_visible_window(False)
+        self.lboxEventBox.set_events(gtk.gdk.BUTTON_PRESS_MASK)
+        self.lboxEventBox.connect("button_press_event", self.onClick)
+        self.lboxEventBox.add(lbox)
         self.connect("button_press_event", self.onClick)
 
-        if tooltip is not None:
-            lboxEventBox.set_tooltip_text(tooltip)
-
         # pack everything
-        self.messageVbox.pack_start(titleLabel, False, False)
+        self.messageVbox.pack_start(self.titleLabel, False, False)
         self.messageVbox.pack_start(self.messageLabel, True, True)
-        lbox.pack_start(avatarImage, False, False)
+        lbox.pack_start(self.avatarImage, False, False)
         lbox.pack_start(self.messageVbox, True, True)
-        hbox.pack_start(lboxEventBox, True, True)
+        hbox.pack_start(self.lboxEventBox, True, True)
 
         self.add(hbox)
 
@@ -230,18 +226,42 @@ class Notification(gtk.Window):
         self.set_opacity(0.85)
 
         self.timerId = None
-        self.set_default_size(max_width,-1)
+        self.set_default_size(self.max_width,-1)
         self.connect("size-allocate", self.relocate)
-        self.show_all()
+
+    def set_notification(self, title, lines, picture_path, callback,
+                         tooltip):
+        '''
+        show the notification in this window
+        '''
+        self._title = title
+        self.callback = callback
+        self.titleLabel.set_markup(self.markup1 % (self.FColor,
+                                   MarkupParser.escape(self._title)))
+
+        self.lines.clear()
+        self.append_text('\n'.join(lines))
+
+        if picture_path:
+            picture_path = picture_path[7:]
+        self.avatarImage.set_from_file(picture_path)
+
+        if tooltip is not None:
+            self.lboxEventBox.set_tooltip_text(tooltip)
+        else:
+            self.lboxEventBox.set_has_tooltip(False)
+
+        # let the window shrink to the new text
+        self.resize(self.max_width, 1)
 
     def append_text(self, text):
         '''
         adds text at the end of the actual text
         '''
-        self.text = self.text + "\n" + text
-        self.messageLabel.set_text(self.markup2 % (self.FColor,
-                                   MarkupParser.escape(self.text)))
-        self.messageLabel.set_use_markup(True)
+        self.lines.extend(text.split('\n'))
+        text = '\n'.join(self.lines)
+        self.messageLabel.set_markup(self.markup2 % (self.FColor,
+                                     MarkupParser.escape(text)))
         self.messageLabel.show()
 
     def relocate(self, widget=None, allocation=None):
@@ -312,16 +332,16 @@ class Notification(gtk.Window):
     def close(self, *args):
         ''' hide the Notification and show the next one'''
         global actual_notification
-        global queue
 
         self.hide()
         if self.timerId is not None:
             glib.source_remove(self.timerId)
-        if len(queue) != 0:
-            title, text, picture_path, callback, tooltip = queue.pop(0)
-            actual_notification = Notification(title, text, picture_path,
-                                               callback, tooltip)
-            actual_notification.show()
+            self.timerId = None
+        if queue:
+            title, (lines, picture_path, callback, tooltip) = \
+                queue.popitem(last=False)
+            self.set_notification(title, lines, picture_path, callback,
+                                  tooltip)
+            self.show()
         else:
             actual_notification = None
-        self.destroy()
@@ -102,6 +102,8 @@ class Indicator(gui.BaseTray):
         if self.menu:
             self.menu.unsubscribe()
         self.menu = TrayIcon.MainMenu(self.handler, self.main_window)
+        # the indicator doesn't tell us when the menu is shown
+        self.menu.list_contacts.update()
         self.menu.show_all()
         self.indicator.set_menu(self.menu)
         self._on_status_change_succeed(self.handler.session.account.status)
@@ -174,13 +174,16 @@ class TrayIcon(gtk.StatusIcon, NumerableTrayIcon):
         if os.name == 'mac' or sys.platform == 'linux2' or sys.platform == 'linux3':
             position = gtk.status_icon_position_menu
             user_data = trayicon
+        if isinstance(self.menu, MainMenu):
+            self.menu.list_contacts.update()
         self.menu.popup(None, None, position, button, activate_time, user_data)
 
     def _on_contact_attr_changed(self, *args):
         """
         This is called when a contact changes something
         """
-        self.menu.list_contacts._on_contact_change_something(*args)
+        if isinstance(self.menu, MainMenu):
+            self.menu.list_contacts._on_contact_change_something(*args)
 
     def hide(self):
         self.unsubscribe()
@@ -311,10 +314,6 @@ class ContactsMenu(gtk.Menu):
         """
         constructor
         """
-        def strip_nick(contact1, contact2):
-            return cmp(Plus.msnplus_strip(contact1.nick).lower(),
-                       Plus.msnplus_strip(contact2.nick).lower())
-
         gtk.Menu.__init__(self)
         self.handler = handler
         self.main_window = main_window
@@ -324,8 +323,38 @@ class ContactsMenu(gtk.Menu):
 
         self.contactmanager = self.handler.session.contacts
 
+        # the menu is only updated when it's about to be shown, until then
+        # changes are kept as account : set of changed attributes
+        self.changes = {}
+        # True if the whole menu has to be built again
+        self.dirty = True
+
+    def update(self):
+        """
+        apply the changes received since the menu was last shown
+        """
+        # when most of the contacts changed building it again is cheaper
+        if self.dirty or len(self.changes) > len(self.contacts_to_item):
+            self.__rebuild()
+        else:
+            for account, changes in self.changes.iteritems():
+                self.__update_contact(account, changes)
+
+        self.changes = {}
+        self.dirty = False
+
+    def __rebuild(self):
+        """
+        build the menu with the contacts that are online
+        """
+        for item in self.contacts_to_item.itervalues():
+            self.remove(item)
+
+        self.item_to_contacts = {}
+        self.contacts_to_item = {}
+
         for contact in sorted(self.contactmanager.get_online_list(),
-                              cmp = strip_nick):
+                key=lambda contact: Plus.msnplus_strip(contact.nick).lower()):
             self.__append_contact(contact)
 
     def __append_contact(self, contact):
@@ -343,9 +372,32 @@ class ContactsMenu(gtk.Menu):
         item.show()
         self.add(item)
 
+    def __update_contact(self, account, changes):
+        """
+        update the row of account with the attributes in changes
+        """
+        contact = self.contactmanager.get(account)
+        online = contact is not None and contact.status != status.OFFLINE
+        item = self.contacts_to_item.get(account)
+
+        if item is None:
+            if online:
+                self.__append_contact(contact)
+        elif not online:
+            self.remove(item)
+            del self.item_to_contacts[item]
+            del self.contacts_to_item[account]
+        else:
+            if 'nick' in changes:
+                item.set_label(Plus.msnplus_strip(contact.nick))
+            if 'picture' in changes:
+                item.set_image(
+                    self.__get_contact_pixbuf_or_default(contact.picture))
+
     def _on_contact_change_something(self, *args):
         """
-        update the menu when contacts change something
+        record that a contact changed something, the menu is updated
+        the next time it's shown
         """
         type_change = None
         if len(args) == 3:
@@ -356,26 +408,8 @@ class ContactsMenu(gtk.Menu):
             account, filepath = args
             type_change = 'picture'
 
-        if type_change == 'status':
-            if value_change > 0:
-                if account in self.contacts_to_item:
-                    return
-                self.__append_contact(self.contactmanager.get(account))
-            else: # offline
-                if account in self.contacts_to_item:
-                    self.remove(self.contacts_to_item[account])
-                    del self.item_to_contacts[self.contacts_to_item[account]]
-                    del self.contacts_to_item[account]
-
-        if type_change == 'nick':
-            if account in self.contacts_to_item:
-                nick = self.item_to_contacts[self.contacts_to_item[account]].nick
-                self.contacts_to_item[account].set_label(nick)
-
-        if type_change == 'picture':
-            if account in self.contacts_to_item:
-                pict = self.__get_contact_pixbuf_or_default(filepath)
-                self.contacts_to_item[account].set_image(pict)
+        if type_change in ('status', 'nick', 'picture'):
+            self.changes.setdefault(account, set()).add(type_change)
 
     def _on_contact_clicked(self, menu_item):
         """
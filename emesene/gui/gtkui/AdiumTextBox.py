@@ -21,6 +21,10 @@ import gobject
 import logging
 log = logging.getLogger('gtkui.AdiumTextBox')
 
+# milliseconds to let webkit lay out new messages before checking if they
+# fill the view
+FILL_CHECK_DELAY = 200
+
 #check for webkit gi package
 from gui.gtkui import check_gtk3
 try:
@@ -59,6 +63,8 @@ class OutputView(webkit.WebView):
         self.ready = True
         self.load_ready = True
         self.pending = Queue.Queue()
+        # scripts waiting to be run together on the next idle callback
+        self.scripts = []
         self.connect('load-finished', self._loading_finished_cb)
         self.connect('populate-popup', self.on_populate_popup)
         self.connect('navigation-requested', self.on_navigation_requested)
@@ -104,8 +110,34 @@ class OutputView(webkit.WebView):
         '''add a message to the conversation. append the message directly
         if the renderer finished loading, append it to
         pending if still loading'''
-        function = self.theme.format(msg, scroll)
-        self.delayed_call(gobject.idle_add, self.execute_script, function)
+        self.add_messages([msg], scroll)
+
+    def add_messages(self, msgs, scroll=True):
+        '''add a list of messages to the conversation with a single
+        script call'''
+        if msgs:
+            script = ';'.join([self.theme.format(msg, scroll) for msg in msgs])
+            self.delayed_call(self._run_script, script)
+
+    def prepend_messages(self, msgs):
+        '''add a list of older messages before the current content'''
+        if msgs:
+            self.delayed_call(self._run_script,
+                self.theme.format_history(msgs))
+
+    def _run_script(self, script):
+        '''run script on the next idle callback, scripts added until
+        then are run at once'''
+        self.scripts.append(script)
+        if len(self.scripts) == 1:
+            gobject.idle_add(self._flush_scripts)
+
+    def _flush_scripts(self):
+        '''run the scripts added since the last flush'''
+        script = ';'.join(self.scripts)
+        self.scripts = []
+        self.execute_script(script)
+        return False
 
     def _set_text(self, text):
         '''set the text on the widget'''
@@ -178,9 +210,13 @@ class OutputText(gui.base.OutputText, gtk.ScrolledWindow):
     __gsignals__ = {
             "search_request": (gobject.SIGNAL_RUN_FIRST,
                 gobject.TYPE_NONE,
-                (gobject.TYPE_PYOBJECT,))
+                (gobject.TYPE_PYOBJECT,)),
+            "top_reached": (gobject.SIGNAL_RUN_FIRST,
+                gobject.TYPE_NONE, ())
             }
 
+    can_prepend = True
+
     def __init__(self, config, handler):
         '''constructor'''
         gtk.ScrolledWindow.__init__(self)
@@ -189,12 +225,37 @@ class OutputText(gui.base.OutputText, gtk.ScrolledWindow):
         self.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
         self.set_shadow_type(gtk.SHADOW_IN)
         self.loaded = False
+        self.fill_check = None
 
         self.view = OutputView(gui.theme.conv_theme, handler)
         self.view.connect('search_request', self._search_request_cb)
         self.clear()
         self.view.show()
         self.add(self.view)
+        self.get_vadjustment().connect('value-changed',
+            self._on_vadjustment_changed)
+
+    def _on_vadjustment_changed(self, adjustment):
+        '''emit top_reached when the user scrolls to the top'''
+        if adjustment.get_value() <= adjustment.get_lower() and \
+           adjustment.get_upper() > adjustment.get_page_size():
+            self.emit("top_reached")
+
+    def _check_filled_later(self):
+        '''check if the messages fill the view once webkit laid them out'''
+        if self.fill_check is None:
+            self.fill_check = gobject.timeout_add(FILL_CHECK_DELAY,
+                self._check_filled)
+
+    def _check_filled(self):
+        '''emit top_reached while the messages don't fill the view, the
+        user can't scroll to the top to ask for more then'''
+        self.fill_check = None
+        adjustment = self.get_vadjustment()
+        if adjustment.get_page_size() > 0 and \
+           adjustment.get_upper() <= adjustment.get_page_size():
+            self.emit("top_reached")
+        return False
 
     def _search_request_cb(self, view, link):
         self.emit("search_request", link)
@@ -210,9 +271,23 @@ class OutputText(gui.base.OutputText, gtk.ScrolledWindow):
         gui.base.OutputText.clear(self)
 
     def add_message(self, msg, scroll):
-        if msg.type == "status":
-            msg.message = Plus.msnplus_strip(msg.message)
-        self.view.add_message(msg, self.config.b_allow_auto_scroll)
+        self.add_messages([msg], scroll)
+
+    def add_messages(self, msgs, scroll):
+        '''add a list of messages to the view at once'''
+        for msg in msgs:
+            if msg.type == "status":
+                msg.message = Plus.msnplus_strip(msg.message)
+        self.view.add_messages(msgs, self.config.b_allow_auto_scroll)
+        self._check_filled_later()
+
+    def prepend_messages(self, msgs):
+        '''add a list of older messages before the current content'''
+        for msg in msgs:
+            if msg.type == "status":
+                msg.message = Plus.msnplus_strip(msg.message)
+        self.view.prepend_messages(msgs)
+        self._check_filled_later()
 
     def update_p2p(self, account, _type, *what):
         ''' new p2p data has been received (custom emoticons) '''
@@ -17,10 +17,17 @@
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 from __future__ import division
 
+import os
+import time
 import gtk
 import gtk.gdk
 import gobject
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from e3.common.OrderedDict import OrderedDict
+
 import gui
 import utils
 
@@ -28,6 +35,143 @@ from gui.gtkui import check_gtk3
 
 from AvatarManager import AvatarManager
 
+# scaled avatars kept in memory, the least recently used are dropped
+CACHE_SIZE = 64
+# frames due this close (in seconds) to each other are shown on the same tick
+TICK_TOLERANCE = 0.01
+# shortest time between frames in milliseconds
+MIN_DELAY = 20
+
+# (filename, modification time, dimension) : (animation, static image)
+_avatars = OrderedDict()
+
+def load_avatar(filename, dimension):
+    '''return (animation, static image) of filename scaled to dimension,
+    animation is None if it's a static image'''
+    try:
+        key = (filename, os.path.getmtime(filename), dimension)
+    except OSError:
+        key = (filename, None, dimension)
+
+    result = _avatars.pop(key, None)
+    if result is None:
+        try:
+            animation = gtk.gdk.PixbufAnimation(filename)
+        except gobject.GError:
+            animation = gtk.gdk.PixbufAnimation(gui.theme.image_theme.user)
+
+        if animation.is_static_image():
+            static_image = animation.get_static_image()
+            result = (None, static_image.scale_simple(dimension, dimension,
+                gtk.gdk.INTERP_BILINEAR))
+        else:
+            animation = utils.simple_animation_scale(filename, dimension,
+                dimension)
+            result = (animation, animation.get_static_image())
+
+    _avatars[key] = result
+    if len(_avatars) > CACHE_SIZE:
+        _avatars.popitem(last=False)
+
+    return result
+
+class AnimationClock(object):
+    '''a single timer that shows the next frame of every animation on
+    screen, avatars showing the same animation share its frames'''
+
+    def __init__(self):
+        # animation : [iter, avatars showing it, time of the next frame]
+        self.animations = {}
+        self.source = None
+        self.due = None
+
+    def add(self, avatar, animation):
+        '''show animation on avatar, return False if it can't be animated'''
+        entry = self.animations.get(animation)
+        if entry is None:
+            try:
+                if check_gtk3():
+                    iteran = animation.get_iter(None)
+                else:
+                    iteran = animation.get_iter()
+            except TypeError:
+                #this is broken on some version of gtk3
+                return False
+
+            entry = [iteran, set(), self._next_time(iteran, time.time())]
+            self.animations[animation] = entry
+
+        entry[1].add(avatar)
+        avatar.set_property('pixbuf-animation', entry[0].get_pixbuf())
+        avatar.queue_draw()
+        self._schedule()
+        return True
+
+    def remove(self, avatar, animation):
+        '''stop showing animation on avatar'''
+        entry = self.animations.get(animation)
+        if entry is not None:
+            entry[1].discard(avatar)
+            if not entry[1]:
+                del self.animations[animation]
+
+        if not self.animations and self.source is not None:
+            gobject.source_remove(self.source)
+            self.source = None
+
+    def _next_time(self, iteran, now):
+        '''return the time the frame after the current one is due, None
+        if the current frame is the last one'''
+        delay = iteran.get_delay_time()
+        if delay < 0:
+            return None
+
+        return now + max(delay, MIN_DELAY) / 1000
+
+    def _schedule(self):
+        '''set the timer to the next frame due'''
+        times = [entry[2] for entry in self.animations.itervalues()
+                 if entry[2] is not None]
+        if not times:
+            return
+
+        due = min(times)
+        if self.source is not None:
+            if self.due <= due:
+                return
+            gobject.source_remove(self.source)
+
+        delay = max(0, int((due - time.time()) * 1000))
+        self.source = gobject.timeout_add(delay, self._tick)
+        self.due = due
+
+    def _tick(self):
+        '''show the frames that are due'''
+        self.source = None
+        now = time.time()
+
+        for entry in self.animations.itervalues():
+            iteran, avatars, due = entry
+            if due is None or due > now + TICK_TOLERANCE:
+                continue
+
+            if check_gtk3():
+                iteran.advance(None)
+            else:
+                iteran.advance()
+
+            pixbuf = iteran.get_pixbuf()
+            for avatar in avatars:
+                avatar.set_property('pixbuf-animation', pixbuf)
+                avatar.queue_draw()
+
+            entry[2] = self._next_time(iteran, now)
+
+        self._schedule()
+        return False
+
+clock = AnimationClock()
+
 class Avatar(gtk.Widget, AvatarManager):
     """AvatarWidget """
 
@@ -59,31 +203,32 @@ class Avatar(gtk.Widget, AvatarManager):
 
         self.blocked = False
 
+        # animations only run while they can be seen
+        self.connect('map', self._on_map)
+        self.connect('unmap', self._on_unmap)
+
     def animate_callback(self):
         if self.current_frame > self.total_frames:
             self.in_animation = False
             self._pixbuf = self.transition_pixbuf
-
-            if self.current_animation:
-                self._start_animation(self.current_animation)
             return False
         else:
-
-            if self.anim_source is not None:
-                gobject.source_remove(self.anim_source)
-                self.anim_source = None
             self.current_frame += 1
             self.queue_draw()
             return True
 
+    def _on_map(self, widget):
+        if self.current_animation is not None:
+            self._start_animation(self.current_animation)
+
+    def _on_unmap(self, widget):
+        if self.current_animation is not None:
+            clock.remove(self, self.current_animation)
+
     def __set_from_pixbuf(self, pixbuf):
         self.set_property('pixbuf', pixbuf)
         self.queue_draw()
 
-    def __set_from_pixbuf_animation(self, pixbuf):
-        self.set_property('pixbuf-animation', pixbuf)
-        self.queue_draw()
-
     #
     #public methods
     #
@@ -97,21 +242,7 @@ class Avatar(gtk.Widget, AvatarManager):
             else:
                 self.filename = gui.theme.image_theme.user
 
-        try:
-            animation = gtk.gdk.PixbufAnimation(self.filename)
-        except gobject.GError:
-            animation = gtk.gdk.PixbufAnimation(gui.theme.image_theme.user)
-
-        if animation.is_static_image() or self.blocked:
-            static_image = animation.get_static_image()
-            static_image = static_image.scale_simple(self._dimension,
-                                                    self._dimension,
-                                                    gtk.gdk.INTERP_BILINEAR)
-        else:
-            animation = utils.simple_animation_scale(self.filename,
-                                                self._dimension,
-                                                self._dimension)
-            static_image = animation.get_static_image()
+        animation, static_image = load_avatar(self.filename, self._dimension)
 
         if self.blocked:
             if self._dimension > 32:
@@ -122,84 +253,60 @@ class Avatar(gtk.Widget, AvatarManager):
             else:
                 pixbufblock = utils.gtk_pixbuf_load(gui.theme.image_theme.blocked_overlay)
 
-            output_pixbuf = utils.simple_images_overlap(static_image, pixbufblock,
+            output_pixbuf = utils.simple_images_overlap(static_image.copy(),
+                                                        pixbufblock,
                                                         -pixbufblock.props.width,
                                                         -pixbufblock.props.width)
 
             self.__set_from_pixbuf(output_pixbuf)
-            self.current_animation = None
+            self.stop()
             return
-        elif animation.is_static_image():
+        elif animation is None:
             self.__set_from_pixbuf(static_image)
-            self.current_animation = None
+            self.stop()
             return
 
-        self.current_animation = animation
-        self._start_animation(animation)
+        self.__set_animation(animation)
 
     def set_from_image(self, image):
         if image.get_storage_type() == gtk.IMAGE_PIXBUF:
             self.__set_from_pixbuf(image.get_pixbuf())
-            self.current_animation = None
+            self.stop()
             return
         elif image.get_storage_type() == gtk.IMAGE_ANIMATION:
-            self.current_animation = image.get_animation()
-            self._start_animation(image.get_animation())
+            self.__set_animation(image.get_animation())
 
     def set_from_pixbuf(self, pixbuf):
         if isinstance(pixbuf, gtk.gdk.Pixbuf):
             self.__set_from_pixbuf(pixbuf)
-            self.current_animation = None
+            self.stop()
             return
         elif isinstance(pixbuf, gtk.gdk.PixbufAnimation):
-            self.current_animation = pixbuf
-            self._start_animation(pixbuf)
+            self.__set_animation(pixbuf)
 
     def stop(self):
         '''stop the animation'''
-        if self.anim_source is not None:
-            gobject.source_remove(self.anim_source)
-            self.anim_source = None
+        if self.current_animation is not None:
+            clock.remove(self, self.current_animation)
+            self.current_animation = None
     #
     #end of public methods
     #
 
-    if check_gtk3():
-        def _start_animation(self, animation):
-            #this is broken on some version of gtk3, use static pixbuf for those cases
-            try:
-                iteran = animation.get_iter(None)
-            except TypeError:
-                self.__set_from_pixbuf(animation.get_static_image())
-                return
+    def __set_animation(self, animation):
+        if animation is not self.current_animation:
+            self.stop()
+            self.current_animation = animation
 
-            #we don't need to resize here!
-            self.__set_from_pixbuf(iteran.get_pixbuf())
+        #we don't need to resize here!
+        self.__set_from_pixbuf(animation.get_static_image())
 
-            if self.anim_source is None:
-                self.anim_source = gobject.timeout_add(iteran.get_delay_time(),
-                    self._advance, iteran)
+        if self.get_mapped():
+            self._start_animation(animation)
 
-        def _advance(self, iteran):
-            iteran.advance(None)
-            self.__set_from_pixbuf_animation(iteran.get_pixbuf())
-            self.anim_source = gobject.timeout_add(iteran.get_delay_time(), self._advance, iteran)
-            return False
-    else:
-        def _start_animation(self, animation):
-            iteran = animation.get_iter()
-            #we don't need to resize here!
-            self.__set_from_pixbuf(iteran.get_pixbuf())
-
-            if self.anim_source is None:
-                self.anim_source = gobject.timeout_add(iteran.get_delay_time(),
-                    self._advance, iteran)
-
-        def _advance(self, iteran):
-            iteran.advance()
-            self.__set_from_pixbuf_animation(iteran.get_pixbuf())
-            self.anim_source = gobject.timeout_add(iteran.get_delay_time(), self._advance, iteran)
-            return False
+    def _start_animation(self, animation):
+        if not clock.add(self, animation):
+            self.__set_from_pixbuf(animation.get_static_image())
 
     def do_draw(self, ctx):
         if not self._pixbuf:
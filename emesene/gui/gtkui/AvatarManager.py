@@ -46,7 +46,6 @@ class AvatarManager(gobject.GObject):
         self.total_frames = 0
         self.current_frame = 0
         self.transition_pixbuf = None
-        self.anim_source = None
         self.current_animation = None
 
     def do_get_property(self, property):
@@ -35,6 +35,10 @@ log = logging.getLogger('gtkui.ContactInformation')
 from IconView import IconView
 from SearchEntry import SearchEntry
 
+# messages requested at once when the output can load older messages
+# as the user scrolls up
+HISTORY_PAGE_SIZE = 100
+
 class ContactInformation(gtk.Window, gui.base.ContactInformation):
     '''a window that displays information about a contact'''
 
@@ -289,6 +293,14 @@ class ChatWidget(gtk.VBox):
         self.conv_status = ConversationStatus.ConversationStatus(session.config)
 
         self.search_mode = False
+        # the keywords searched, the cursor of the next (older) page and
+        # the number of messages shown
+        self.keywords = None
+        self.cursor = None
+        self.loaded = 0
+        self.loading = False
+        # incremented on each refresh to ignore stale pages
+        self.generation = 0
 
         self.calendars = gtk.VBox()
         self.calendars.set_border_width(2)
@@ -309,6 +321,8 @@ class ChatWidget(gtk.VBox):
         self.text = OutputText(session.config, None)
         self.text.connect("search_request", self._search_request_cb)
         self.text.connect("key-press-event", self._on_text_key_press)
+        if self.text.can_prepend:
+            self.text.connect("top_reached", self._on_top_reached)
 
         buttons = gtk.HButtonBox()
         buttons.set_border_width(2)
@@ -400,14 +414,10 @@ class ChatWidget(gtk.VBox):
     def _search_history(self, keywords):
         '''search history for certain keywords
         '''
-        from_t = self._get_from_timestamp()
-        to_t = self._get_to_timestamp()
-
         self._prepare_history()
         self.search_mode = True
-        self.session.logger.get_chats_by_keyword(self.account,
-            self.session.account.account, from_t, to_t, keywords, self.max_lines.get_value(),
-            self._on_chats_ready)
+        self.keywords = keywords
+        self.request_page(None)
 
     def _search_request_cb(self, view, link):
         link = link[9:] #remove search://
@@ -470,7 +480,9 @@ class ChatWidget(gtk.VBox):
         '''
         self._prepare_history()
         self.request_information(_('Loading chat history. Hang tight for a moment...'))
-        self.request_chats_between(self.max_lines.get_value(), self._on_chats_ready)
+        self.search_mode = False
+        self.keywords = None
+        self.request_page(None)
 
     def _get_from_timestamp(self):
         '''read from_calendar widget and return a timestamp
@@ -492,6 +504,61 @@ class ChatWidget(gtk.VBox):
         self.session.logger.get_chats_between(self.account,
             self.session.account.account, from_t, to_t, limit, callback)
 
+    def request_page(self, cursor):
+        '''request the page of messages older than cursor, or the newest
+        page if cursor is None'''
+        if cursor is None:
+            self.generation += 1
+            self.loaded = 0
+            # keep the colors of each account across pages
+            self.account_colors = {}
+            self.possible_colors = ["#0000FF", "#00FFFF", "#FF0000",
+                                    "#FF00FF", e3.Style().color.to_hex()]
+
+        if self.text.can_prepend:
+            limit = HISTORY_PAGE_SIZE
+        else:
+            limit = int(self.max_lines.get_value())
+
+        generation = self.generation
+
+        def _on_page_ready(result):
+            '''called when the page requested is ready'''
+            if generation == self.generation:
+                self._on_page_ready(result)
+
+        self.loading = True
+        self.session.logger.get_chats_page(self.account,
+            self.session.account.account, self._get_from_timestamp(),
+            self._get_to_timestamp(), limit, cursor, self.keywords,
+            _on_page_ready)
+
+    def _on_top_reached(self, output):
+        '''load older messages when the user scrolls to the top'''
+        if self.cursor is not None and not self.loading:
+            self.request_page(self.cursor)
+
+    def _on_page_ready(self, result):
+        '''called when a page of the chat history is ready'''
+        self.loading = False
+        results, self.cursor = result or ([], None)
+
+        if self.loaded == 0:
+            self._on_chats_ready(results)
+        elif results:
+            conv_status = ConversationStatus.ConversationStatus(
+                self.session.config)
+            self.text.prepend_messages(
+                self._build_messages(results, conv_status))
+
+        self.loaded += len(results)
+
+        if self.cursor is not None and \
+           self.loaded >= self.max_lines.get_value():
+            self.cursor = None
+            self.nicebar.new_message(_('Too many messages to display'),
+                gtk.STOCK_DIALOG_WARNING)
+
     def save_chats(self, path):
         '''request amount of messages between our account and the current
         account, save it to path'''
@@ -511,18 +578,20 @@ class ChatWidget(gtk.VBox):
         '''called when the chat history is ready'''
         self._prepare_history()
 
-        account_colors = {}
-        style = e3.Style()
-        font_color_default = style.color.to_hex()
-        possible_colors = ["#0000FF", "#00FFFF", "#FF0000",
-                           "#FF00FF", font_color_default]
-
         if not results:
-            self.search_mode = False
             self.request_information(_("No chat history found"))
             return
 
         self.conv_status.clear()
+        self.text.append_messages(
+            self._build_messages(results, self.conv_status))
+
+    def _build_messages(self, results, conv_status):
+        '''return the messages to display for the chats in results'''
+        account_colors = self.account_colors
+        possible_colors = self.possible_colors
+        font_color_default = e3.Style().color.to_hex()
+        msgs = []
 
         for stat, timestamp, msg_text, nick, account in results:
             is_me = self.session.contacts.me.account == account
@@ -543,9 +612,8 @@ class ChatWidget(gtk.VBox):
                         account, timestamp=datetimestamp)
 
             if is_me:
-                msg = self.conv_status.pre_process_message(contact, message,
+                msg = conv_status.pre_process_message(contact, message,
                     False, None, None, message.timestamp, message.type, None)
-                self.text.send_message(msg)
             else:
                 try:
                     account_colors[account]
@@ -556,18 +624,14 @@ class ChatWidget(gtk.VBox):
                         account_colors[account] = font_color_default
 
                 message.style = self._get_style(account_colors[account])
-                msg = self.conv_status.pre_process_message(contact, message,
+                msg = conv_status.pre_process_message(contact, message,
                     True, None, None, message.timestamp, message.type, message.style)
-                self.text.receive_message(msg)
 
-            self.conv_status.post_process_message(msg)
-            self.conv_status.update_status()
+            msgs.append(msg)
+            conv_status.post_process_message(msg)
+            conv_status.update_status()
 
-        if len(results) >= self.max_lines.get_value():
-            self.nicebar.new_message(_('Too many messages to display'),
-                gtk.STOCK_DIALOG_WARNING)
-
-        self.search_mode = False
+        return msgs
 
     def _get_style(self, color):
 
@@ -17,13 +17,22 @@
 #    along with emesene; if not, write to the Free Software
 #    Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+import os
 import time
 
 import gtk
+import glib
 import pango
 
+import gui
 import debugger
 import logging
+import extension
+
+from e3.common import Instrumentation
+
+# seconds between updates of the statistics page while it's shown
+STATS_INTERVAL = 1
 
 class DebugWindow(gtk.Window):
     '''The window containing the debug info'''
@@ -43,6 +52,7 @@ class DebugWindow(gtk.Window):
 
 
         self.vbox = gtk.VBox()
+        self.log_box = gtk.VBox()
         self.filter_box = gtk.HBox()
         self.buttons_box = gtk.HBox()
         self.test_box = gtk.HBox()
@@ -59,9 +69,55 @@ class DebugWindow(gtk.Window):
         self.filter_box.pack_start(self.filter_entry)
         self.filter_box.pack_start(self.filter_level, False)
         self.filter_box.pack_start(self.filter_btn, False)
-        self.vbox.pack_start(self.filter_box, False)
-
-        self.vbox.pack_start(self.scroll_view)
+        self.log_box.pack_start(self.filter_box, False)
+
+        # the level each module logs at, can be changed while running
+        self.levels = [logging.DEBUG, logging.INFO, logging.WARNING,
+            logging.ERROR, logging.CRITICAL]
+        self.loggers = [''] + debugger.get_loggers()
+        self.levels_box = gtk.HBox()
+        self.logger_combo = gtk.combo_box_new_text()
+        self.logger_combo.append_text(_('All modules'))
+        for name in self.loggers[1:]:
+            self.logger_combo.append_text(name)
+        self.logger_level = gtk.combo_box_new_text()
+        self.logger_level.append_text(_('Debug'))
+        self.logger_level.append_text(_('Info'))
+        self.logger_level.append_text(_('Warning'))
+        self.logger_level.append_text(_('Error'))
+        self.logger_level.append_text(_('Critical'))
+        self.level_btn = gtk.Button(_("Set level"))
+        self.levels_box.pack_start(gtk.Label(_('Log level:')), False)
+        self.levels_box.pack_start(self.logger_combo)
+        self.levels_box.pack_start(self.logger_level, False)
+        self.levels_box.pack_start(self.level_btn, False)
+        self.log_box.pack_start(self.levels_box, False)
+
+        self.log_box.pack_start(self.scroll_view)
+
+        # queue depths, dispatch latencies and time spent by the signal
+        # subscribers, recorded while the record button is active
+        self.stats_box = gtk.VBox()
+        self.stats_buttons_box = gtk.HBox()
+        self.stats_view = gtk.TextView()
+        self.stats_view.set_editable(False)
+        self.stats_view.modify_font(pango.FontDescription('monospace'))
+        self.stats_scroll = gtk.ScrolledWindow()
+        self.stats_scroll.add(self.stats_view)
+        self.record_btn = gtk.ToggleButton(_("Record"))
+        self.record_btn.set_active(Instrumentation.stats is not None)
+        self.reset_btn = gtk.Button(_("Reset"))
+        self.save_btn = gtk.Button(_("Save"))
+        self.stats_buttons_box.pack_start(self.record_btn, False)
+        self.stats_buttons_box.pack_start(self.reset_btn, False)
+        self.stats_buttons_box.pack_end(self.save_btn, False)
+        self.stats_box.pack_start(self.stats_buttons_box, False)
+        self.stats_box.pack_start(self.stats_scroll)
+
+        self.notebook = gtk.Notebook()
+        self.notebook.append_page(self.log_box, gtk.Label(_('Log')))
+        self.notebook.append_page(self.stats_box, gtk.Label(_('Statistics')))
+        self.vbox.pack_start(self.notebook)
 
         self.close_btn = gtk.Button(_("Close"))
         self.buttons_box.pack_end(self.close_btn, False)
@@ -73,6 +129,15 @@ class DebugWindow(gtk.Window):
         self.filter_entry.connect("activate", self.on_filter_clicked)
         self.filter_level.connect("changed", self.on_filter_clicked)
         self.close_btn.connect("clicked", self.on_close)
+        self.logger_combo.connect("changed", self.on_logger_changed)
+        self.level_btn.connect("clicked", self.on_level_clicked)
+        self.logger_combo.set_active(0)
+        self.record_btn.connect("toggled", self.on_record_toggled)
+        self.reset_btn.connect("clicked", self.on_reset_clicked)
+        self.save_btn.connect("clicked", self.on_save_clicked)
+        self.notebook.connect_after("switch-page", self.on_page_switched)
+        self.stats_source = glib.timeout_add_seconds(STATS_INTERVAL,
+            self.update_stats)
 
         self.set_default_size(*self.view.size_request())
 
@@ -89,7 +154,82 @@ class DebugWindow(gtk.Window):
         levelno = d[level]
         self.view.filter_caller(pattern, levelno)
 
+    def on_logger_changed(self, widget, data=None):
+        '''show the level of the selected module'''
+        name = self.loggers[self.logger_combo.get_active()]
+        level = debugger.get_level(name)
+        for index, levelno in enumerate(self.levels):
+            if level <= levelno:
+                self.logger_level.set_active(index)
+                break
+
+    def on_level_clicked(self, widget, data=None):
+        '''set the level of the selected module'''
+        name = self.loggers[self.logger_combo.get_active()]
+        debugger.set_level(name, self.levels[self.logger_level.get_active()])
+
+    def update_stats(self):
+        '''show the recorded statistics if their page is shown'''
+        if self.notebook.get_current_page() != 1:
+            return True
+
+        stats = Instrumentation.stats
+        if stats is None:
+            text = _('Not recording, press Record or start emesene with '
+                '--stats to record from the start')
+        else:
+            text = stats.format()
+
+        buffer_ = self.stats_view.get_buffer()
+        if buffer_.get_text(*buffer_.get_bounds()) != text:
+            buffer_.set_text(text)
+
+        return True
+
+    def on_page_switched(self, notebook, page, page_num):
+        '''update the statistics when their page is shown'''
+        self.update_stats()
+
+    def on_record_toggled(self, button):
+        '''start or stop recording statistics'''
+        if button.get_active():
+            Instrumentation.enable()
+        else:
+            Instrumentation.disable()
+
+        self.update_stats()
+
+    def on_reset_clicked(self, button):
+        '''forget the statistics recorded so far'''
+        stats = Instrumentation.stats
+        if stats is not None:
+            stats.reset()
+
+        self.update_stats()
+
+    def on_save_clicked(self, button):
+        '''save the recorded statistics as json'''
+        stats = Instrumentation.stats
+        if stats is None:
+            return
+
+        def save_cb(response, filename=None):
+            '''called when the save dialog is closed'''
+            if filename is not None and response == gui.stock.SAVE:
+                try:
+                    stats.dump(filename)
+                except IOError, error:
+                    extension.get_default('dialog').error(
+                        _("Could not save the statistics: %s") % error)
+
+        dialog = extension.get_default('dialog')
+        dialog.save_as(os.path.expanduser('~'), save_cb)
+
     def safely_close(self):
+        if self.stats_source is not None:
+            glib.source_remove(self.stats_source)
+            self.stats_source = None
+
         self.hide()
         logging.getLogger().removeHandler(self.store)
         self.on_close_cb()
@@ -174,7 +314,14 @@ class DebugStore( gtk.ListStore, logging.Handler ):
         self.on_message_added(record)
 
     def on_message_added(self, message):
-        self.append([message.name, str(message.msg).strip(), message.levelno, str(message.created)])
+        try:
+            text = message.getMessage().strip()
+        except (AttributeError, TypeError):
+            # the arguments don't match the format string
+            text = str(message.msg)
+
+        self.append([message.name, text,
+            message.levelno, str(message.created)])
 
     def filter_caller( self, name, level ):
         '''
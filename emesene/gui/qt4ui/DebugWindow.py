@@ -152,8 +152,9 @@ class DebugTextView(QtGui.QTextEdit, logging.Handler):
         html = u'<small>(%s): [<b>%s</b>] : '
         html = html % (time_string, record.name)
         try:
-            html = html + '%s</small><br />' % Utils.escape(record.msg.strip())
-        except AttributeError as detail:
+            html = html + '%s</small><br />' % Utils.escape(
+                record.getMessage().strip())
+        except (AttributeError, TypeError) as detail:
             html = html + '<small><i>&lt;&lt;message insertion failed [%s:%s]&gt;&gt;</i></small><br>' % (type(record.msg), str(record.msg))
         self._cursor.insertHtml(html)
 
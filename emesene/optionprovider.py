@@ -71,6 +71,20 @@ class VerboseOption(object):
 extension.implements('option provider')(VerboseOption)
 extension.get_category('option provider').activate(VerboseOption)
 
+class StatsOption(object):
+    '''option parser'''
+
+    def option_register(self):
+        '''register the options to parse by the command line option parser'''
+        option = optparse.Option("--stats",
+            action="count", dest="stats", default=False,
+            help="Record queue and signal statistics from the start, "
+                 "see the debug window")
+        return option
+
+extension.implements('option provider')(StatsOption)
+extension.get_category('option provider').activate(StatsOption)
+
 class ExtensionDefault(object):
     '''extension to register options for extensions'''
 
@@ -7,6 +7,14 @@ from test_avatar_cache import AvatarCacheTestCase
 from test_cache_manager import CacheManagerTestCase
 from test_emoticon_cache import EmoticonCacheTestCase
 from test_ring_buffer import RingBufferTestCase
+from test_file_source import FileSourceTestCase
 from test_logger import LoggerTestCase
+from test_adium_theme import AdiumThemeTestCase
+from test_sound_mixer import SoundMixerTestCase
+from test_notification_limiter import NotificationLimiterTestCase
+from test_load_generator import LoadGeneratorTestCase
+from test_instrumentation import InstrumentationTestCase
+from test_xmpp_worker import XmppWorkerTestCase
+from test_p2p_transport import P2PTransportTestCase
 
 unittest.main()
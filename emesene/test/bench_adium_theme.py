@@ -0,0 +1,42 @@
+'''
+Micro-benchmark of rendering messages with an adium theme.
+
+Messages are rendered with the compiled templates of the theme, and with
+the str.replace/re.sub chain used before the templates were compiled.
+
+    python test/bench_adium_theme.py [messages] [theme path]
+'''
+
+import os
+import sys
+import time
+sys.path.append(os.path.abspath('.'))
+sys.path.append(os.path.abspath('test'))
+
+from test_adium_theme import reference_replace, build_messages, THEMES_PATH
+from gui.base import AdiumTheme
+
+def measure(name, render, theme, count):
+    templates = [theme.incoming, theme.incoming_next, theme.outgoing_next]
+    msgs = [build_messages()[n % 3] for n in xrange(count)]
+
+    start = time.time()
+    for n, msg in enumerate(msgs):
+        render(templates[n % 3], msg)
+    elapsed = time.time() - start
+
+    print "%-10s %8.1f us/message" % (name, elapsed * 1e6 / count)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    path = sys.argv[2] if len(sys.argv) > 2 else \
+        os.path.join(THEMES_PATH, 'renkoo.AdiumMessageStyle')
+
+    theme = AdiumTheme.AdiumTheme(path, '')
+
+    print "%i messages, %s" % (count, os.path.basename(path))
+    measure('replace', reference_replace, theme, count)
+    measure('compiled', theme._replace, theme, count)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+'''
+Micro-benchmark of the logging done for each received message.
+
+Messages go through the debug calls of ConversationManager._on_message
+and has_similar_conversation. They are logged with the message formatted
+eagerly and the root logger at DEBUG, as was done before, and with lazy
+arguments and the levels debugger.init sets now, and with the debug
+messages of the module turned on from the debug window.
+
+    python test/bench_logging.py [messages]
+'''
+
+import os
+import sys
+import time
+import logging
+sys.path.append(os.path.abspath('.'))
+
+import debugger
+
+log = logging.getLogger('gui.base.ConversationManager')
+
+def eager(cid, account):
+    log.debug('Message received: %f, %s' % (cid, account))
+    log.debug('Looking for conversations with the same cid: %f' % cid)
+    log.debug('A similar conversation was found with the same cid: %f' % cid)
+
+def lazy(cid, account):
+    log.debug('Message received: %f, %s', cid, account)
+    log.debug('Looking for conversations with the same cid: %f', cid)
+    log.debug('A similar conversation was found with the same cid: %f', cid)
+
+def measure(name, function, count):
+    start = time.time()
+    for n in xrange(count):
+        function(float(n % 10), 'contact%i@emesene.org' % (n % 10))
+    elapsed = time.time() - start
+
+    print "%-6s %8.2f us/message, %i records kept" % (name,
+        elapsed * 1e6 / count, len(debugger.QueueHandler.get().queue))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    debugger.init(debuglevel=0)
+    root = logging.getLogger()
+    root.handlers[0].stream = open(os.devnull, 'w')
+    level = root.level
+
+    print "%i messages" % count
+    root.setLevel(logging.DEBUG)
+    measure('eager', eager, count)
+    debugger.QueueHandler.get().queue.clear()
+    root.setLevel(level)
+    measure('lazy', lazy, count)
+    debugger.set_level(log.name, logging.DEBUG)
+    measure('debug', lazy, count)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+'''
+Loopback benchmark of the papyon P2P transport throughput.
+
+Two loopback transports are connected back to back: every chunk is
+serialized, parsed again on the other side and confirmed to the sender
+after a simulated round trip. The transfer rate and the CPU time spent
+per MB are printed for stop-and-wait and for the switchboard and direct
+transport settings.
+
+    python test/bench_p2p_throughput.py [size in MB] [latency in ms]
+'''
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join('e3', 'papylib', 'papyon')))
+
+import gobject
+
+from papyon.msnp2p.constants import ApplicationID
+from papyon.msnp2p.transport.TLP import MessageBlob, MessageChunk
+from papyon.msnp2p.transport.base import BaseP2PTransport
+from papyon.msnp2p.transport.direct import DirectP2PTransport
+from papyon.msnp2p.transport.switchboard import SwitchboardP2PTransport
+
+import papyon.util.string_io as StringIO
+
+MB = 1024 * 1024
+
+
+class LoopbackTransportManager(object):
+    def __init__(self):
+        self._client = None
+        self._transports = set()
+
+    def _register_transport(self, transport):
+        self._transports.add(transport)
+
+    def _unregister_transport(self, transport):
+        self._transports.discard(transport)
+
+
+class LoopbackP2PTransport(BaseP2PTransport):
+    """Transport delivering its chunks to another in-process transport"""
+
+    def __init__(self, transport_manager, peer, peer_guid, max_chunk_size,
+            max_window_size, latency=0, version=2):
+        self._peer = peer
+        self._peer_guid = peer_guid
+        self._max_chunk_size = max_chunk_size
+        self._version = version
+        self.MAX_WINDOW_SIZE = max_window_size
+        self.latency = latency
+        self.remote = None
+        BaseP2PTransport.__init__(self, transport_manager, "loopback")
+
+    @property
+    def protocol(self):
+        return "loopback"
+
+    @property
+    def peer(self):
+        return self._peer
+
+    @property
+    def peer_guid(self):
+        return self._peer_guid
+
+    @property
+    def connected(self):
+        return self.remote is not None
+
+    @property
+    def rating(self):
+        return 0
+
+    @property
+    def max_chunk_size(self):
+        return self._max_chunk_size
+
+    @property
+    def version(self):
+        return self._version
+
+    def can_send(self, peer, peer_guid, blob, bootstrap=False):
+        return (self._peer == peer and self._peer_guid == peer_guid)
+
+    def _ready_to_send(self):
+        return self.connected
+
+    def _send_chunk(self, peer, peer_guid, chunk):
+        data = str(chunk)
+        self.remote._receive_data(data)
+        if self.latency:
+            gobject.timeout_add(self.latency, self.__on_chunk_acked,
+                    peer, peer_guid, chunk)
+        else:
+            gobject.idle_add(self.__on_chunk_acked, peer, peer_guid, chunk)
+
+    def __on_chunk_acked(self, peer, peer_guid, chunk):
+        self._on_chunk_sent(peer, peer_guid, chunk)
+        return False
+
+    def _receive_data(self, data):
+        chunk = MessageChunk.parse(self.version, data)
+        self._on_chunk_received(self._peer, self._peer_guid, chunk)
+
+
+def measure(name, size, max_chunk_size, max_window_size, latency):
+    manager = LoopbackTransportManager()
+    sender = LoopbackP2PTransport(manager, "receiver", None, max_chunk_size,
+            max_window_size, latency)
+    receiver = LoopbackP2PTransport(manager, "sender", None, max_chunk_size,
+            max_window_size, latency)
+    sender.remote = receiver
+    receiver.remote = sender
+
+    mainloop = gobject.MainLoop()
+    received = [0]
+
+    def on_chunk_received(transport, peer, peer_guid, chunk):
+        received[0] += chunk.size
+        if received[0] >= size:
+            mainloop.quit()
+
+    receiver.connect("chunk-received", on_chunk_received)
+
+    data = StringIO.StringIO(os.urandom(size))
+    blob = MessageBlob(ApplicationID.FILE_TRANSFER, data, size, 42)
+
+    start_cpu = sum(os.times()[:2])
+    start = time.time()
+    sender.send("receiver", None, blob)
+    mainloop.run()
+    elapsed = time.time() - start
+    cpu = sum(os.times()[:2]) - start_cpu
+
+    megabytes = float(size) / MB
+    print "%-12s window %2i, chunk %4i: %8.2f MB/s, %6.3f s CPU/MB" % \
+            (name, max_window_size, max_chunk_size, megabytes / elapsed,
+             cpu / megabytes)
+
+    sender.close()
+    receiver.close()
+
+
+def main():
+    size = int(sys.argv[1]) * MB if len(sys.argv) > 1 else 4 * MB
+    latency = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    measure("stop-and-wait", size, 1250, 1, latency)
+    measure("switchboard", size, 1250,
+            SwitchboardP2PTransport.MAX_WINDOW_SIZE, latency)
+    measure("direct", size, 1350,
+            DirectP2PTransport.MAX_WINDOW_SIZE, latency)
+
+
+if __name__ == '__main__':
+    main()
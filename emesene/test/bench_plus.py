@@ -0,0 +1,86 @@
+'''
+Micro-benchmark of MSN Plus markup parsing while the contact list is
+redrawn.
+
+A synthetic roster of contacts with Plus-heavy nicks and messages
+(colors, long gradients, nested tags) is parsed and stripped a number of
+times, as the contact list does on each redraw. The cold numbers clear
+the cache before every redraw.
+
+    python test/bench_plus.py [contacts] [redraws]
+'''
+
+import os
+import sys
+import time
+import random
+sys.path.append(os.path.abspath('.'))
+
+import gettext
+gettext.install('emesene')
+
+import extension
+from gui.gtkui.utils import GTKTags
+from gui.base import Plus
+
+extension.category_register('toolkit tags', GTKTags)
+
+NICKS = (
+    '[c=%(a)i]%(name)s[/c=%(b)i]',
+    '[b][c=#%(ha)s]%(name)s the gradient guy[/c=#%(hb)s][/b]',
+    '[a=%(a)i][c=%(b)i]%(name)s[/c][/a] [i]is here[/i]',
+    '\xc2\xb7$%(a)i,%(b)i%(name)s\xc2\xb70 \xc2\xb7#bold',
+    '[u][s]%(name)s[/s][/u] [c=red]plain[/c]',
+)
+
+MESSAGES = (
+    '[c=%(b)i]listening to something long enough to matter[/c=%(a)i]',
+    '[i]away[/i] [c=#%(ha)s]back at %(a)i[/c]',
+    'no markup at all',
+)
+
+def build_roster(count):
+    random.seed(count)
+    roster = []
+    for n in xrange(count):
+        values = {'name': 'contact%i' % n, 'a': random.randint(0, 67),
+                  'b': random.randint(0, 67),
+                  'ha': '%06x' % random.randint(0, 0xffffff),
+                  'hb': '%06x' % random.randint(0, 0xffffff)}
+        roster.append((random.choice(NICKS) % values,
+                       random.choice(MESSAGES) % values))
+    return roster
+
+def redraw(roster):
+    for nick, message in roster:
+        Plus.msnplus_parse(nick)
+        Plus.msnplus_parse(message)
+        Plus.msnplus_strip(nick)
+
+def measure(name, roster, redraws, cold):
+    Plus._cache.clear()
+    if not cold:
+        redraw(roster)
+
+    start = time.time()
+    for n in xrange(redraws):
+        if cold:
+            Plus._cache.clear()
+        redraw(roster)
+    elapsed = time.time() - start
+
+    print "%-6s %8.1f ms/redraw" % (name, elapsed * 1e3 / redraws)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    redraws = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    roster = build_roster(count)
+    Plus._cache.size = max(Plus.CACHE_SIZE, 3 * count)
+
+    print "%i contacts, %i redraws" % (count, redraws)
+    measure('cold', roster, redraws, True)
+    measure('cached', roster, redraws, False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+'''
+Headless benchmark suite of the hot paths of emesene.
+
+Logging and querying messages, emoticon and url markup, MSN Plus markup,
+adium themes, contact list sorting, signal dispatch and xmpp stanza
+parsing are measured on synthetic data built from a fixed seed, so runs
+on different commits can be compared. Each benchmark is run a number of
+times and the best time is kept.
+
+The results are printed and, with -o, written as json. With -c they are
+compared with the json of a previous run, the exit status is 1 if a
+benchmark got slower than the threshold.
+
+    python test/bench_suite.py [-o results.json] [-c baseline.json]
+        [-r repeat] [-s scale] [-t threshold] [benchmark prefix...]
+'''
+
+import os
+import sys
+import time
+import Queue
+import shutil
+import random
+import platform
+import tempfile
+import subprocess
+import optparse
+sys.path.append(os.path.abspath('.'))
+sys.path.append(os.path.abspath('test'))
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
+
+import gettext
+gettext.install('emesene')
+
+# as emesene.py does, e3 has to be imported before gui
+import e3
+from test_adium_theme import build_messages, THEMES_PATH
+
+import extension
+from gui.gtkui.utils import GTKTags
+from gui.base import Plus
+from gui.base import AdiumTheme
+from gui.base import MarkupParser
+from e3.base import status
+from e3.base.Logger import Logger, Account
+from e3.base.Contact import Contact
+from e3.base.ContactManager import ContactManager
+from e3.base.Event import Event
+from e3.base.Worker import EVENTS
+from e3.common.Signals import Signals
+from e3.dummy.LoadGenerator import LoadGenerator, TEXTS
+
+sys.path.insert(0, os.path.abspath(os.path.join('e3', 'xmpp', 'SleekXMPP')))
+from sleekxmpp import ClientXMPP
+from sleekxmpp.xmlstream import ET
+
+extension.category_register('toolkit tags', GTKTags)
+
+ME = 'me@load.emesene.org'
+
+PRESENCE = '''<presence xmlns="jabber:client"
+  from="contact%(n)i@load.emesene.org/emesene" to="me@load.emesene.org/bench">
+  <show>away</show><status>status %(n)i</status><priority>%(n)i</priority>
+  <c xmlns="http://jabber.org/protocol/caps" hash="sha-1"
+     node="http://emesene.org" ver="%(n)i" />
+  <x xmlns="vcard-temp:x:update"><photo>%(n)040x</photo></x>
+</presence>'''
+
+MESSAGE = '''<message xmlns="jabber:client" type="chat" id="m%(n)i"
+  from="contact%(n)i@load.emesene.org/emesene" to="me@load.emesene.org/bench">
+  <body>%(text)s</body>
+  <active xmlns="http://jabber.org/protocol/chatstates" />
+</message>'''
+
+# temporary directories removed when the suite ends
+TEMP_DIRS = []
+# scale : logger with messages logged, shared by the query benchmarks
+LOGGERS = {}
+
+def new_logger():
+    path = tempfile.mkdtemp(prefix='emesene-bench-')
+    TEMP_DIRS.append(path)
+    return Logger(path)
+
+def log_events(logger, generator, seconds):
+    '''log the presence changes and messages of generator up to seconds,
+    return the number of events logged'''
+    me = Account('0', None, ME, status.ONLINE, 'me', '', '')
+    count = 0
+
+    for when, kind, args in generator.events_until(seconds):
+        account = args[0]
+        src = Account(account, None, account, generator.status[account],
+            account.split('@')[0], '', '')
+
+        if kind == 'presence':
+            logger.add_event('status change', args[1], args[1], src)
+            count += 1
+        elif kind == 'message':
+            for text in args[1]:
+                logger.add_event('message', src.status, text, src, me)
+            count += len(args[1])
+
+    logger.connection.commit()
+    return count
+
+def filled_logger(scale):
+    '''return a logger with an hour of load logged, and the accounts on it'''
+    if scale not in LOGGERS:
+        generator = LoadGenerator(seed=1, contacts=int(100 * scale),
+            picture_rate=0, transfer_rate=0)
+        generator.roster()
+        logger = new_logger()
+        log_events(logger, generator, 3600 * scale)
+        LOGGERS[scale] = logger, generator.accounts
+
+    return LOGGERS[scale]
+
+def bench_logger_log(scale):
+    generator = LoadGenerator(seed=1, contacts=int(100 * scale),
+        picture_rate=0, transfer_rate=0)
+    generator.roster()
+    logger = new_logger()
+    seconds = [0]
+
+    def run():
+        seconds[0] += 60 * scale
+        return log_events(logger, generator, seconds[0])
+
+    return run
+
+def bench_logger_chats(scale):
+    logger, accounts = filled_logger(scale)
+
+    def run():
+        for account in accounts:
+            logger.get_chats(ME, account, 1000)
+        return len(accounts)
+
+    return run
+
+def bench_logger_keyword(scale):
+    logger, accounts = filled_logger(scale)
+    now = time.time()
+
+    def run():
+        for account in accounts:
+            logger.get_chats_by_keyword(ME, account, 0, now, 'emesene', 1000)
+        return len(accounts)
+
+    return run
+
+def bench_logger_page(scale):
+    logger, accounts = filled_logger(scale)
+    now = time.time()
+
+    def run():
+        for account in accounts:
+            logger.get_chats_page(ME, account, 0, now, 50)
+        return len(accounts)
+
+    return run
+
+def build_texts(count):
+    rand = random.Random(count)
+    return [MarkupParser.escape(' '.join(rand.choice(TEXTS)
+        for n in xrange(rand.randint(1, 4)))) for n in xrange(count)]
+
+def bench_markup_emotes(scale):
+    texts = build_texts(int(1000 * scale))
+
+    def run():
+        for text in texts:
+            MarkupParser.replace_emotes(text, {}, None, ME)
+        return len(texts)
+
+    return run
+
+def bench_markup_urlify(scale):
+    texts = build_texts(int(1000 * scale))
+
+    def run():
+        for text in texts:
+            MarkupParser.urlify(text)
+        return len(texts)
+
+    return run
+
+def build_roster(scale):
+    return LoadGenerator(seed=2, contacts=int(2000 * scale)).roster()
+
+def parse_roster(contacts):
+    for account, nick, message, status_, groups in contacts:
+        Plus.msnplus_parse(nick)
+        Plus.msnplus_parse(message)
+        Plus.msnplus_strip(nick)
+    return len(contacts)
+
+def bench_plus_cold(scale):
+    groups, contacts = build_roster(scale)
+    Plus._cache.size = max(Plus.CACHE_SIZE, 3 * len(contacts))
+
+    def run():
+        Plus._cache.clear()
+        return parse_roster(contacts)
+
+    return run
+
+def bench_plus_cached(scale):
+    groups, contacts = build_roster(scale)
+    Plus._cache.size = max(Plus.CACHE_SIZE, 3 * len(contacts))
+    Plus._cache.clear()
+    parse_roster(contacts)
+
+    return lambda: parse_roster(contacts)
+
+def bench_adium_format(scale):
+    theme = AdiumTheme.AdiumTheme(
+        os.path.join(THEMES_PATH, 'renkoo.AdiumMessageStyle'), '')
+    count = int(3000 * scale)
+
+    def run():
+        msgs = build_messages()
+        for n in xrange(count):
+            msg = msgs[n % 3]
+            msg.first = n % 2 == 0
+            theme.format(msg, True)
+        return count
+
+    return run
+
+def build_contacts(scale):
+    groups, contacts = build_roster(scale)
+    manager = ContactManager(ME)
+
+    for account, nick, message, status_, groups_ in contacts:
+        contact = Contact(account, nick=nick, message=message,
+            _status=status_)
+        contact.groups = groups_
+        manager.contacts[account] = contact
+
+    return manager, groups
+
+def bench_contacts_group(scale):
+    manager, groups = build_contacts(scale)
+
+    def run():
+        manager.get_sorted_list_by_group(groups, True)
+        return len(manager.contacts)
+
+    return run
+
+def bench_contacts_status(scale):
+    manager, groups = build_contacts(scale)
+
+    def run():
+        manager.get_sorted_list_by_status()
+        return len(manager.contacts)
+
+    return run
+
+def bench_contacts_count(scale):
+    manager, groups = build_contacts(scale)
+    by_group = manager.get_sorted_list_by_group(groups)
+
+    def run():
+        for contacts in by_group.itervalues():
+            manager.get_online_total_count(contacts)
+        manager.get_online_total_count(manager.contacts.values())
+        return len(manager.contacts)
+
+    return run
+
+class Subscriber(object):
+    '''a signal subscriber that does as little as possible'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def on_signal(self, *args):
+        self.calls += 1
+
+def bench_signals_process(scale):
+    signals = Signals(EVENTS, Queue.Queue())
+    # run keeps the subscribers alive, signals keep weak references
+    subscribers = [Subscriber() for n in xrange(10)]
+    for subscriber in subscribers:
+        signals.contact_attr_changed.subscribe(subscriber.on_signal)
+
+    event_id = signals.event_names.index('contact attr changed')
+    events = [Event(event_id, 'contact%i@load.emesene.org' % n, 'status',
+        status.ONLINE) for n in xrange(int(10000 * scale))]
+
+    def run():
+        for event in events:
+            signals.process(event)
+        return len(events) * len(subscribers)
+
+    return run
+
+def parse_stanza(xmpp, xml, fields):
+    stanza = xmpp._build_stanza(ET.fromstring(xml))
+    return [stanza[field] for field in fields]
+
+def build_client():
+    xmpp = ClientXMPP('me@load.emesene.org/bench', 'bench')
+    for plugin in ('xep_0004', 'xep_0030', 'xep_0054', 'xep_0153',
+                   'xep_0060', 'xep_0085', 'xep_0199'):
+        xmpp.register_plugin(plugin)
+    return xmpp
+
+def bench_xmpp_presence(scale):
+    xmpp = build_client()
+    stanzas = [PRESENCE % {'n': n} for n in xrange(int(2000 * scale))]
+    fields = ('from', 'type', 'status', 'priority', 'vcard_temp_update')
+
+    def run():
+        for xml in stanzas:
+            parse_stanza(xmpp, xml, fields)
+        return len(stanzas)
+
+    return run
+
+def bench_xmpp_message(scale):
+    xmpp = build_client()
+    texts = build_texts(int(2000 * scale))
+    stanzas = [MESSAGE % {'n': n, 'text': text}
+               for n, text in enumerate(texts)]
+    fields = ('from', 'type', 'body', 'chat_state')
+
+    def run():
+        for xml in stanzas:
+            parse_stanza(xmpp, xml, fields)
+        return len(stanzas)
+
+    return run
+
+# name, unit, scale of the unit to seconds, function that does the setup
+# and returns a function that runs the benchmark once and returns the
+# number of operations it did
+BENCHMARKS = (
+    ('logger.log', 'us/event', 1e6, bench_logger_log),
+    ('logger.get_chats', 'ms/query', 1e3, bench_logger_chats),
+    ('logger.get_chats_by_keyword', 'ms/query', 1e3, bench_logger_keyword),
+    ('logger.get_chats_page', 'ms/query', 1e3, bench_logger_page),
+    ('markup.replace_emotes', 'us/message', 1e6, bench_markup_emotes),
+    ('markup.urlify', 'us/message', 1e6, bench_markup_urlify),
+    ('plus.parse.cold', 'us/contact', 1e6, bench_plus_cold),
+    ('plus.parse.cached', 'us/contact', 1e6, bench_plus_cached),
+    ('adium.format', 'us/message', 1e6, bench_adium_format),
+    ('contacts.sort_by_group', 'us/contact', 1e6, bench_contacts_group),
+    ('contacts.sort_by_status', 'us/contact', 1e6, bench_contacts_status),
+    ('contacts.count', 'us/contact', 1e6, bench_contacts_count),
+    ('signals.process', 'us/call', 1e6, bench_signals_process),
+    ('xmpp.presence', 'us/stanza', 1e6, bench_xmpp_presence),
+    ('xmpp.message', 'us/stanza', 1e6, bench_xmpp_message),
+)
+
+def measure(setup, repeat, scale):
+    '''return the best seconds per operation of repeat runs'''
+    run = setup(scale)
+    best = None
+
+    for n in xrange(repeat):
+        start = time.time()
+        count = run()
+        elapsed = (time.time() - start) / max(count, 1)
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def get_commit():
+    '''return the commit the tree is on, None if it can't be known'''
+    try:
+        process = subprocess.Popen(['git', 'rev-parse', 'HEAD'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output = process.communicate()[0].strip()
+    except OSError:
+        return None
+
+    return output or None
+
+def compare(results, baseline, threshold):
+    '''print the change of each result from baseline, return the names of
+    the results that are slower by more than threshold'''
+    slower = []
+
+    for name, unit, unit_scale, setup in BENCHMARKS:
+        if name not in results or name not in baseline['results']:
+            continue
+
+        value = results[name]['value']
+        base = baseline['results'][name]['value']
+        change = (value - base) / base if base else 0.0
+
+        mark = ''
+        if change > threshold:
+            mark = ' slower'
+            slower.append(name)
+        elif change < -threshold:
+            mark = ' faster'
+
+        print "%-28s %10.2f %10.2f %+7.1f%%%s" % (name, base, value,
+            change * 100, mark)
+
+    return slower
+
+def main():
+    parser = optparse.OptionParser(usage='%prog [options] [benchmark...]')
+    parser.add_option('-o', '--output', help='write the results as json')
+    parser.add_option('-c', '--compare', help='compare with a json result')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+        help='runs of each benchmark, the best is kept [%default]')
+    parser.add_option('-s', '--scale', type='float', default=1.0,
+        help='multiply the size of the data by this [%default]')
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+        help='relative change reported as slower or faster [%default]')
+    options, prefixes = parser.parse_args()
+
+    results = {}
+    try:
+        for name, unit, unit_scale, setup in BENCHMARKS:
+            if prefixes and not [prefix for prefix in prefixes
+                                 if name.startswith(prefix)]:
+                continue
+
+            value = measure(setup, options.repeat, options.scale) * unit_scale
+            results[name] = {'value': value, 'unit': unit}
+            print "%-28s %10.2f %s" % (name, value, unit)
+    finally:
+        for path in TEMP_DIRS:
+            shutil.rmtree(path, True)
+
+    report = {
+        'commit': get_commit(),
+        'date': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': options.repeat,
+        'scale': options.scale,
+        'results': results,
+    }
+
+    if options.output:
+        handle = open(options.output, 'w')
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.close()
+
+    if options.compare:
+        handle = open(options.compare)
+        baseline = json.load(handle)
+        handle.close()
+
+        print
+        print "%-28s %10s %10s %8s" % ('', 'baseline', 'current', 'change')
+        if compare(results, baseline, options.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+'''
+Micro-benchmark of keeping the tray contacts menu up to date during a
+presence storm.
+
+A roster of contacts is loaded in a contact manager and a storm of
+status and nick changes is replayed through the tray contacts menu. The
+menu is updated after every change, as was done before changes were
+deferred, and once after the whole storm, as is done when it's shown.
+
+    python test/bench_tray_contacts.py [contacts] [changes]
+'''
+
+import os
+import sys
+import time
+import random
+sys.path.append(os.path.abspath('.'))
+
+import gettext
+gettext.install('emesene')
+
+import e3
+from e3 import status
+from e3.base.ContactManager import ContactManager
+from gui.common.TrayIcon import ContactsMenu
+
+PICTURE = os.path.join('themes', 'images', 'default', 'user.png')
+
+class Session(object):
+    '''the parts of a session the contacts menu uses'''
+
+    def __init__(self, count):
+        self.contacts = ContactManager('me@emesene.org')
+        rand = random.Random(count)
+
+        for n in xrange(count):
+            account = 'contact%i@emesene.org' % n
+            contact = e3.Contact(account, nick='[c=%i]contact %i[/c]' % (
+                n % 67, n), _status=rand.choice(status.ALL))
+            contact.picture = PICTURE
+            self.contacts.contacts[account] = contact
+
+class Handler(object):
+
+    def __init__(self, count):
+        self.session = Session(count)
+
+def build_storm(session, count):
+    '''return a list of (account, attribute, old value)'''
+    accounts = session.contacts.contacts.keys()
+    storm = []
+    for n in xrange(count):
+        account = random.choice(accounts)
+        if random.random() < 0.8:
+            storm.append((account, 'status', random.choice(status.ALL)))
+        else:
+            storm.append((account, 'nick', 'nick %i' % n))
+    return storm
+
+def replay(session, menu, storm, update_each):
+    for account, attr, value in storm:
+        contact = session.contacts.get(account)
+        setattr(contact, attr, value)
+        menu._on_contact_change_something(account, attr, value)
+        if update_each:
+            menu.update()
+
+    menu.update()
+
+def measure(name, handler, storm, update_each):
+    menu = ContactsMenu(handler)
+    menu.update()
+
+    start = time.time()
+    replay(handler.session, menu, storm, update_each)
+    elapsed = time.time() - start
+
+    print "%-8s %8.1f ms/storm, %i rows" % (name, elapsed * 1e3,
+        len(menu.contacts_to_item))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    random.seed(changes)
+    storm = build_storm(Handler(count).session, changes)
+
+    print "%i contacts, %i changes" % (count, changes)
+    measure('eager', Handler(count), storm, True)
+    measure('deferred', Handler(count), storm, False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import re
+import sys
+import time
+import calendar
+import datetime
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+# as emesene.py does, display names are unicode after msnplus_strip
+reload(sys)
+sys.setdefaultencoding('utf8')
+
+from gui.base import AdiumTheme
+from gui.base.Message import Message
+from gui.base import MarkupParser
+from gui.base import Plus
+
+THEMES_PATH = os.path.join('themes', 'conversations')
+
+def reference_replace(template, msg):
+    '''the replace chain used before templates were compiled'''
+    msg.alias = Plus.msnplus_strip(msg.alias)
+    msg.display_name = Plus.msnplus_strip(msg.display_name)
+
+    if(len(msg.alias) > AdiumTheme.DISPLAY_NAME_LIMIT):
+        msg.alias = msg.alias.decode('utf-8')[0:AdiumTheme.DISPLAY_NAME_LIMIT] + "..."
+    if(len(msg.display_name) > AdiumTheme.DISPLAY_NAME_LIMIT):
+        msg.display_name = msg.display_name.decode('utf-8')[0:AdiumTheme.DISPLAY_NAME_LIMIT] + "..."
+
+    escape = AdiumTheme.escape
+    image_path = escape(MarkupParser.path_to_url(msg.image_path))
+    status_path = escape(MarkupParser.path_to_url(msg.status_path))
+
+    if msg.style is not None:
+        msg.message = AdiumTheme.style_message(msg.message, msg.style)
+    if msg.alias:
+        template = template.replace('%sender%', escape(msg.alias))
+    else:
+        template = template.replace('%sender%', escape(msg.display_name))
+
+    template = template.replace('%senderScreenName%', escape(msg.sender))
+    template = template.replace('%senderDisplayName%',
+        escape(msg.display_name))
+    template = template.replace('%userIconPath%', image_path)
+    template = template.replace('%senderStatusIcon%',
+        status_path)
+    template = template.replace('%messageDirection%',
+        escape(msg.direction))
+
+    template = template.replace('%message%',
+        AdiumTheme.escape_no_xml(msg.message))
+
+    def replace_time(match):
+        format = match.groups()[0]
+        result = time.strftime(match.groups()[0])
+        if result == format:
+            result = '%time%'
+        return result
+
+    template = re.sub("%time{(.*?)}%", replace_time, template)
+
+    if msg.timestamp is None:
+        template = template.replace('%time%',
+            escape(time.strftime("%H:%M")))
+    else:
+        def utc_to_local(t):
+            secs = calendar.timegm(t)
+            return time.localtime(secs)
+        l_time = utc_to_local(msg.timestamp.timetuple())
+        d_time = datetime.datetime.fromtimestamp(time.mktime(l_time))
+        template = template.replace('%time%',
+            escape(d_time.strftime('%x %X')))
+
+    template = template.replace('%shortTime%',
+        escape(time.strftime("%H:%M")))
+    template = template.replace('%service%', escape(msg.service))
+    template = template.replace('%messageClasses%', escape(msg.classes))
+    template = template.replace('%status%', escape(msg.status))
+
+    return template.replace('\n', '')
+
+def build_messages():
+    '''return new messages, rendering changes them'''
+    timestamp = datetime.datetime(2012, 5, 17, 21, 3, 44)
+    return [
+        Message(True, True, 'cloud@emesene.org', 'nube', '',
+            '/tmp/cloud.png', '/tmp/online.png', 'oh hai!', 'Online'),
+        Message(False, False, 'me@emesene.org', 'marianoguerra',
+            'mariano', '/tmp/me.png', '/tmp/busy.png',
+            'it\'s "quoted"\nand <b>bold</b> 100%', 'Busy',
+            timestamp=timestamp),
+        Message(True, False, 'dx@emesene.org',
+            '[c=4]a very long display name for dx[/c]', '',
+            '/tmp/dx.png', '/tmp/away.png', 'caf\xc3\xa9', 'Away',
+            classes='history', timestamp=timestamp),
+    ]
+
+class AdiumThemeTestCase(unittest.TestCase):
+
+    def themes(self):
+        for name in sorted(os.listdir(THEMES_PATH)):
+            if name.endswith('.AdiumMessageStyle'):
+                yield AdiumTheme.AdiumTheme(os.path.join(THEMES_PATH, name),
+                    '')
+
+    def templates(self, theme):
+        return [template for template in (theme.status, theme.incoming,
+            theme.incoming_next, theme.outgoing, theme.outgoing_next,
+            theme.history_in, theme.history_in_next, theme.history_out,
+            theme.history_out_next) if template is not None]
+
+    def test_bundled_themes_equivalent(self):
+        for theme in self.themes():
+            for template in self.templates(theme):
+                for compiled, expected in zip(build_messages(),
+                                              build_messages()):
+                    self.assertEquals(theme._replace(template, compiled),
+                        reference_replace(template, expected))
+
+    def test_unknown_placeholders_kept(self):
+        literals, fields = AdiumTheme.compile_template(
+            '<p class="%senderColor%">%sender%\n%time{%H:%M}%</p>')
+
+        self.assertEquals(literals, ['<p class="%senderColor%">', '', '</p>'])
+        self.assertEquals(len(fields), 2)
+
+    def test_time_format_fallback(self):
+        msg = build_messages()[1]
+        literals, fields = AdiumTheme.compile_template('%time{not a format}%')
+
+        self.assertEquals(fields[0](msg), AdiumTheme.FIELDS['time'](msg))
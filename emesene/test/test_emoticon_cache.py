@@ -40,6 +40,23 @@ class EmoticonCacheTestCase(unittest.TestCase):
         self.assertTrue((emoticon, hash_) not in items,
                 str((emoticon, hash_)) + ' should not be in cache.list(): ' + str(items))
 
+    def test_parse_cached(self):
+        emoticon, hash_ = self.cache.insert(('(y)', self.image_path))
+        self.assertEqual(self.cache.parse().get(emoticon), hash_)
+
+        # parse doesn't read the information file again until it changes
+        os.rename(self.cache.info_path, self.cache.info_path + '.old')
+        self.assertEqual(self.cache.parse().get(emoticon), hash_)
+        os.rename(self.cache.info_path + '.old', self.cache.info_path)
+
+        new_image_path = testutils.create_binary_file(self.cache.path)
+        new_emoticon, new_hash = self.cache.insert(('(n)', new_image_path))
+        emotes = self.cache.parse()
+        self.assertEqual(emotes.get(new_emoticon), new_hash)
+
+        self.assertTrue(self.cache.remove(new_hash))
+        self.assertFalse(new_emoticon in self.cache.parse())
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,61 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+from e3.common import FileSource
+import testutils
+
+class FileSourceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.file_path = testutils.create_binary_file(self.path,
+                content_length=10000)
+        handle = open(self.file_path, 'rb')
+        self.content = handle.read()
+        handle.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_size(self):
+        source = FileSource(self.file_path)
+
+        self.assertEquals(source.size, len(self.content))
+        source.seek(0, os.SEEK_END)
+        self.assertEquals(source.tell(), len(self.content))
+
+    def test_read_chunks(self):
+        source = FileSource(self.file_path)
+        chunks = []
+        chunk = source.read(1250)
+
+        while chunk:
+            chunks.append(chunk)
+            chunk = source.read(1250)
+
+        self.assertEquals("".join(chunks), self.content)
+        self.assertEquals(len(chunks), 8)
+
+    def test_seek(self):
+        source = FileSource(self.file_path)
+
+        source.seek(100)
+        self.assertEquals(source.read(10), self.content[100:110])
+        source.seek(-10, os.SEEK_CUR)
+        self.assertEquals(source.read(10), self.content[100:110])
+        source.seek(-5, os.SEEK_END)
+        self.assertEquals(source.read(), self.content[-5:])
+
+    def test_reopen(self):
+        source = FileSource(self.file_path)
+
+        self.assertEquals(source.read(), self.content)
+        self.assertEquals(source.read(), "")
+        source.seek(0)
+        self.assertEquals(source.read(), self.content)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+from e3.common import Instrumentation
+from e3.common.Signal import Signal
+import testutils
+
+class Subscriber(object):
+    '''a subscriber with a fast and a slow handler'''
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def on_fast(self, *args):
+        self.clock.now += 0.001
+
+    def on_slow(self, *args):
+        self.clock.now += 0.1
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = testutils.Clock()
+        self.stats = Instrumentation.Stats(self.clock)
+
+    def tearDown(self):
+        Instrumentation.disable()
+
+    def test_queue_high_water_mark(self):
+        for n in xrange(3):
+            self.stats.enter('events')
+        self.stats.leave('events')
+        self.stats.leave('events')
+        self.stats.enter('events')
+
+        queue = self.stats.snapshot()['queues']['events']
+        self.assertEquals((queue['depth'], queue['max_depth'],
+            queue['items']), (2, 3, 4))
+
+    def test_leave_before_enter_ignored(self):
+        self.stats.leave('actions')
+        self.stats.enter('actions')
+        self.stats.leave('actions')
+        self.stats.leave('actions')
+
+        queue = self.stats.snapshot()['queues']['actions']
+        self.assertEquals((queue['depth'], queue['max_depth']), (0, 1))
+
+    def test_latency_histogram(self):
+        for seconds in (0.0005, 0.003, 0.003, 5):
+            self.stats.dispatched('contact attr changed', seconds)
+
+        latency = self.stats.snapshot()['latencies']['contact attr changed']
+        histogram = dict(latency['histogram'])
+        self.assertEquals(latency['count'], 4)
+        self.assertEquals(latency['max'], 5000)
+        self.assertEquals((histogram[1], histogram[5], histogram[None]),
+            (1, 2, 1))
+        self.assertEquals(sum(histogram.values()), 4)
+
+    def test_signal_subscribers(self):
+        signal = Signal('contact attr changed')
+        subscriber = Subscriber(self.clock)
+        signal.subscribe(subscriber.on_fast)
+        signal.subscribe(subscriber.on_slow)
+
+        signal.emit('cloud@emesene.org')
+        self.assertEquals(Instrumentation.stats, None)
+
+        stats = Instrumentation.enable(self.clock)
+        signal.emit('cloud@emesene.org')
+        signal.emit('cloud@emesene.org')
+
+        subscribers = stats.snapshot()['subscribers']
+        self.assertEquals([(item['subscriber'], item['calls'])
+            for item in subscribers],
+            [('Subscriber.on_slow', 2), ('Subscriber.on_fast', 2)])
+        self.assertAlmostEquals(subscribers[0]['total'], 200)
+        self.assertAlmostEquals(subscribers[1]['max'], 1)
+
+    def test_dump(self):
+        self.stats.enter('events')
+        self.stats.dispatched('message', 0.01)
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+
+        try:
+            self.stats.dump(path)
+            snapshot = json.load(open(path))
+        finally:
+            os.remove(path)
+
+        self.assertEquals(snapshot['queues']['events']['max_depth'], 1)
+        self.assertEquals(snapshot['latencies']['message']['count'], 1)
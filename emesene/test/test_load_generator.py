@@ -0,0 +1,62 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+from e3.base import status
+from e3.dummy.LoadGenerator import LoadGenerator
+
+class LoadGeneratorTestCase(unittest.TestCase):
+    def replay(self, seed, seconds=60):
+        generator = LoadGenerator(seed, contacts=200, groups=5,
+            presence_rate=20, message_rate=2, picture_rate=1,
+            transfer_rate=0.5, pictures=3)
+        roster = generator.roster()
+
+        # asking in steps gives the same events as asking once
+        events = []
+        for second in xrange(1, seconds + 1):
+            events.extend(generator.events_until(second))
+
+        return roster, events
+
+    def test_same_seed_same_load(self):
+        self.assertEquals(self.replay(1), self.replay(1))
+        self.assertNotEquals(self.replay(1), self.replay(2))
+
+    def test_steps_give_same_events(self):
+        generator = LoadGenerator(1, contacts=200, groups=5,
+            presence_rate=20, message_rate=2, picture_rate=1,
+            transfer_rate=0.5, pictures=3)
+        generator.roster()
+
+        self.assertEquals(generator.events_until(60), self.replay(1)[1])
+
+    def test_roster(self):
+        (groups, contacts), events = self.replay(1)
+
+        self.assertEquals(len(groups), 5)
+        self.assertEquals(len(contacts), 200)
+        for account, nick, message, status_, contact_groups in contacts:
+            self.assertTrue(status_ in status.ALL)
+            for group in contact_groups:
+                self.assertTrue(group in groups)
+
+    def test_events(self):
+        (groups, contacts), events = self.replay(1)
+        statuses = dict((contact[0], contact[3]) for contact in contacts)
+
+        times = [when for when, kind, args in events]
+        self.assertEquals(times, sorted(times))
+        self.assertTrue(times[-1] <= 60)
+        self.assertEquals(set(kind for when, kind, args in events),
+            set(('presence', 'message', 'picture', 'transfer')))
+
+        for when, kind, args in events:
+            if kind == 'presence':
+                self.assertNotEquals(statuses[args[0]], args[1])
+                statuses[args[0]] = args[1]
+            elif kind == 'message':
+                self.assertTrue(1 <= len(args[1]) <= 10)
+            elif kind == 'picture':
+                self.assertTrue(0 <= args[1] < 3)
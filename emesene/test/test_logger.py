@@ -79,6 +79,38 @@ class LoggerTestCase(unittest.TestCase):
             logger.get_chats_between(ME_ACCOUNT, CLOUD_ACCOUNT, from_t, to_t, 10, callback)
             logger.check(True)
 
+        def test_get_chats_page():
+            def callback(result):
+                self.assertTrue(result)
+                chats, cursor = result
+                self.assertEquals(len(chats), 1)
+                self.assertEquals(cursor, None)
+                status, timestamp, payload, nick, account = chats[0]
+                self.assertEquals(payload, "oh hai!!")
+
+            def full_page_callback(result):
+                chats, cursor = result
+                self.assertEquals(len(chats), 1)
+                self.assertEquals(cursor[0], chats[0][1])
+
+                # nothing is older than the only message
+                logger.get_chats_page(ME_ACCOUNT, CLOUD_ACCOUNT, from_t, to_t,
+                    1, cursor, None, empty_callback)
+
+            def empty_callback(result):
+                self.assertEquals(result, ([], None))
+
+            to_t = time.time() + 100
+            from_t = to_t - 1000
+
+            logger.get_chats_page(ME_ACCOUNT, CLOUD_ACCOUNT, from_t, to_t, 10,
+                None, None, callback)
+            logger.get_chats_page(ME_ACCOUNT, CLOUD_ACCOUNT, from_t, to_t, 1,
+                None, None, full_page_callback)
+            logger.get_chats_page(ME_ACCOUNT, CLOUD_ACCOUNT, from_t, to_t, 10,
+                None, "hai", callback)
+            logger.check(True)
+
         def test_get_sent_messages():
             def callback(result):
                 self.assertTrue(result)
@@ -106,6 +138,7 @@ class LoggerTestCase(unittest.TestCase):
         # message was created
         test_get_chats()
         test_get_chats_between()
+        test_get_chats_page()
         test_get_sent_messages()
         test_txt_exporter()
 
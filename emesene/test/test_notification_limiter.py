@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+from e3.common.NotificationLimiter import NotificationLimiter
+import testutils
+
+class NotificationLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = testutils.Clock()
+        # a notification every 2 seconds, 3 at once
+        self.limiter = NotificationLimiter(0.5, 3, self.clock)
+
+    def test_burst(self):
+        for n in xrange(3):
+            self.assertTrue(self.limiter.allow('online'))
+
+        self.assertFalse(self.limiter.allow('online'))
+        self.assertEquals(self.limiter.flush(), [('online', 1)])
+
+    def test_refill(self):
+        for n in xrange(3):
+            self.limiter.allow('message')
+
+        self.clock.now += 1
+        self.assertFalse(self.limiter.allow('message'))
+        self.clock.now += 1
+        self.assertTrue(self.limiter.allow('message'))
+        self.assertFalse(self.limiter.allow('message'))
+
+    def test_refill_capped_at_burst(self):
+        self.clock.now += 3600
+
+        for n in xrange(3):
+            self.assertTrue(self.limiter.allow('online'))
+        self.assertFalse(self.limiter.allow('online'))
+
+    def test_digest(self):
+        for n in xrange(3):
+            self.limiter.allow('message')
+
+        for n in xrange(12):
+            self.limiter.allow('online')
+        self.limiter.allow('offline')
+        self.limiter.allow('online')
+
+        self.assertEquals(self.limiter.flush(),
+            [('online', 13), ('offline', 1)])
+        self.assertEquals(self.limiter.flush(), [])
@@ -0,0 +1,104 @@
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.abspath(os.path.join('e3', 'papylib', 'papyon')))
+
+from papyon.msnp2p.constants import ApplicationID
+from papyon.msnp2p.transport.TLP import MessageBlob
+from papyon.msnp2p.transport.base import BaseP2PTransport
+
+class TransportManager(object):
+    _client = None
+
+    def _register_transport(self, transport):
+        pass
+
+    def _unregister_transport(self, transport):
+        pass
+
+class RecordingP2PTransport(BaseP2PTransport):
+    '''transport keeping the chunks it sends until the test confirms or
+    fails them'''
+    MAX_WINDOW_SIZE = 4
+
+    def __init__(self, transport_manager):
+        self.sent = []
+        self.signals = []
+        BaseP2PTransport.__init__(self, transport_manager, "recording")
+
+    @property
+    def peer(self):
+        return "peer"
+
+    @property
+    def peer_guid(self):
+        return None
+
+    @property
+    def max_chunk_size(self):
+        return 1250
+
+    @property
+    def version(self):
+        return 2
+
+    def emit(self, signal, *args):
+        self.signals.append(signal)
+
+    def _ready_to_send(self):
+        return True
+
+    def _send_chunk(self, peer, peer_guid, chunk):
+        self.sent.append(chunk)
+
+class P2PTransportTestCase(unittest.TestCase):
+    def setUp(self):
+        # the transport only keeps a weak reference to its manager
+        self.manager = TransportManager()
+        self.transport = RecordingP2PTransport(self.manager)
+        self.data = ''.join(chr(i % 256) for i in xrange(10000))
+        self.blob = MessageBlob(ApplicationID.FILE_TRANSFER, self.data,
+                session_id=42)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_failed_chunk_is_sent_again(self):
+        transport = self.transport
+        transport.send("peer", None, self.blob)
+
+        order = []
+        delivered = set()
+        lost = None
+
+        while transport.sent:
+            chunk = transport.sent.pop(0)
+            if chunk not in order:
+                order.append(chunk)
+
+            if lost is None:
+                lost = chunk
+                transport._on_chunk_failed("peer", None, chunk)
+                continue
+
+            # the blob is only sent once the lost chunk got through
+            self.assertFalse("blob-sent" in transport.signals)
+            delivered.add(chunk)
+            transport._on_chunk_sent("peer", None, chunk)
+
+        self.assertTrue(lost in delivered)
+        self.assertEquals(transport.signals.count("blob-sent"), 1)
+        self.assertEquals(transport.inflight_chunks, 0)
+        self.assertEquals(''.join(chunk.body for chunk in order), self.data)
+
+    def test_failed_chunk_shrinks_window(self):
+        transport = self.transport
+        transport.send("peer", None, self.blob)
+
+        self.assertEquals(len(transport.sent), transport.max_window_size)
+        transport._on_chunk_failed("peer", None, transport.sent[0])
+
+        self.assertEquals(transport.window_size,
+                transport.max_window_size / 2)
+        self.assertEquals(transport.inflight_chunks,
+                transport.max_window_size - 1)
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import audioop
+import unittest
+import threading
+sys.path.append(os.path.abspath('.'))
+
+from e3.common import SoundMixer
+import testutils
+
+SOUNDS_PATH = os.path.join('themes', 'sounds', 'default.AdiumSoundset')
+SEND = os.path.join(SOUNDS_PATH, 'send.wav')
+NUDGE = os.path.join(SOUNDS_PATH, 'nudge.wav')
+ONLINE = os.path.join(SOUNDS_PATH, 'online.wav')
+
+class SlowCloseSink(object):
+    '''a sink whose player takes until release is set to stop'''
+
+    def __init__(self):
+        self.events = []
+        self.closing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, data):
+        self.events.append('write')
+
+    def close(self):
+        self.closing.set()
+        self.release.wait(5)
+        self.events.append('close')
+
+class SoundMixerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = testutils.Clock()
+        self.sink = SoundMixer.NullSink()
+        self.mixer = SoundMixer.SoundMixer(self.sink, self.clock)
+
+    def mix_all(self):
+        chunks = []
+        chunk = self.mixer.mix()
+        while chunk is not None:
+            chunks.append(chunk)
+            chunk = self.mixer.mix()
+
+        return ''.join(chunks)
+
+    def test_decode_converts_format(self):
+        # nudge.wav is 8 bit mono, send.wav 16 bit stereo
+        for path in (NUDGE, SEND):
+            data = SoundMixer.decode(path)
+            self.assertEquals(len(data) % (SoundMixer.WIDTH *
+                SoundMixer.CHANNELS), 0)
+            self.assertTrue(audioop.max(data, SoundMixer.WIDTH) > 0)
+
+    def test_decoded_once(self):
+        self.assertTrue(self.mixer.play(SEND, threaded=False))
+        frames = self.mixer.sounds[SEND]
+        self.clock.now += 1
+        self.assertTrue(self.mixer.play(SEND, threaded=False))
+
+        self.assertTrue(self.mixer.sounds[SEND] is frames)
+        self.assertEquals(len(self.mixer.voices), 2)
+
+    def test_repeated_play_dropped(self):
+        self.assertTrue(self.mixer.play(SEND, threaded=False))
+        self.clock.now += SoundMixer.REPEAT_INTERVAL / 2
+        self.assertFalse(self.mixer.play(SEND, threaded=False))
+        self.assertTrue(self.mixer.play(ONLINE, threaded=False))
+
+        self.assertEquals(len(self.mixer.voices), 2)
+
+    def test_voices_limit(self):
+        for n in xrange(SoundMixer.MAX_VOICES):
+            self.clock.now += 1
+            self.assertTrue(self.mixer.play(SEND, threaded=False))
+
+        self.clock.now += 1
+        self.assertFalse(self.mixer.play(SEND, threaded=False))
+
+        self.mix_all()
+        self.assertTrue(self.mixer.play(SEND, threaded=False))
+
+    def test_overlapping_sounds_mixed(self):
+        send = SoundMixer.decode(SEND)
+        online = SoundMixer.decode(ONLINE)
+        self.mixer.play(SEND, threaded=False)
+        self.mixer.play(ONLINE, threaded=False)
+        mixed = self.mix_all()
+
+        longest = max(len(send), len(online))
+        self.assertTrue(len(mixed) >= longest)
+        self.assertEquals(len(mixed) % self.mixer.chunk_size, 0)
+
+        send += '\0' * (len(mixed) - len(send))
+        online += '\0' * (len(mixed) - len(online))
+        self.assertEquals(mixed, audioop.add(send, online,
+            SoundMixer.WIDTH))
+        self.assertEquals(self.mixer.voices, [])
+
+    def test_thread_writes_to_sink(self):
+        timeout = SoundMixer.IDLE_TIMEOUT
+        SoundMixer.IDLE_TIMEOUT = 0.1
+        self.mixer.clock = time.time
+        try:
+            self.mixer.play(SEND)
+            thread = self.mixer.thread
+            thread.join(5)
+        finally:
+            SoundMixer.IDLE_TIMEOUT = timeout
+
+        frames = self.mixer.sounds[SEND]
+        written = ''.join(self.sink.chunks)
+        self.assertFalse(thread.isAlive())
+        self.assertEquals(written[:len(frames)], frames)
+        self.assertEquals(written[len(frames):].strip('\0'), '')
+        self.assertEquals(self.sink.closed, 1)
+        self.assertEquals(self.mixer.thread, None)
+
+    def test_slow_close_does_not_block_play(self):
+        sink = SlowCloseSink()
+        self.mixer = SoundMixer.SoundMixer(sink)
+        timeout = SoundMixer.IDLE_TIMEOUT
+        SoundMixer.IDLE_TIMEOUT = 0.1
+        try:
+            self.mixer.play(SEND)
+            self.assertTrue(sink.closing.wait(5))
+
+            player = threading.Thread(target=self.mixer.play, args=(ONLINE,))
+            player.start()
+            player.join(1)
+            self.assertFalse(player.isAlive())
+
+            sink.release.set()
+            thread = self.mixer.thread
+            thread.join(5)
+        finally:
+            sink.release.set()
+            SoundMixer.IDLE_TIMEOUT = timeout
+
+        self.assertFalse(thread.isAlive())
+        # the second thread only wrote once the sink was closed
+        self.assertEquals(sink.events.count('close'), 2)
+        self.assertEquals(sink.events[-1], 'close')
+        self.assertEquals(sink.events[sink.events.index('close') + 1], 'write')
@@ -0,0 +1,70 @@
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath('.'))
+
+import e3
+from e3.xmpp.Worker import Worker
+
+from sleekxmpp import ClientXMPP
+from sleekxmpp.test import TestSocket
+
+STREAM_HEADER = '<stream:stream xmlns="jabber:client" ' \
+    'xmlns:stream="http://etherx.jabber.org/streams" ' \
+    'from="localhost" id="stream-1" version="1.0">'
+STREAM_FOOTER = '</stream:stream>'
+
+class FakeProxy(object):
+    use_proxy = False
+
+class FakeSession(object):
+    def __init__(self):
+        self.disconnects = []
+
+    def disconnected(self, reason, reconnect):
+        self.disconnects.append((reason, reconnect))
+
+class XmppWorkerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.worker = Worker(self.session, FakeProxy())
+
+        self.client = ClientXMPP('tester@localhost', 'test')
+        self.client.register_plugin('xep_0198')
+        self.client.add_event_handler('disconnected',
+            self.worker._on_disconnected)
+        self.client._connect = self._connect
+        self.worker.client = self.client
+
+        self.socket = TestSocket()
+        self.client.set_socket(self.socket)
+        self.client.plugin['xep_0198'].enabled.set()
+        self.client.plugin['xep_0198'].sm_id = 'session-1'
+
+    def tearDown(self):
+        self.worker._cancel_resume_timer()
+
+    def _connect(self, reattempt=True):
+        '''don't reach the network, give up reconnecting at once'''
+        self.client.stop.set()
+        return False
+
+    def test_dropped_connection_resumes(self):
+        self.client.session_started_event.set()
+        self.socket.disconnect_error()
+
+        self.client._process()
+
+        self.assertEquals(self.client.plugin['xep_0198'].sm_id, 'session-1')
+        self.assertTrue(self.worker.resume_timer is not None)
+        self.assertEquals(self.session.disconnects, [])
+
+    def test_closed_stream_disconnects(self):
+        self.socket.recv_data(STREAM_HEADER)
+        self.socket.recv_data(STREAM_FOOTER)
+
+        self.client._process()
+
+        self.assertEquals(self.client.plugin['xep_0198'].sm_id, None)
+        self.assertTrue(self.worker.resume_timer is None)
+        self.assertEquals(self.session.disconnects, [(None, False)])
@@ -3,6 +3,15 @@ import os
 import string
 import random
 
+class Clock(object):
+    '''a clock that only moves when told to'''
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
 def random_string(length=8, with_spaces=True, with_new_lines=False,
         with_tabs=False):
     letters = string.letters